@@ -12,7 +12,13 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from routes.onboarding import onboarding_bp
 from routes.medication_routes import medication_bp
-from routes.symptom_routes import symptom_bp
+from config import MODEL_LOAD_MODE
+from routes.symptom_routes import symptom_bp, model_loader
+from ml.engines import loaded_components
+from ml.loader import preload_for_fork
+from ml.metrics import metrics
+from ml.runtime import CPU_AFFINITY, configure_runtime, runtime_settings
+from utils.memory import process_memory
 
 
 app = Flask(__name__)
@@ -23,12 +29,47 @@ app.register_blueprint(onboarding_bp)
 app.register_blueprint(medication_bp)
 app.register_blueprint(symptom_bp)
 
+# Thread counts must be set before the model loads (pinning happens per
+# worker in gunicorn.conf.py when CPU_AFFINITY=auto)
+configure_runtime(affinity="" if CPU_AFFINITY == "auto" else CPU_AFFINITY)
+
+if MODEL_LOAD_MODE == "prefork":
+    # Load once in the gunicorn master; workers share the weight pages
+    preload_for_fork(model_loader)
+else:
+    # Load and warm up the symptom model without blocking startup
+    model_loader.start()
+
 
 @app.get("/")
 def home():
     return {"message": "MedAware Flask backend running"}
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness probe: the symptom model is loaded and warmed up."""
+    status = model_loader.status()
+    return status, (200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+def inference_metrics():
+    """Inference counters and summaries (e.g. effective sequence lengths)."""
+    return {
+        **metrics.snapshot(),
+        "memory": process_memory(),
+        "components": loaded_components(),
+        "runtime": runtime_settings(),
+    }
+
+
 def _build_agent_prompt(payload: Dict[str, Any]) -> str:
     """Construct a structured prompt for the LLM (via OpenRouter).
 
@@ -6,3 +6,49 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI", "YOUR_MONGODB_ATLAS_CONNECTION_STRING")
 DB_NAME = "medaware"
 
+
+# Micro-batching for /api/predict_symptom: requests arriving within the window
+# are coalesced into one padded forward pass (up to the max batch size).
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "5"))
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "16"))
+# Seconds a request waits for its batched prediction before giving up
+PREDICT_TIMEOUT_S = float(os.getenv("PREDICT_TIMEOUT_S", "30"))
+
+# Classifier engines (see ml/engines.py): "zero_shot" (one NLI pass per
+# label), "hierarchical" (zero-shot over coarse groups, then the fine
+# labels of the best groups; tree in ml/label_tree.json), "embedding" (one
+# encoder pass against cached label vectors),
+# "finetuned" (ml/model), "classifier_head" (10-way ClinicalBERT head) or
+# "cascade" (keyword fast path in front of CASCADE_INNER_ENGINE, with
+# CASCADE_THRESHOLD as the rule-stage confidence cut-off).
+# SYMPTOM_ENGINE serves /api/predict_symptom; SYMPTOM_SERVICE_ENGINE backs
+# services/symptom_service.py. SYMPTOM_SCORING_MODE is the old name.
+SYMPTOM_ENGINE = os.getenv(
+    "SYMPTOM_ENGINE", os.getenv("SYMPTOM_SCORING_MODE", "zero_shot")
+)
+SYMPTOM_SERVICE_ENGINE = os.getenv("SYMPTOM_SERVICE_ENGINE", "classifier_head")
+
+# Normalised-text prediction cache (size 0 disables it, TTL 0 means no expiry)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0"))
+
+# Maximum number of texts accepted by /api/predict_symptom/batch
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "64"))
+
+# Limits for /api/predict_symptom/multi: characters of symptom_text, and
+# clauses it may split into (each clause is one classified row)
+PREDICT_MULTI_MAX_CHARS = int(os.getenv("PREDICT_MULTI_MAX_CHARS", "2000"))
+PREDICT_MULTI_MAX_CLAUSES = int(os.getenv("PREDICT_MULTI_MAX_CLAUSES", "16"))
+
+# How app.py loads the symptom model: "background" (daemon thread, default)
+# or "prefork" (synchronously, before gunicorn forks workers that then share
+# the weights copy-on-write; set by gunicorn.conf.py)
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background")
+# Extra attempts after a failed model load, with exponential backoff
+# starting at MODEL_LOAD_RETRY_DELAY seconds
+MODEL_LOAD_RETRIES = int(os.getenv("MODEL_LOAD_RETRIES", "3"))
+MODEL_LOAD_RETRY_DELAY = float(os.getenv("MODEL_LOAD_RETRY_DELAY", "10"))
+
+# CPU threading for inference (TORCH_INTRA_OP_THREADS, TORCH_INTER_OP_THREADS,
+# CPU_AFFINITY) is read by ml/runtime.py, which the ml package shares with
+# the backend.
@@ -0,0 +1,69 @@
+"""
+Gunicorn config for pre-fork serving.
+
+The app (and the ClinicalBERT weights) is loaded once in the master
+process, then workers are forked and share the weight pages copy-on-write
+instead of each loading their own ~420 MB copy.
+
+Usage (from backend/):
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+# Must be set before app.py is imported so it loads the model synchronously
+os.environ.setdefault("MODEL_LOAD_MODE", "prefork")
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+# Pinning slots (core blocks) held by live workers, tracked in the master.
+# A respawned worker takes the slot its predecessor released instead of one
+# derived from worker.age, which keeps growing across respawns.
+_used_slots = set()
+
+
+def pre_fork(server, worker):
+    slot = 0
+    while slot in _used_slots:
+        slot += 1
+    _used_slots.add(slot)
+    worker.pinning_slot = slot
+
+
+def child_exit(server, worker):
+    _used_slots.discard(getattr(worker, "pinning_slot", None))
+
+
+def post_fork(server, worker):
+    # Re-apply threading in the worker and, with CPU_AFFINITY=auto, pin it
+    # to its slot's block of cores so workers do not oversubscribe the node
+    from ml.runtime import configure_runtime
+
+    settings = configure_runtime(
+        worker_index=worker.pinning_slot,
+        workers=workers,
+    )
+    worker.log.info(
+        "worker %s (slot %s): %s intra-op threads, cpus %s",
+        worker.pid,
+        worker.pinning_slot,
+        settings["intra_op_threads"],
+        settings["cpu_affinity"],
+    )
+
+
+def post_worker_init(worker):
+    from utils.memory import process_memory
+
+    memory = process_memory()
+    worker.log.info(
+        "worker %s memory: unique %.1f MB, shared %.1f MB",
+        memory["pid"],
+        memory.get("unique_mb", 0.0),
+        memory.get("shared_mb", 0.0),
+    )
@@ -1,5 +0,0 @@
-"""
-ML Module for MedAware
-Contains symptom classification models and utilities
-"""
-
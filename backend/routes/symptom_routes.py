@@ -1,13 +1,77 @@
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
-from ml.clinicalbert_service import SymptomClassifier
+from config import (
+    MODEL_LOAD_RETRIES,
+    MODEL_LOAD_RETRY_DELAY,
+    PREDICT_BATCH_MAX_ITEMS,
+    PREDICT_BATCH_WINDOW_MS,
+    PREDICT_MAX_BATCH_SIZE,
+    PREDICT_MULTI_MAX_CHARS,
+    PREDICT_MULTI_MAX_CLAUSES,
+    PREDICT_TIMEOUT_S,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL,
+    SYMPTOM_ENGINE,
+)
+from ml.batching import MicroBatcher
+from ml.cache import PredictionCache
+from ml.clauses import split_clauses
+from ml.engines import get_engine
+from ml.loader import BackgroundModelLoader, ModelNotReadyError
 from utils.auth_middleware import verify_firebase_token
 from utils.db import db
 
 symptom_bp = Blueprint("symptom_bp", __name__)
-classifier = SymptomClassifier()
+prediction_cache = PredictionCache(
+    maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL or None
+)
+
+WARMUP_TEXT = "I have a headache and feel dizzy"
+
+
+def _build_classifier():
+    return get_engine(SYMPTOM_ENGINE, cache=prediction_cache)
+
+
+def _warmup_classifier(model):
+    # One real inference so the first request is not a cold start (uncached,
+    # so it neither fills the prediction cache nor counts as a miss)
+    model.warmup(WARMUP_TEXT)
+
+
+# ClinicalBERT is built in the background (started by app.py) so the app can
+# serve other routes and health checks while the model loads.
+model_loader = BackgroundModelLoader(
+    _build_classifier,
+    warmup=_warmup_classifier,
+    name="symptom_classifier",
+    retries=MODEL_LOAD_RETRIES,
+    retry_delay=MODEL_LOAD_RETRY_DELAY,
+)
+# Coalesces concurrent /api/predict_symptom calls into batched forward passes
+batcher = MicroBatcher(
+    lambda texts: model_loader.get().predict_batch(
+        texts, batch_size=PREDICT_MAX_BATCH_SIZE
+    ),
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    window_ms=PREDICT_BATCH_WINDOW_MS,
+    timeout=PREDICT_TIMEOUT_S,
+)
+
+
+def _model_not_ready_response():
+    """Fast 503 for inference requests while the model is still loading."""
+    response = jsonify(
+        {
+            "error": "Symptom model is not ready yet. Please retry shortly.",
+            **model_loader.status(),
+        }
+    )
+    response.headers["Retry-After"] = "5"
+    return response, 503
 
 
 def _convert_objectid_to_str(doc):
@@ -145,6 +209,36 @@ def get_symptom_predictions(user_id: str):
         return jsonify({"error": f"Failed to fetch predictions: {exc}"}), 500
 
 
+def _prediction_log_doc(user_id, text, result):
+    """Document stored in symptom_predictions for a single prediction."""
+    doc = {
+        "user_id": user_id,
+        "text": text,
+        "predictions": result.get("top_predictions", []),
+        "overall_risk": result.get("overall_risk", "LOW"),
+        "created_at": datetime.utcnow(),
+    }
+    if "symptoms" in result:
+        # Multi-symptom result: every detected symptom, not just the top 3
+        doc["symptoms"] = result["symptoms"]
+        doc["negated_clauses"] = result.get("negated_clauses", [])
+    return doc
+
+
+def _prediction_response(result):
+    """Public response fields for a single prediction."""
+    response = {
+        "predicted_symptom": result["predicted_symptom"],
+        "probability": result["confidence"],
+        "top_predictions": result.get("top_predictions", []),
+        "overall_risk": result.get("overall_risk", "LOW"),
+    }
+    if "window" in result:
+        # Long input classified in overlapping windows
+        response["window"] = result["window"]
+    return response
+
+
 @symptom_bp.route("/api/predict_symptom", methods=["POST"])
 def predict_symptom():
     """
@@ -153,23 +247,169 @@ def predict_symptom():
     try:
         data = request.get_json() or {}
         text = data.get("symptom_text", "")
-        if not text:
+        if not isinstance(text, str) or not text.strip():
             return jsonify({"error": "symptom_text is required"}), 400
+        if not model_loader.is_ready:
+            return _model_not_ready_response()
 
-        result = classifier.predict(text)
+        try:
+            result = batcher.predict(text)
+        except FutureTimeoutError:
+            return jsonify({"error": "Symptom prediction timed out"}), 504
 
         # Optional logging to DB if user_id is provided
         user_id = data.get("user_id")
         if user_id:
             try:
                 db.symptom_predictions.insert_one(
+                    _prediction_log_doc(user_id, text, result)
+                )
+            except Exception:
+                # Don't break the API if logging fails
+                pass
+
+        return jsonify(_prediction_response(result))
+    except ModelNotReadyError:
+        return _model_not_ready_response()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _classify_many(texts):
+    """
+    Classify texts in batched passes, returning a result or an exception
+    per text. If the batched run fails, items are retried one by one so a
+    single bad input cannot fail the rest.
+    """
+    model = model_loader.get()
+    try:
+        return model.predict_batch(texts, batch_size=PREDICT_MAX_BATCH_SIZE)
+    except ModelNotReadyError:
+        raise
+    except Exception:
+        outcomes = []
+        for text in texts:
+            try:
+                outcomes.append(model.predict(text))
+            except Exception as exc:
+                outcomes.append(exc)
+        return outcomes
+
+
+@symptom_bp.route("/api/predict_symptom/batch", methods=["POST"])
+def predict_symptom_batch():
+    """
+    Classify a list of symptom texts in one request.
+    Results are returned in input order, with per-item errors.
+    """
+    try:
+        data = request.get_json() or {}
+        texts = data.get("symptom_texts")
+        if not isinstance(texts, list) or not texts:
+            return jsonify({"error": "symptom_texts must be a non-empty array"}), 400
+        if len(texts) > PREDICT_BATCH_MAX_ITEMS:
+            return (
+                jsonify(
+                    {
+                        "error": f"symptom_texts cannot contain more than "
+                        f"{PREDICT_BATCH_MAX_ITEMS} items"
+                    }
+                ),
+                400,
+            )
+        if not model_loader.is_ready:
+            return _model_not_ready_response()
+
+        results = [None] * len(texts)
+        valid = []
+        for index, text in enumerate(texts):
+            if isinstance(text, str) and text.strip():
+                valid.append(index)
+            else:
+                results[index] = {
+                    "index": index,
+                    "error": "symptom_text must be a non-empty string",
+                }
+
+        outcomes = _classify_many([texts[i] for i in valid]) if valid else []
+
+        log_docs = []
+        user_id = data.get("user_id")
+        for index, outcome in zip(valid, outcomes):
+            if isinstance(outcome, Exception):
+                results[index] = {"index": index, "error": str(outcome)}
+                continue
+            results[index] = {"index": index, **_prediction_response(outcome)}
+            if user_id:
+                log_docs.append(_prediction_log_doc(user_id, texts[index], outcome))
+
+        # Optional logging to DB, one bulk insert for the whole batch
+        if log_docs:
+            try:
+                db.symptom_predictions.insert_many(log_docs, ordered=False)
+            except Exception:
+                # Don't break the API if logging fails
+                pass
+
+        error_count = sum(1 for item in results if "error" in item)
+        return jsonify(
+            {
+                "status": "success",
+                "results": results,
+                "count": len(results),
+                "error_count": error_count,
+            }
+        )
+    except ModelNotReadyError:
+        return _model_not_ready_response()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@symptom_bp.route("/api/predict_symptom/multi", methods=["POST"])
+def predict_symptom_multi():
+    """
+    Detect every symptom in a description ("dizzy since morning, some
+    nausea, and a rash on my arm"). The text is split into clauses that are
+    classified together in one batched pass; negated clauses ("but no
+    fever") are not reported as symptoms.
+    """
+    try:
+        data = request.get_json() or {}
+        text = data.get("symptom_text", "")
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({"error": "symptom_text is required"}), 400
+        if len(text) > PREDICT_MULTI_MAX_CHARS:
+            return (
+                jsonify(
                     {
-                        "user_id": user_id,
-                        "text": text,
-                        "predictions": result.get("top_predictions", []),
-                        "overall_risk": result.get("overall_risk", "LOW"),
-                        "created_at": datetime.utcnow(),
+                        "error": f"symptom_text cannot be longer than "
+                        f"{PREDICT_MULTI_MAX_CHARS} characters"
                     }
+                ),
+                400,
+            )
+        if len(split_clauses(text)) > PREDICT_MULTI_MAX_CLAUSES:
+            return (
+                jsonify(
+                    {
+                        "error": f"symptom_text cannot contain more than "
+                        f"{PREDICT_MULTI_MAX_CLAUSES} clauses"
+                    }
+                ),
+                400,
+            )
+        if not model_loader.is_ready:
+            return _model_not_ready_response()
+
+        result = model_loader.get().extract_symptoms(text)
+
+        # Optional logging to DB if user_id is provided
+        user_id = data.get("user_id")
+        if user_id:
+            try:
+                db.symptom_predictions.insert_one(
+                    _prediction_log_doc(user_id, text, result)
                 )
             except Exception:
                 # Don't break the API if logging fails
@@ -177,12 +417,20 @@ def predict_symptom():
 
         return jsonify(
             {
-                "predicted_symptom": result["predicted_symptom"],
-                "probability": result["confidence"],
-                "top_predictions": result.get("top_predictions", []),
-                "overall_risk": result.get("overall_risk", "LOW"),
+                **_prediction_response(result),
+                "symptoms": result["symptoms"],
+                "negated_clauses": result["negated_clauses"],
             }
         )
+    except ModelNotReadyError:
+        return _model_not_ready_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@symptom_bp.route("/api/predict_symptom/cache", methods=["GET"])
+def predict_symptom_cache_stats():
+    """
+    Prediction cache counters (hits, misses, evictions, hit rate).
+    """
+    return jsonify({"status": "success", "cache": prediction_cache.stats()})
@@ -4,14 +4,16 @@ Integrates ML symptom classification with database operations
 """
 
 from typing import Dict, Optional
-from ml.symptom_classifier import classify_symptom
+from config import SYMPTOM_SERVICE_ENGINE
+from ml.engines import get_engine
 from utils.db import get_db
 from datetime import datetime
 
 
 def analyze_user_symptom(user_id: str, text: str) -> Dict[str, str]:
     """
-    Analyze user symptom text and classify it using ClinicalBERT.
+    Analyze user symptom text and classify it using ClinicalBERT
+    (engine selected by SYMPTOM_SERVICE_ENGINE).
     
     Args:
         user_id: Firebase user ID
@@ -35,7 +37,7 @@ def analyze_user_symptom(user_id: str, text: str) -> Dict[str, str]:
     
     try:
         # Classify symptom using ML model
-        predicted_label = classify_symptom(text)
+        predicted_label = get_engine(SYMPTOM_SERVICE_ENGINE).predict(text)["predicted_symptom"]
         
         return {
             "user_id": user_id,
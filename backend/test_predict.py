@@ -1,4 +1,4 @@
-"""Manual smoke test for /api/predict_symptom endpoint."""
+"""Manual smoke test for /api/predict_symptom endpoints."""
 
 import requests
 
@@ -10,7 +10,26 @@ def main():
     response = requests.post("http://localhost:5000/api/predict_symptom", json=payload, timeout=60)
     print(response.json())
 
+    batch_payload = {
+        "symptom_texts": [
+            "I am feeling very dizzy and lightheaded today",
+            "I have a red rash on my arm",
+            "",
+        ],
+    }
+    response = requests.post(
+        "http://localhost:5000/api/predict_symptom/batch", json=batch_payload, timeout=60
+    )
+    print(response.json())
+
+    multi_payload = {
+        "symptom_text": "dizzy since morning, some nausea, and a rash on my arm",
+    }
+    response = requests.post(
+        "http://localhost:5000/api/predict_symptom/multi", json=multi_payload, timeout=60
+    )
+    print(response.json())
+
 
 if __name__ == "__main__":
     main()
-
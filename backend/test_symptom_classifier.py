@@ -6,8 +6,10 @@ Tests the ML model integration and symptom classification
 import sys
 import os
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Add backend/ (services, utils) and the project root (the `ml` package) to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
 
 from ml.symptom_classifier import classify_symptom, load_model, get_model_info
 from services.symptom_service import analyze_user_symptom, save_prediction_to_db, analyze_and_save
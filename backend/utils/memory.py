@@ -0,0 +1,28 @@
+import os
+
+
+def process_memory(pid=None):
+    """
+    Unique vs shared resident memory (MB) of a process, from
+    /proc/<pid>/smaps_rollup (Linux). Pre-forked workers should show most
+    of the model weights under `shared_mb`.
+    """
+    pid = pid or os.getpid()
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {"pid": pid, "available": False}
+
+    return {
+        "pid": pid,
+        "available": True,
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "unique_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
@@ -0,0 +1,156 @@
+"""Optional TorchScript / torch.compile inference path.
+
+Eager BERT pays Python dispatch overhead on every module call, which is a
+large share of the latency for the short (16-32 token) inputs that
+dominate traffic. With ``COMPILE_MODE=trace`` the classifier is traced and
+frozen with TorchScript; with ``COMPILE_MODE=compile`` it goes through
+``torch.compile`` (dynamic shapes, CPU inductor backend).
+
+The accelerated forward is prepared up front by running every length
+bucket up to the model's maximum length at batch size 1 and at the full
+batch size, so tracing/compilation and shape specialisation happen at load
+time rather than on live requests. Each of those warmup batches is also
+checked against eager mode; if preparation fails or the outputs differ
+(``COMPILE_ATOL`` on logits, or any arg-max change) the eager model is used.
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import torch
+from torch import nn
+
+from ml.tokenization import LENGTH_BUCKETS
+
+
+# "off" (eager), "trace" (TorchScript) or "compile" (torch.compile)
+COMPILE_MODE = os.getenv("COMPILE_MODE", "off").lower()
+COMPILE_MODES = ("off", "trace", "compile")
+COMPILE_ATOL = float(os.getenv("COMPILE_ATOL", "1e-3"))
+
+# Positional order of BertForSequenceClassification.forward
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class _LogitsOnly(nn.Module):
+    """Positional-tensor, logits-only view of a sequence classifier."""
+
+    def __init__(self, model: nn.Module, input_names: Sequence[str]):
+        super().__init__()
+        self.model = model
+        self.input_names = tuple(input_names)
+
+    def forward(self, *tensors):
+        return self.model(**dict(zip(self.input_names, tensors))).logits
+
+
+class AcceleratedForward:
+    """Batch of tokenized inputs -> logits, compiled when possible.
+
+    ``mode`` is the path actually in use ("off" after a fallback).
+    """
+
+    def __init__(
+        self,
+        model: nn.Module,
+        tokenizer,
+        max_length: int,
+        max_batch_size: int = 16,
+        mode: str = COMPILE_MODE,
+        buckets: Sequence[int] = LENGTH_BUCKETS,
+    ):
+        if mode not in COMPILE_MODES:
+            raise ValueError(f"Unknown COMPILE_MODE '{mode}'. Expected one of {COMPILE_MODES}")
+        self.model = model
+        self.mode = "off"
+        self.prepare_seconds = 0.0
+        self.max_abs_diff = 0.0
+        self._compiled = None
+        self._input_names: List[str] = []
+
+        if mode != "off":
+            started = time.perf_counter()
+            try:
+                self._prepare(mode, tokenizer, max_length, max_batch_size, buckets)
+                self.mode = mode
+            except Exception as exc:
+                print(f"⚠️  {mode} inference path unavailable ({exc}); using eager mode")
+                self._compiled = None
+            self.prepare_seconds = time.perf_counter() - started
+
+    @property
+    def accelerated(self) -> bool:
+        return self.mode != "off"
+
+    def _warmup_batches(self, tokenizer, max_length, max_batch_size, buckets):
+        """One padded batch per (bucket length, batch size) served."""
+        lengths = [bound for bound in buckets if bound < max_length] + [max_length]
+        for length in lengths:
+            for batch_size in sorted({1, max_batch_size}):
+                yield tokenizer(
+                    ["symptom " * length] * batch_size,
+                    truncation=True,
+                    max_length=length,
+                    padding="max_length",
+                    return_tensors="pt",
+                )
+
+    def _prepare(self, mode, tokenizer, max_length, max_batch_size, buckets):
+        batches = list(self._warmup_batches(tokenizer, max_length, max_batch_size, buckets))
+        self._input_names = [name for name in _INPUT_NAMES if name in batches[0]]
+        wrapper = _LogitsOnly(self.model, self._input_names).eval()
+
+        with torch.no_grad():
+            example = tuple(batches[0][name] for name in self._input_names)
+            if mode == "trace":
+                traced = torch.jit.trace(wrapper, example, strict=False)
+                self._compiled = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+            else:
+                self._compiled = torch.compile(wrapper, dynamic=True)
+
+            for batch in batches:
+                # Twice: the first call specialises, the second runs optimised
+                self._run_compiled(batch)
+                actual = self._run_compiled(batch)
+                expected = self.model(**batch).logits
+                self._check(expected, actual)
+
+    def _run_compiled(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        return self._compiled(*(inputs[name] for name in self._input_names))
+
+    def _check(self, expected: torch.Tensor, actual: torch.Tensor):
+        diff = float((expected - actual).abs().max())
+        self.max_abs_diff = max(self.max_abs_diff, diff)
+        if diff > COMPILE_ATOL or not torch.equal(expected.argmax(-1), actual.argmax(-1)):
+            raise RuntimeError(f"outputs differ from eager mode (max |diff| {diff:.2e})")
+
+    def __call__(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        with torch.no_grad():
+            if self._compiled is not None and all(n in inputs for n in self._input_names):
+                return self._run_compiled(inputs)
+            return self.model(**inputs).logits
+
+    def info(self) -> Dict[str, object]:
+        return {
+            "compile_mode": self.mode,
+            "prepare_seconds": round(self.prepare_seconds, 3),
+            "max_abs_diff": self.max_abs_diff,
+        }
+
+
+def accelerate(
+    model: nn.Module,
+    tokenizer,
+    max_length: int,
+    max_batch_size: int = 16,
+    mode: Optional[str] = None,
+) -> AcceleratedForward:
+    """Prepare the configured inference path for a sequence classifier."""
+    return AcceleratedForward(
+        model,
+        tokenizer,
+        max_length,
+        max_batch_size=max_batch_size,
+        mode=COMPILE_MODE if mode is None else mode,
+    )
@@ -0,0 +1,112 @@
+"""Micro-batching request coalescer for symptom inference.
+
+Concurrent requests each call ``SymptomClassifier.predict`` with a single
+text, so every request pays for its own tiny forward passes. ``MicroBatcher``
+sits in front of a batch prediction function: callers submit one text and
+block, while a single worker thread collects everything that arrives within
+a short window (or until the batch is full), runs it as one padded batch and
+hands each caller its own result.
+
+If a batched call fails, its items are retried one at a time, so one bad
+input only fails its own caller. Callers wait at most ``timeout`` seconds
+by default, so a stuck worker cannot hang request threads forever.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    """Coalesces single-item predictions into batched calls."""
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[str]], List[Any]],
+        max_batch_size: int = 16,
+        window_ms: float = 5.0,
+        timeout: Optional[float] = 30.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if window_ms < 0:
+            raise ValueError("window_ms cannot be negative")
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.window_s = window_ms / 1000.0
+        # Default wait in predict(); None waits forever
+        self.timeout = timeout
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def _ensure_worker(self):
+        """Start the worker thread lazily (safe across forks and imports)."""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="symptom-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for prediction and return a future for its result."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future
+
+    def predict(self, text: str, timeout: Optional[float] = None) -> Any:
+        """Submit a text and wait for its prediction.
+
+        Raises ``concurrent.futures.TimeoutError`` after ``timeout`` seconds
+        (``self.timeout`` if not given).
+        """
+        return self.submit(text).result(timeout=self.timeout if timeout is None else timeout)
+
+    def _collect(self) -> List[tuple]:
+        """Block for the first item, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _predict(self, texts: List[str]) -> List[Any]:
+        results = self.predict_batch(texts)
+        if len(results) != len(texts):
+            raise RuntimeError(
+                f"predict_batch returned {len(results)} results "
+                f"for {len(texts)} inputs"
+            )
+        return results
+
+    def _run_batch(self, batch: List[tuple]):
+        """Resolve every future of ``batch``; on failure, retry items one by
+        one so only the inputs that fail on their own get the exception."""
+        try:
+            results = self._predict([text for text, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            for item in batch:
+                self._run_batch([item])
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            self._run_batch(self._collect())
@@ -0,0 +1,552 @@
+"""Latency / accuracy benchmarks for the MedAware symptom classifiers.
+
+All comparisons run on the fixed evaluation set in ``ml/symptom_eval.json``
+so results are reproducible between runs and machines.
+
+Usage (from the repository root):
+    python -m ml.benchmark quantization [--mode zero_shot|embedding]
+    python -m ml.benchmark onnx
+    python -m ml.benchmark startup [--runs 3]
+    python -m ml.benchmark hierarchy
+    python -m ml.benchmark compile
+    python -m ml.benchmark early_exit [--thresholds 0.8,0.9,0.95]
+    python -m ml.benchmark threads [--cores 8] [--engine embedding] [--duration 20]
+"""
+
+import argparse
+import copy
+import gc
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import torch
+
+
+EVAL_SET_PATH = os.path.join(os.path.dirname(__file__), "symptom_eval.json")
+
+
+def load_eval_set(path: str = EVAL_SET_PATH) -> List[Dict[str, str]]:
+    """Load the fixed evaluation set as a list of {text, label} dicts."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (Linux), or 0 if unknown."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def state_dict_mb(model: torch.nn.Module) -> float:
+    """Serialized size of a model's weights in MB."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean of per-call latencies, in milliseconds."""
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        "p50_ms": pct(0.50) * 1000,
+        "p95_ms": pct(0.95) * 1000,
+        "p99_ms": pct(0.99) * 1000,
+        "mean_ms": statistics.mean(ordered) * 1000,
+    }
+
+
+def time_predictions(
+    predict: Callable[[str], Any], texts: List[str], warmup: int = 2
+) -> Tuple[List[Any], List[float]]:
+    """Run ``predict`` over texts, returning outputs and per-call latencies."""
+    for text in texts[:warmup]:
+        predict(text)
+    outputs, latencies = [], []
+    for text in texts:
+        started = time.perf_counter()
+        outputs.append(predict(text))
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def accuracy(predicted: List[str], expected: List[str]) -> float:
+    """Fraction of case-insensitive label matches."""
+    hits = sum(p.lower() == e.lower() for p, e in zip(predicted, expected))
+    return hits / len(expected) if expected else 0.0
+
+
+def print_table(rows: List[Dict[str, Any]]):
+    """Print a list of result dicts as an aligned text table."""
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    cells = [
+        [f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns]
+        for row in rows
+    ]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def _int8_copy(classifier):
+    """The same SymptomClassifier instance with int8 copies of its weights.
+
+    Quantizing a copy of the already loaded fp32 model (rather than loading
+    a second classifier) keeps the zero-shot head identical, so the
+    comparison only measures quantization.
+    """
+    from transformers import pipeline
+
+    from ml.cache import PredictionCache
+    from ml.quantization import quantize_dynamic
+
+    int8 = copy.copy(classifier)
+    int8.cache = PredictionCache(maxsize=0)
+    int8.quantized = True
+    if classifier.mode in ("zero_shot", "hierarchical"):
+        int8.classifier = pipeline(
+            "zero-shot-classification",
+            model=quantize_dynamic(copy.deepcopy(classifier.classifier.model)),
+            tokenizer=classifier.tokenizer,
+            device="cpu",
+        )
+    else:
+        int8.encoder = quantize_dynamic(copy.deepcopy(classifier.encoder))
+        int8._encode_labels()
+    return int8
+
+
+def benchmark_quantization(mode: str = "zero_shot"):
+    """Compare fp32 and dynamic int8 SymptomClassifier on the eval set.
+
+    The int8 row quantizes a copy of the fp32 instance, so both rows share
+    the same (possibly randomly initialised) classification head; its
+    ``load_s`` is the time to quantize.
+    """
+    from ml.clinicalbert_service import SymptomClassifier
+
+    eval_set = load_eval_set()
+    texts = [item["text"] for item in eval_set]
+    expected = [item["label"] for item in eval_set]
+
+    rows, reference, fp32_classifier = [], None, None
+    for quantize in (False, True):
+        gc.collect()
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        if quantize:
+            classifier = _int8_copy(fp32_classifier)
+        else:
+            classifier = fp32_classifier = SymptomClassifier(mode=mode, quantize=False)
+        load_s = time.perf_counter() - started
+        rss_delta = rss_mb() - rss_before
+
+        outputs, latencies = time_predictions(classifier.predict, texts)
+        predicted = [o["predicted_symptom"] for o in outputs]
+        if reference is None:
+            reference = predicted
+
+        rows.append(
+            {
+                "precision": "int8" if quantize else "fp32",
+                "accuracy": accuracy(predicted, expected),
+                "agreement_fp32": accuracy(predicted, reference),
+                **latency_summary(latencies),
+                "load_s": load_s,
+                "weights_mb": state_dict_mb(classifier.torch_modules()[0]),
+                "rss_delta_mb": rss_delta,
+            }
+        )
+        del classifier
+
+    print(f"\nQuantization benchmark ({mode}, {len(texts)} examples)")
+    print_table(rows)
+    fp32, int8 = rows
+    print(
+        f"\nint8 speedup (p50): {fp32['p50_ms'] / int8['p50_ms']:.2f}x, "
+        f"accuracy change: {int8['accuracy'] - fp32['accuracy']:+.3f}"
+    )
+    return rows
+
+
+def benchmark_onnx():
+    """Compare eager PyTorch and ONNX Runtime for the fine-tuned model."""
+    from ml import inference
+
+    texts = [item["text"] for item in load_eval_set()]
+    tokenizer = inference._load_tokenizer()
+
+    rows, reference = [], None
+    for backend in ("torch", "onnx"):
+        inference.INFERENCE_BACKEND = backend
+        runtime = inference._load_runtime()
+        outputs, latencies = time_predictions(
+            lambda text: inference._predict_index(tokenizer, runtime, text), texts
+        )
+        if reference is None:
+            reference = outputs
+        agreement = sum(a == b for a, b in zip(outputs, reference)) / len(texts)
+        rows.append(
+            {"backend": backend, "agreement_torch": agreement, **latency_summary(latencies)}
+        )
+
+    print(f"\nInference backend benchmark ({len(texts)} examples)")
+    print_table(rows)
+    return rows
+
+
+def benchmark_compile():
+    """Compare eager, TorchScript and torch.compile for the fine-tuned model."""
+    from ml import inference
+    from ml.acceleration import COMPILE_MODES, AcceleratedForward
+
+    texts = [item["text"] for item in load_eval_set()]
+    tokenizer = inference._load_tokenizer()
+    model = inference._load_model()
+
+    def encode(text):
+        return tokenizer(text, truncation=True, max_length=inference.MAX_LENGTH, return_tensors="pt")
+
+    rows, reference = [], None
+    for mode in COMPILE_MODES:
+        forward = AcceleratedForward(model, tokenizer, inference.MAX_LENGTH, mode=mode)
+        outputs, latencies = time_predictions(
+            lambda text: int(forward(encode(text)).argmax(-1)), texts
+        )
+        if reference is None:
+            reference = outputs
+        rows.append(
+            {
+                "requested": mode,
+                "active": forward.mode,
+                "agreement_eager": accuracy([str(o) for o in outputs], [str(r) for r in reference]),
+                "max_abs_diff": forward.max_abs_diff,
+                "prepare_s": forward.prepare_seconds,
+                **latency_summary(latencies),
+            }
+        )
+
+    print(f"\nCompiled inference benchmark ({len(texts)} examples, batch 1)")
+    print_table(rows)
+    return rows
+
+
+def benchmark_early_exit(thresholds=(0.8, 0.9, 0.95)):
+    """Average exit depth, agreement with the full model and latency."""
+    from ml import inference
+    from ml.early_exit import EarlyExitForward, load_exit_heads
+
+    heads = load_exit_heads(inference.MODEL_DIR)
+    if heads is None:
+        raise FileNotFoundError("No exit heads found. Run `python ml/train.py --early-exit`.")
+
+    texts = [item["text"] for item in load_eval_set()]
+    tokenizer = inference._load_tokenizer()
+    model = inference._load_model()
+
+    def encode(text):
+        return tokenizer(text, truncation=True, max_length=inference.MAX_LENGTH, return_tensors="pt")
+
+    rows, reference = [], None
+    # A threshold above 1 never exits: the full-depth reference
+    for threshold in (1.01, *thresholds):
+        forward = EarlyExitForward(model, heads, threshold)
+        depths = []
+
+        def predict(text):
+            logits, depth = forward.forward_with_depth(encode(text))
+            depths.append(int(depth[0]))
+            return int(logits.argmax(-1))
+
+        outputs, latencies = time_predictions(predict, texts, warmup=0)
+        if reference is None:
+            reference = outputs
+        rows.append(
+            {
+                "threshold": "full" if threshold > 1 else str(threshold),
+                "avg_depth": statistics.mean(depths),
+                "agreement_full": accuracy([str(o) for o in outputs], [str(r) for r in reference]),
+                **latency_summary(latencies),
+            }
+        )
+
+    print(f"\nEarly-exit benchmark ({len(texts)} examples, batch 1)")
+    print_table(rows)
+    return rows
+
+
+def _thread_sweep_worker(engine_name, intra, inter, cores, texts, duration, barrier, results):
+    """One simulated web worker: configure, load, then serve texts in a loop."""
+    from ml.engines import get_engine
+    from ml.runtime import configure_runtime
+
+    configure_runtime(
+        intra_op_threads=intra,
+        inter_op_threads=inter,
+        affinity=",".join(str(core) for core in cores) if cores else "",
+    )
+    engine = get_engine(engine_name)
+    for text in texts[:2]:
+        engine.predict(text)
+
+    barrier.wait()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    index = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        engine.predict(texts[index % len(texts)])
+        latencies.append(time.perf_counter() - started)
+        index += 1
+    results.put(latencies)
+
+
+def _thread_configs(cores: int):
+    """(workers, intra-op threads) pairs that use at most ``cores`` cores."""
+    configs = []
+    workers = 1
+    while workers <= cores:
+        intra = 1
+        while workers * intra <= cores:
+            configs.append((workers, intra))
+            intra *= 2
+        workers *= 2
+    return configs
+
+
+def benchmark_threads(cores: int = 0, engine: str = "embedding", duration: float = 20.0):
+    """Sweep workers x intra-op threads (pinned and unpinned) under load and
+    recommend a setting for ``cores`` cores."""
+    import multiprocessing
+
+    from ml.runtime import available_cores, worker_cores
+
+    available = available_cores()
+    cores = min(cores or len(available), len(available))
+    pool = available[:cores]
+    texts = [item["text"] for item in load_eval_set()]
+    context = multiprocessing.get_context("spawn")
+
+    rows = []
+    for workers, intra in _thread_configs(cores):
+        for pinned in (False, True):
+            barrier = context.Barrier(workers)
+            results = context.Queue()
+            processes = [
+                context.Process(
+                    target=_thread_sweep_worker,
+                    args=(
+                        engine,
+                        intra,
+                        1,
+                        worker_cores(index, intra, pool) if pinned else pool,
+                        texts,
+                        duration,
+                        barrier,
+                        results,
+                    ),
+                )
+                for index in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            latencies = [value for _ in processes for value in results.get()]
+            for process in processes:
+                process.join()
+
+            rows.append(
+                {
+                    "workers": workers,
+                    "intra_threads": intra,
+                    "pinned": pinned,
+                    "throughput_rps": len(latencies) / duration,
+                    **latency_summary(latencies),
+                }
+            )
+            print_table(rows[-1:])
+
+    # Highest throughput among settings whose p99 is within 25% of the best
+    best_p99 = min(row["p99_ms"] for row in rows)
+    candidates = [row for row in rows if row["p99_ms"] <= best_p99 * 1.25]
+    best = max(candidates, key=lambda row: row["throughput_rps"])
+
+    print(f"\nThreading sweep ({engine}, {cores} cores, {duration:.0f}s per setting)")
+    print_table(rows)
+    affinity = "auto" if best["pinned"] else "''"
+    print(
+        f"\nRecommended for {cores} cores: GUNICORN_WORKERS={best['workers']} "
+        f"TORCH_INTRA_OP_THREADS={best['intra_threads']} TORCH_INTER_OP_THREADS=1 "
+        f"CPU_AFFINITY={affinity}"
+    )
+    return rows, best
+
+
+def benchmark_hierarchy():
+    """Compare flat and hierarchical zero-shot on the eval set."""
+    from ml.clinicalbert_service import SymptomClassifier
+    from ml.metrics import metrics
+
+    eval_set = load_eval_set()
+    texts = [item["text"] for item in eval_set]
+    expected = [item["label"] for item in eval_set]
+
+    rows, reference = [], None
+    for mode in ("zero_shot", "hierarchical"):
+        classifier = SymptomClassifier(mode=mode)
+        metrics.reset()
+        outputs, latencies = time_predictions(classifier.predict, texts, warmup=0)
+        pairs = metrics.snapshot()["counters"].get("zero_shot.nli_pairs", 0)
+        predicted = [o["predicted_symptom"] for o in outputs]
+        if reference is None:
+            reference = predicted
+
+        rows.append(
+            {
+                "mode": mode,
+                "accuracy": accuracy(predicted, expected),
+                "agreement_flat": accuracy(predicted, reference),
+                "nli_pairs_per_text": pairs / len(texts),
+                **latency_summary(latencies),
+            }
+        )
+
+    print(f"\nHierarchical zero-shot benchmark ({len(texts)} examples)")
+    print_table(rows)
+    flat, tree = rows
+    disagreements = [
+        (text, a, b) for text, a, b in zip(texts, reference, predicted) if a != b
+    ]
+    for text, a, b in disagreements:
+        print(f"  flat={a!r} hierarchical={b!r}: {text}")
+    print(
+        f"\nNLI passes per text: {flat['nli_pairs_per_text']:.1f} -> "
+        f"{tree['nli_pairs_per_text']:.1f}, agreement with flat: {tree['agreement_flat']:.3f}"
+    )
+    return rows
+
+
+# Runs in a fresh interpreter so every measurement is a real cold start
+_STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+from ml import inference
+from ml.benchmark import rss_mb
+imported = time.perf_counter()
+inference._load_runtime()
+loaded = time.perf_counter()
+inference.classify_symptom("I have a headache and feel dizzy")
+first = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "load_s": loaded - imported,
+    "first_prediction_s": first - started,
+    "rss_mb": rss_mb(),
+}))
+"""
+
+
+def benchmark_startup(runs: int = 3):
+    """Time-to-first-prediction of the fine-tuned model, full load vs mmap."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    rows = []
+    for mmap_weights in ("0", "1"):
+        env = {
+            **os.environ,
+            "MMAP_WEIGHTS": mmap_weights,
+            "INFERENCE_BACKEND": "torch",
+            "QUANTIZE_INT8": "0",
+            "PREDICTION_CACHE_SIZE": "0",
+        }
+        samples = []
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, "-c", _STARTUP_PROBE],
+                cwd=root,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        rows.append(
+            {
+                "loader": "mmap" if mmap_weights == "1" else "from_pretrained",
+                **{
+                    key: statistics.median(sample[key] for sample in samples)
+                    for key in samples[0]
+                },
+            }
+        )
+
+    print(f"\nStartup benchmark (median of {runs} cold starts)")
+    print_table(rows)
+    full, mapped = rows
+    print(
+        f"\nTime to first prediction: {full['first_prediction_s']:.2f}s -> "
+        f"{mapped['first_prediction_s']:.2f}s"
+    )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    quant = commands.add_parser("quantization", help="fp32 vs dynamic int8")
+    quant.add_argument("--mode", default="zero_shot", choices=("zero_shot", "embedding"))
+
+    commands.add_parser("onnx", help="eager PyTorch vs ONNX Runtime")
+
+    startup = commands.add_parser("startup", help="from_pretrained vs mmap cold start")
+    startup.add_argument("--runs", type=int, default=3)
+
+    commands.add_parser("hierarchy", help="flat vs hierarchical zero-shot")
+
+    commands.add_parser("compile", help="eager vs TorchScript vs torch.compile")
+
+    early_exit = commands.add_parser("early_exit", help="early-exit depth vs agreement")
+    early_exit.add_argument("--thresholds", default="0.8,0.9,0.95")
+
+    threads = commands.add_parser("threads", help="workers x threads x pinning sweep")
+    threads.add_argument("--cores", type=int, default=0, help="cores to use (default: all)")
+    threads.add_argument("--engine", default="embedding")
+    threads.add_argument("--duration", type=float, default=20.0, help="seconds per setting")
+
+    args = parser.parse_args()
+    if args.command == "quantization":
+        benchmark_quantization(args.mode)
+    elif args.command == "onnx":
+        benchmark_onnx()
+    elif args.command == "startup":
+        benchmark_startup(args.runs)
+    elif args.command == "hierarchy":
+        benchmark_hierarchy()
+    elif args.command == "compile":
+        benchmark_compile()
+    elif args.command == "threads":
+        benchmark_threads(args.cores, args.engine, args.duration)
+    elif args.command == "early_exit":
+        benchmark_early_exit(tuple(float(t) for t in args.thresholds.split(",") if t))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Bounded in-process cache for symptom predictions.
+
+Patients repeat the same short phrases ("headache", "feeling dizzy"), so
+predictions are cached on a normalised form of the input text. Entries are
+evicted least-recently-used once ``maxsize`` is reached and can optionally
+expire after ``ttl`` seconds. Every lookup carries a ``version`` fingerprint
+of the model and label set; when it changes the cache empties itself so a
+reloaded model never serves stale answers.
+"""
+
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalise case, punctuation and whitespace for cache keys."""
+    text = _PUNCTUATION_RE.sub(" ", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with optional TTL and hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize < 0:
+            raise ValueError("maxsize cannot be negative")
+        self.maxsize = maxsize
+        self.ttl = ttl if ttl else None
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _check_version(self, version: Hashable):
+        """Drop every entry if the model/label fingerprint has changed."""
+        if version != self._version:
+            if self._version is not None and self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, text: str, version: Hashable) -> Optional[Any]:
+        """Return a cached prediction for ``text`` or None on a miss."""
+        if not self.enabled:
+            return None
+        key = normalize_text(text)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, text: str, value: Any, version: Hashable):
+        """Store a prediction, evicting the least recently used entry if full."""
+        if not self.enabled:
+            return
+        key = normalize_text(text)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (copy.deepcopy(value), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and occupancy for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
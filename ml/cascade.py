@@ -0,0 +1,96 @@
+"""Keyword fast-path cascade in front of a transformer engine.
+
+Unambiguous inputs ("I have a rash") are answered by a high-precision
+keyword stage at essentially zero cost; only texts that match no concept,
+several concepts (multi-symptom) or that are long enough to be ambiguous
+are handed to the wrapped engine. The stage only fires on
+``FAST_PATH_KEYWORDS`` phrases; a context word such as "temperature" or
+"heart" is never enough to skip the model. Raising ``threshold`` sends more traffic
+to the model (accuracy), lowering it answers more from rules (throughput).
+
+Routing counters are recorded in ``ml.metrics`` as ``cascade.rules`` and
+``cascade.model``.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from ml.engines import Engine, format_prediction
+from ml.keywords import match_keywords
+from ml.metrics import metrics
+
+
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.9"))
+
+# Confidence of a single-concept keyword match, before adjustments
+RULE_BASE_CONFIDENCE = 0.92
+# Each extra keyword match for the same concept adds this much (up to 0.99)
+RULE_EXTRA_HIT_BONUS = 0.03
+# Texts longer than this many words lose confidence per extra word, since
+# long narratives are more likely to mention things outside the vocabulary
+RULE_SHORT_TEXT_WORDS = 8
+RULE_LENGTH_PENALTY = 0.02
+
+
+def rule_prediction(text: str, labels: List[str]) -> Tuple[Optional[str], float]:
+    """Keyword-stage answer for ``text`` as (label, confidence).
+
+    Returns (None, 0.0) unless exactly one concept matches a fast-path
+    phrase and the broader vocabulary finds no other concept ("a headache
+    and my heart is racing" goes to the model). Negated mentions ("no
+    fever") do not count as matches.
+    """
+    hits = match_keywords(text, labels, fast_path=True)
+    if len(hits) != 1:
+        return None, 0.0
+
+    label, score = next(iter(hits.items()))
+    if set(match_keywords(text, labels)) - {label}:
+        return None, 0.0
+    confidence = min(0.99, RULE_BASE_CONFIDENCE + RULE_EXTRA_HIT_BONUS * (score - 1))
+    extra_words = max(0, len(text.split()) - RULE_SHORT_TEXT_WORDS)
+    confidence -= RULE_LENGTH_PENALTY * extra_words
+    return label, max(confidence, 0.0)
+
+
+class CascadeEngine(Engine):
+    """Answers confident keyword matches directly, forwards the rest."""
+
+    def __init__(self, inner: Engine, threshold: float = CASCADE_THRESHOLD):
+        super().__init__()
+        self.inner = inner
+        self.threshold = threshold
+        self.name = f"cascade:{inner.name}"
+
+    @property
+    def labels(self) -> List[str]:
+        return self.inner.labels
+
+    def risk_of(self, label: str) -> str:
+        return self.inner.risk_of(label)
+
+    def _predict_uncached(self, texts: List[str], batch_size: int) -> List[Dict]:
+        results: List[Optional[Dict]] = [None] * len(texts)
+        forwarded = []
+        for index, text in enumerate(texts):
+            label, confidence = rule_prediction(text, self.labels)
+            if label is not None and confidence >= self.threshold:
+                result = format_prediction([label], [confidence], self.risk_of)
+                results[index] = {**result, "stage": "rules"}
+            else:
+                forwarded.append(index)
+
+        if forwarded:
+            outputs = self.inner.predict_batch([texts[i] for i in forwarded], batch_size)
+            for index, output in zip(forwarded, outputs):
+                results[index] = {**output, "stage": "model"}
+
+        metrics.incr("cascade.rules", len(texts) - len(forwarded))
+        metrics.incr("cascade.model", len(forwarded))
+        return results
+
+    def cache_version(self):
+        return ("cascade", self.threshold, self.inner.cache_version())
+
+    def torch_modules(self):
+        return self.inner.torch_modules()
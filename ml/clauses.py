@@ -0,0 +1,52 @@
+"""Clause splitting for multi-symptom descriptions.
+
+"dizzy since morning, some nausea, and a rash on my arm" mentions three
+symptoms, but a single classification returns one label for the whole
+string. Splitting on punctuation and coordinating words gives one clause
+per mention, and the clauses are then classified together in one batch
+(``Engine.extract_symptoms``).
+
+Splitting cuts a clause away from any negation before it ("a headache but
+no fever" -> "no fever"), and a classifier given "no fever" on its own
+still answers Fever. Clauses whose symptom keywords are all negated are
+therefore set aside before classification (``affirmed_clauses``), using the
+``ml.keywords`` negation scope. Clauses with no keyword at all ("I don't
+feel well") are always classified.
+"""
+
+import re
+from typing import List, Tuple
+
+from ml.keywords import is_negated
+
+
+# Clause boundaries: sentence/list punctuation and coordinating words
+_CLAUSE_BOUNDARY = re.compile(
+    r"[.;,!?\n]+|\b(?:and|but|also|plus|as well as|along with|together with|then)\b",
+    re.IGNORECASE,
+)
+# Fragments shorter than this many letters ("a", "my") are not clauses
+MIN_CLAUSE_LETTERS = 3
+
+
+def split_clauses(text: str) -> List[str]:
+    """Split a description into symptom clauses (the whole text if none)."""
+    clauses = []
+    for part in _CLAUSE_BOUNDARY.split(text):
+        part = part.strip(" \t-:")
+        if sum(ch.isalpha() for ch in part) >= MIN_CLAUSE_LETTERS:
+            clauses.append(part)
+    return clauses or [text.strip()]
+
+
+def affirmed_clauses(text: str) -> Tuple[List[str], List[str]]:
+    """Split a description into ``(affirmed, negated)`` clauses.
+
+    "I have a headache but no fever" -> (["I have a headache"], ["no fever"]).
+    A clause is negated only if it has a keyword match and every match is
+    negated.
+    """
+    affirmed, negated = [], []
+    for clause in split_clauses(text):
+        (negated if is_negated(clause) else affirmed).append(clause)
+    return affirmed, negated
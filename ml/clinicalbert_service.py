@@ -1,20 +1,92 @@
-"""Zero-shot ClinicalBERT symptom classifier service."""
+"""Zero-shot ClinicalBERT symptom classifier service.
 
+Three scoring modes are available:
+
+- ``zero_shot``: HuggingFace NLI pipeline, one premise/hypothesis pass per
+  candidate label (the original behaviour).
+- ``embedding``: the label set is encoded once at startup and each symptom
+  is scored with a single encoder pass plus a cosine similarity against the
+  cached label matrix.
+- ``hierarchical``: zero-shot over a label tree (``ml/label_tree.json`` or
+  ``SYMPTOM_LABEL_TREE``). Coarse groups are scored first and only the fine
+  labels of the best group(s) get an NLI pass, so the cost grows with the
+  number of groups plus one group's size instead of with the label count.
+  Compare against flat zero-shot with ``python -m ml.benchmark hierarchy``.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import torch
 from transformers import pipeline
 
+from ml.cache import PredictionCache
+from ml.engines import (
+    Engine,
+    format_prediction,
+    get_backbone,
+    get_sequence_classifier,
+    get_tokenizer,
+)
+from ml.metrics import metrics
+from ml.quantization import QUANTIZE_ENABLED
+from ml.tokenization import length_groups
 
-class SymptomClassifier:
-    """Wraps HuggingFace zero-shot pipeline for symptom classification."""
 
-    def __init__(self):
-        model_name = "emilyalsentzer/Bio_ClinicalBERT"
-        # Zero-shot classification pipeline
-        self.classifier = pipeline(
-            "zero-shot-classification",
-            model=model_name,
-            tokenizer=model_name,
-            device="cpu",
-        )
+MODEL_NAME = "emilyalsentzer/Bio_ClinicalBERT"
+SCORING_MODES = ("zero_shot", "embedding", "hierarchical")
+
+# NLI hypothesis per candidate label (the pipeline's default template)
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+# Embedding mode settings
+LABEL_TEMPLATE = "The patient reports {}."
+EMBEDDING_MAX_LENGTH = int(os.getenv("EMBEDDING_MAX_LENGTH", "128"))
+# Similarities are squashed through a softmax at this temperature so that
+# `confidence` stays a probability, like in zero-shot mode.
+EMBEDDING_TEMPERATURE = 0.05
+
+# Hierarchical mode settings: groups are taken best-first until they hold
+# HIERARCHY_GROUP_MASS of the coarse probability or HIERARCHY_TOP_GROUPS
+# groups are selected
+LABEL_TREE_PATH = os.getenv(
+    "SYMPTOM_LABEL_TREE", os.path.join(os.path.dirname(__file__), "label_tree.json")
+)
+HIERARCHY_TOP_GROUPS = int(os.getenv("HIERARCHY_TOP_GROUPS", "2"))
+HIERARCHY_GROUP_MASS = float(os.getenv("HIERARCHY_GROUP_MASS", "0.8"))
+
+
+def load_label_tree(path: str = LABEL_TREE_PATH) -> Dict[str, List[str]]:
+    """Load the {coarse group: [fine labels]} tree for hierarchical mode."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SymptomClassifier(Engine):
+    """Wraps ClinicalBERT for symptom classification.
+
+    Weights and tokenizer come from the shared engine registry, so several
+    classifiers (or modes) in one process reuse the same backbone.
+    """
+
+    def __init__(
+        self,
+        mode: str = "zero_shot",
+        cache: Optional[PredictionCache] = None,
+        quantize: bool = QUANTIZE_ENABLED,
+        label_tree: Optional[Dict[str, List[str]]] = None,
+    ):
+        if mode not in SCORING_MODES:
+            raise ValueError(
+                f"Unknown scoring mode '{mode}'. Expected one of {SCORING_MODES}"
+            )
+        super().__init__(cache)
+        self.mode = mode
+        self.name = mode
+        self.model_name = MODEL_NAME
+        self.quantized = quantize
+
         # Symptom categories the model will choose from (more clinically-focused)
         self.labels = [
             "dizziness",
@@ -43,30 +115,194 @@ class SymptomClassifier:
             "nausea": "LOW",
         }
 
-    def predict(self, text: str):
-        """Return predicted symptom label with confidence.
+        # Coarse groups for hierarchical mode
+        self.label_tree = label_tree if label_tree is not None else (
+            load_label_tree() if mode == "hierarchical" else {}
+        )
+
+        self.tokenizer = get_tokenizer(self.model_name)
+        if mode in ("zero_shot", "hierarchical"):
+            # Zero-shot classification pipeline (NLI head on the shared backbone)
+            self.classifier = pipeline(
+                "zero-shot-classification",
+                model=get_sequence_classifier(self.model_name, quantize=quantize),
+                tokenizer=self.tokenizer,
+                device="cpu",
+            )
+        else:
+            self.encoder = get_backbone(self.model_name, quantize=quantize)
+            self._encode_labels()
+
+    def torch_modules(self) -> List[torch.nn.Module]:
+        """The torch modules holding this classifier's weights."""
+        if self.mode in ("zero_shot", "hierarchical"):
+            return [self.classifier.model]
+        return [self.encoder]
+
+    def _encode(self, texts: List[str]) -> torch.Tensor:
+        """Mean-pool the last hidden state into L2-normalised sentence vectors."""
+        inputs = self.tokenizer(
+            texts,
+            truncation=True,
+            max_length=EMBEDDING_MAX_LENGTH,
+            padding=True,
+            return_tensors="pt",
+        )
+        with torch.no_grad():
+            hidden = self.encoder(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+        return torch.nn.functional.normalize(pooled, dim=-1)
+
+    def _encode_labels(self):
+        """Encode the label set once and cache the resulting matrix."""
+        self._label_matrix = self._encode(
+            [LABEL_TEMPLATE.format(label) for label in self.labels]
+        )
+        self._encoded_labels = tuple(self.labels)
+
+    def cache_version(self):
+        """Fingerprint of the loaded model and label set for cache invalidation."""
+        model = self.torch_modules()[0]
+        return (
+            self.mode,
+            self.model_name,
+            self.quantized,
+            id(model),
+            tuple(self.labels),
+            tuple(sorted(self.risk_map.items())),
+            tuple((group, tuple(labels)) for group, labels in self.label_tree.items()),
+        )
+
+    def _predict_uncached(self, texts: List[str], batch_size: int):
+        """Run the configured scoring mode over ``texts``.
+
+        Texts are scored one length bucket at a time, so each padded batch
+        holds inputs of similar length, then results are put back in input
+        order.
+        """
+        max_length = (
+            EMBEDDING_MAX_LENGTH if self.mode == "embedding" else self.tokenizer.model_max_length
+        )
+        groups, lengths = length_groups(self.tokenizer, texts, max_length)
+        if self.mode == "embedding":
+            # The encoder runs exactly these (zero-shot pairs are recorded
+            # in _zero_shot)
+            for length in lengths:
+                metrics.observe("effective_seq_length", length)
+
+        outputs = [None] * len(texts)
+        for group in groups:
+            group_texts = [texts[i] for i in group]
+            if self.mode == "embedding":
+                results = self._predict_batch_embedding(group_texts, batch_size)
+            elif self.mode == "hierarchical":
+                results = self._predict_batch_hierarchical(group_texts, batch_size)
+            else:
+                results = [
+                    self._format_result(result["labels"], result["scores"])
+                    for result in self._zero_shot(group_texts, self.labels, batch_size)
+                ]
+            for index, result in zip(group, results):
+                outputs[index] = result
+        return outputs
 
-        Note: This is zero-shot, so treat results as suggestions, not diagnoses.
+    def _zero_shot(self, texts: List[str], labels: List[str], batch_size: int):
+        """NLI pipeline over ``texts`` x ``labels`` (one pass per pair).
+
+        Every pair's premise + hypothesis length (what the model actually
+        runs) is recorded as ``effective_seq_length``.
         """
-        result = self.classifier(text, self.labels)
-        labels = result["labels"]
-        scores = [float(s) for s in result["scores"]]
-
-        top_predictions = []
-        highest_risk = "LOW"
-        risk_rank = {"LOW": 1, "MEDIUM": 2, "HIGH": 3}
-
-        for label, score in list(zip(labels, scores))[:3]:
-            label_lower = label.lower()
-            risk = self.risk_map.get(label_lower, "LOW")
-            top_predictions.append({"label": label, "score": score, "risk": risk})
-            if risk_rank[risk] > risk_rank[highest_risk]:
-                highest_risk = risk
-
-        return {
-            "predicted_symptom": labels[0],
-            "confidence": scores[0],
-            "top_predictions": top_predictions,
-            "overall_risk": highest_risk,
+        metrics.incr("zero_shot.nli_pairs", len(texts) * len(labels))
+        premises = [text for text in texts for _ in labels]
+        hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for _ in texts for label in labels]
+        encoded = self.tokenizer(premises, hypotheses, truncation="only_first")
+        for ids in encoded["input_ids"]:
+            metrics.observe("effective_seq_length", len(ids))
+
+        results = self.classifier(
+            texts, labels, hypothesis_template=HYPOTHESIS_TEMPLATE, batch_size=batch_size
+        )
+        return [results] if isinstance(results, dict) else results
+
+    def _label_groups(self) -> Dict[str, List[str]]:
+        """The label tree restricted to ``self.labels``; labels missing from
+        the tree become single-label groups."""
+        known = set(self.labels)
+        groups = {
+            group: [label for label in labels if label in known]
+            for group, labels in self.label_tree.items()
         }
+        groups = {group: labels for group, labels in groups.items() if labels}
+        grouped = {label for labels in groups.values() for label in labels}
+        for label in self.labels:
+            if label not in grouped:
+                groups[label] = [label]
+        return groups
+
+    def _predict_batch_hierarchical(self, texts: List[str], batch_size: int):
+        """Score coarse groups, then only the fine labels of the best groups."""
+        groups = self._label_groups()
+        coarse = self._zero_shot(texts, list(groups), batch_size)
+
+        selections = []
+        for result in coarse:
+            chosen, mass = [], 0.0
+            for group, score in zip(result["labels"], result["scores"]):
+                chosen.append((group, score))
+                mass += score
+                if mass >= HIERARCHY_GROUP_MASS or len(chosen) >= HIERARCHY_TOP_GROUPS:
+                    break
+            selections.append(chosen)
+
+        # Texts that selected the same candidate labels share one fine pass
+        pending: Dict[tuple, List[int]] = {}
+        for index, chosen in enumerate(selections):
+            candidates = tuple(label for group, _ in chosen for label in groups[group])
+            if len(candidates) > 1:
+                pending.setdefault(candidates, []).append(index)
+
+        fine: Dict[int, Dict[str, float]] = {}
+        for candidates, indices in pending.items():
+            results = self._zero_shot(
+                [texts[i] for i in indices], list(candidates), batch_size
+            )
+            for index, result in zip(indices, results):
+                fine[index] = dict(zip(result["labels"], result["scores"]))
+
+        outputs = []
+        for index, chosen in enumerate(selections):
+            # A lone candidate label keeps its group's probability
+            scores = fine.get(index) or {groups[chosen[0][0]][0]: chosen[0][1]}
+            ranked = sorted(scores.items(), key=lambda item: -item[1])
+            outputs.append(
+                self._format_result([label for label, _ in ranked], [s for _, s in ranked])
+            )
+        return outputs
+
+    def _predict_batch_embedding(self, texts: List[str], batch_size: int):
+        """Score texts against the cached label matrix (one pass per batch)."""
+        if self._encoded_labels != tuple(self.labels):
+            self._encode_labels()
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            vectors = self._encode(texts[start : start + batch_size])
+            similarities = vectors @ self._label_matrix.T
+            probs = torch.softmax(similarities / EMBEDDING_TEMPERATURE, dim=-1)
+            for row in probs:
+                scores, indices = torch.sort(row, descending=True)
+                outputs.append(
+                    self._format_result(
+                        [self.labels[i] for i in indices.tolist()],
+                        scores.tolist(),
+                    )
+                )
+        return outputs
+
+    def risk_of(self, label: str) -> str:
+        return self.risk_map.get(label.lower(), "LOW")
 
+    def _format_result(self, labels, scores):
+        """Build the response shape shared by every scoring path."""
+        return format_prediction(labels, scores, self.risk_of)
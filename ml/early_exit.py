@@ -0,0 +1,144 @@
+"""Layer-wise early exit for the fine-tuned classifier.
+
+``python ml/train.py --early-exit`` trains small classifier heads on the
+[CLS] state after some intermediate encoder layers (the fine-tuned model
+itself stays frozen) and saves them to ``ml/model/exit_heads.pt``. At
+inference time the encoder runs layer by layer; after each exit layer,
+rows whose exit-head confidence reaches ``EARLY_EXIT_THRESHOLD`` are
+answered and dropped from the batch, so obvious inputs ("Rash") stop after
+a few layers and only hard ones pay for all twelve.
+
+Exit depths are recorded in ``ml.metrics`` as ``early_exit.depth``;
+``python -m ml.benchmark early_exit`` reports average depth, agreement with
+the full model and latency per threshold.
+"""
+
+import os
+from typing import Dict, Optional, Sequence
+
+import torch
+from torch import nn
+
+from ml.metrics import metrics
+
+
+# 0 disables early exit; otherwise the softmax confidence needed to stop
+EARLY_EXIT_THRESHOLD = float(os.getenv("EARLY_EXIT_THRESHOLD", "0"))
+EXIT_HEADS_FILE = "exit_heads.pt"
+# Encoder layers (1-based) that get an exit head
+DEFAULT_EXIT_LAYERS = (3, 6, 9)
+
+
+def exit_heads_path(model_dir: str) -> str:
+    return os.path.join(model_dir, EXIT_HEADS_FILE)
+
+
+def build_exit_heads(hidden_size: int, num_labels: int, layers: Sequence[int]) -> nn.ModuleDict:
+    """One pooler-plus-classifier sized head per exit layer."""
+    return nn.ModuleDict(
+        {
+            str(layer): nn.Sequential(
+                nn.Linear(hidden_size, hidden_size),
+                nn.Tanh(),
+                nn.Linear(hidden_size, num_labels),
+            )
+            for layer in layers
+        }
+    )
+
+
+def save_exit_heads(heads: nn.ModuleDict, path: str):
+    first = next(iter(heads.values()))
+    torch.save(
+        {
+            "layers": [int(layer) for layer in heads.keys()],
+            "hidden_size": first[0].in_features,
+            "num_labels": first[-1].out_features,
+            "state_dict": heads.state_dict(),
+        },
+        path,
+    )
+
+
+def load_exit_heads(model_dir: str) -> Optional[nn.ModuleDict]:
+    """Exit heads saved next to a fine-tuned model, or None."""
+    path = exit_heads_path(model_dir)
+    if not os.path.exists(path):
+        return None
+    saved = torch.load(path, map_location="cpu", weights_only=True)
+    heads = build_exit_heads(saved["hidden_size"], saved["num_labels"], saved["layers"])
+    heads.load_state_dict(saved["state_dict"])
+    heads.eval()
+    return heads
+
+
+class EarlyExitForward:
+    """Batch of tokenized inputs -> logits, exiting confident rows early."""
+
+    def __init__(self, model: nn.Module, heads: nn.ModuleDict, threshold: float = EARLY_EXIT_THRESHOLD):
+        self.model = model
+        self.base = getattr(model, model.base_model_prefix)
+        self.heads = heads
+        self.threshold = threshold
+        self.num_layers = len(self.base.encoder.layer)
+
+    def __call__(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        return self.forward_with_depth(inputs)[0]
+
+    def forward_with_depth(self, inputs: Dict[str, torch.Tensor]):
+        """Logits and exit depth (number of encoder layers run) per row."""
+        input_ids = inputs["input_ids"]
+        batch_size = input_ids.shape[0]
+        with torch.no_grad():
+            hidden = self.base.embeddings(
+                input_ids=input_ids, token_type_ids=inputs.get("token_type_ids")
+            )
+            mask = self.base.get_extended_attention_mask(
+                inputs["attention_mask"], input_ids.shape
+            )
+
+            logits = None
+            depth = torch.full((batch_size,), self.num_layers, dtype=torch.long)
+            active = torch.arange(batch_size)
+            for index, layer in enumerate(self.base.encoder.layer, start=1):
+                hidden = layer(hidden, attention_mask=mask)[0]
+                head = self.heads[str(index)] if str(index) in self.heads else None
+                if head is None or index == self.num_layers:
+                    continue
+
+                exit_logits = head(hidden[:, 0])
+                done = torch.softmax(exit_logits, dim=-1).max(dim=-1).values >= self.threshold
+                if not done.any():
+                    continue
+                if logits is None:
+                    logits = exit_logits.new_empty((batch_size, exit_logits.shape[-1]))
+                logits[active[done]] = exit_logits[done]
+                depth[active[done]] = index
+
+                keep = ~done
+                active, hidden, mask = active[keep], hidden[keep], mask[keep]
+                if active.numel() == 0:
+                    break
+
+            if active.numel():
+                final = self.model.classifier(self.base.pooler(hidden))
+                if logits is None:
+                    logits = final.new_empty((batch_size, final.shape[-1]))
+                logits[active] = final
+
+        for value in depth.tolist():
+            metrics.observe("early_exit.depth", value)
+        return logits, depth
+
+
+def early_exit_forward(
+    model: nn.Module, model_dir: str, threshold: float = EARLY_EXIT_THRESHOLD
+) -> Optional[EarlyExitForward]:
+    """Early-exit forward for a model if enabled and its heads exist."""
+    if threshold <= 0:
+        return None
+    heads = load_exit_heads(model_dir)
+    if heads is None:
+        print(f"⚠️  EARLY_EXIT_THRESHOLD set but no exit heads in {model_dir}")
+        return None
+    return EarlyExitForward(model, heads, threshold)
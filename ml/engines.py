@@ -0,0 +1,456 @@
+"""Process-wide registry of symptom classification engines.
+
+MedAware has several ways to classify a symptom (zero-shot NLI, label
+embeddings, the fine-tuned ./ml/model and the 10-way ClinicalBERT head in
+ml/symptom_classifier.py). They all sit on the same ~420 MB backbone, so
+this module loads every tokenizer and backbone at most once per process and
+lets the classification heads share it.
+
+Every engine exposes the same interface::
+
+    engine = get_engine("zero_shot", cache=PredictionCache())
+    engine.predict(text)           # -> prediction dict
+    engine.predict_batch(texts)    # -> list of prediction dicts
+    engine.extract_symptoms(text)  # -> prediction dict + every clause symptom
+
+where a prediction dict has ``predicted_symptom``, ``confidence``,
+``top_predictions`` and ``overall_risk`` (the /api/predict_symptom shape).
+Callers pick the engine name (backend/config.py reads it from
+SYMPTOM_ENGINE) and, optionally, their own prediction cache.
+"""
+
+import copy
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import torch
+from torch import nn
+from transformers import (
+    AutoConfig,
+    AutoModel,
+    AutoModelForSequenceClassification,
+    AutoTokenizer,
+)
+
+from ml.cache import PredictionCache
+from ml.clauses import affirmed_clauses
+from ml.quantization import QUANTIZE_ENABLED, artifact_path, load_or_quantize
+from ml.runtime import ensure_runtime_configured
+from ml.weights import MMAP_ENABLED, has_safetensors, sequence_classifier_from_mmap
+
+
+RISK_RANK = {"LOW": 1, "MEDIUM": 2, "HIGH": 3}
+# Clause predictions below this confidence are not reported as symptoms
+# (the best clause is always kept)
+MULTI_SYMPTOM_MIN_SCORE = float(os.getenv("MULTI_SYMPTOM_MIN_SCORE", "0.3"))
+
+_lock = threading.RLock()
+_tokenizers: Dict[str, Any] = {}
+_backbones: Dict[tuple, nn.Module] = {}
+_heads: Dict[tuple, nn.Module] = {}
+_engines: Dict[str, "Engine"] = {}
+# Engines bound to a caller's cache, keyed by (name, id(cache)); each view
+# holds its cache, so the id stays valid
+_cached_engines: Dict[tuple, "Engine"] = {}
+ENGINE_FACTORIES: Dict[str, Callable[[], "Engine"]] = {}
+
+
+# ---------------------------------------------------------------------------
+# Shared components
+# ---------------------------------------------------------------------------
+
+def get_tokenizer(name_or_path: str):
+    """Load a tokenizer once per process."""
+    with _lock:
+        if name_or_path not in _tokenizers:
+            _tokenizers[name_or_path] = AutoTokenizer.from_pretrained(name_or_path)
+        return _tokenizers[name_or_path]
+
+
+def get_backbone(name_or_path: str, quantize: Optional[bool] = None) -> nn.Module:
+    """Load the bare encoder (e.g. BertModel) once per process."""
+    ensure_runtime_configured()
+    quantize = QUANTIZE_ENABLED if quantize is None else quantize
+    key = (name_or_path, quantize)
+    with _lock:
+        if key not in _backbones:
+            print(f"Loading backbone: {name_or_path}{' (int8)' if quantize else ''}")
+            if quantize:
+                model = load_or_quantize(
+                    lambda: AutoModel.from_pretrained(name_or_path),
+                    lambda: AutoModel.from_config(AutoConfig.from_pretrained(name_or_path)),
+                    name_or_path,
+                    path=artifact_path(name_or_path, suffix="-encoder"),
+                )
+            else:
+                model = AutoModel.from_pretrained(name_or_path)
+            model.eval()
+            model.to("cpu")
+            _backbones[key] = model
+        return _backbones[key]
+
+
+def _has_trained_head(name_or_path: str) -> bool:
+    """True for checkpoints saved with a sequence-classification head."""
+    if not os.path.isdir(name_or_path):
+        return False
+    config = AutoConfig.from_pretrained(name_or_path)
+    return any(
+        arch.endswith("ForSequenceClassification")
+        for arch in (getattr(config, "architectures", None) or [])
+    )
+
+
+def _head_on_shared_backbone(name_or_path: str, num_labels: int, quantize: bool):
+    """Build a sequence classifier whose encoder is the shared backbone.
+
+    The wrapper is created on the meta device (no weights allocated), its
+    encoder is swapped for the shared backbone and only the small, randomly
+    initialised classification head is materialised.
+    """
+    config = AutoConfig.from_pretrained(name_or_path, num_labels=num_labels)
+    with torch.device("meta"):
+        model = AutoModelForSequenceClassification.from_config(config)
+    setattr(model, model.base_model_prefix, get_backbone(name_or_path, quantize))
+
+    head = nn.Linear(config.hidden_size, num_labels)
+    head.weight.data.normal_(mean=0.0, std=config.initializer_range)
+    head.bias.data.zero_()
+    model.classifier = head
+
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        raise RuntimeError(f"Unsupported head layout for {name_or_path}")
+    return model
+
+
+def _load_trained(model_dir: str) -> nn.Module:
+    """Load a fine-tuned checkpoint, memory-mapping safetensors weights."""
+    if MMAP_ENABLED and has_safetensors(model_dir):
+        try:
+            return sequence_classifier_from_mmap(model_dir)
+        except Exception as exc:
+            print(f"⚠️  Could not memory-map {model_dir} ({exc}); loading a full copy")
+    return AutoModelForSequenceClassification.from_pretrained(model_dir)
+
+
+def get_sequence_classifier(
+    name_or_path: str, num_labels: int = 2, quantize: Optional[bool] = None
+) -> nn.Module:
+    """Load a sequence classifier once per process, sharing its backbone.
+
+    Checkpoints with a trained head (e.g. ./ml/model) are loaded whole
+    (memory-mapped when saved as safetensors) and their encoder is
+    registered as the backbone for that path. Otherwise a fresh
+    ``num_labels`` head is put on the shared backbone.
+    """
+    ensure_runtime_configured()
+    quantize = QUANTIZE_ENABLED if quantize is None else quantize
+    trained = _has_trained_head(name_or_path)
+    key = (name_or_path, None if trained else num_labels, quantize)
+    with _lock:
+        if key in _heads:
+            return _heads[key]
+
+        if trained:
+            if quantize:
+                model = load_or_quantize(
+                    lambda: AutoModelForSequenceClassification.from_pretrained(name_or_path),
+                    lambda: AutoModelForSequenceClassification.from_config(
+                        AutoConfig.from_pretrained(name_or_path)
+                    ),
+                    name_or_path,
+                    path=os.path.join(name_or_path, "model-int8.pt"),
+                )
+            else:
+                model = _load_trained(name_or_path)
+            backbone_key = (name_or_path, quantize)
+            if backbone_key in _backbones:
+                # Same weights already resident: drop the duplicate encoder
+                setattr(model, model.base_model_prefix, _backbones[backbone_key])
+            else:
+                _backbones[backbone_key] = getattr(model, model.base_model_prefix)
+        else:
+            try:
+                model = _head_on_shared_backbone(name_or_path, num_labels, quantize)
+            except Exception as exc:
+                print(f"⚠️  Could not share backbone ({exc}); loading a full copy")
+                model = AutoModelForSequenceClassification.from_pretrained(
+                    name_or_path, num_labels=num_labels
+                )
+
+        model.eval()
+        model.to("cpu")
+        _heads[key] = model
+        return model
+
+
+# ---------------------------------------------------------------------------
+# Engines
+# ---------------------------------------------------------------------------
+
+def format_prediction(
+    labels: Sequence[str], scores: Sequence[float], risk_of: Callable[[str], str]
+) -> Dict[str, Any]:
+    """Build the shared prediction shape from labels ranked by score."""
+    scores = [float(s) for s in scores]
+
+    top_predictions = []
+    highest_risk = "LOW"
+    for label, score in list(zip(labels, scores))[:3]:
+        risk = risk_of(label)
+        top_predictions.append({"label": label, "score": score, "risk": risk})
+        if RISK_RANK[risk] > RISK_RANK[highest_risk]:
+            highest_risk = risk
+
+    return {
+        "predicted_symptom": labels[0],
+        "confidence": scores[0],
+        "top_predictions": top_predictions,
+        "overall_risk": highest_risk,
+    }
+
+
+def merge_clause_predictions(
+    clauses: Sequence[str],
+    predictions: Sequence[Dict[str, Any]],
+    risk_of: Callable[[str], str],
+    min_score: float = MULTI_SYMPTOM_MIN_SCORE,
+) -> Dict[str, Any]:
+    """Combine per-clause predictions into one multi-symptom prediction.
+
+    Each label is reported once, with the best score of the clauses that
+    predicted it; ``overall_risk`` is the highest risk across all of them.
+    With no clauses (everything was negated) no symptom is reported.
+    """
+    if not clauses:
+        return {
+            "predicted_symptom": None,
+            "confidence": 0.0,
+            "top_predictions": [],
+            "overall_risk": "LOW",
+            "symptoms": [],
+        }
+
+    symptoms: Dict[str, Dict[str, Any]] = {}
+    for clause, prediction in zip(clauses, predictions):
+        label, score = prediction["predicted_symptom"], prediction["confidence"]
+        entry = symptoms.setdefault(
+            label, {"label": label, "score": score, "risk": risk_of(label), "clauses": []}
+        )
+        entry["score"] = max(entry["score"], score)
+        entry["clauses"].append(clause)
+
+    ranked = sorted(symptoms.values(), key=lambda entry: -entry["score"])
+    detected = [entry for entry in ranked if entry["score"] >= min_score] or ranked[:1]
+
+    result = format_prediction(
+        [entry["label"] for entry in detected],
+        [entry["score"] for entry in detected],
+        risk_of,
+    )
+    result["overall_risk"] = max(
+        (entry["risk"] for entry in detected), key=RISK_RANK.__getitem__
+    )
+    result["symptoms"] = detected
+    return result
+
+
+class Engine(ABC):
+    """Base class: cache-aware ``predict``/``predict_batch`` over a model.
+
+    Subclasses implement ``_predict_uncached`` and ``cache_version``, and
+    usually ``torch_modules`` and ``risk_of``.
+    """
+
+    name = "base"
+    # Label names this engine can predict
+    labels: List[str] = []
+
+    def __init__(self, cache: Optional[PredictionCache] = None):
+        # Predictions keyed on normalised text; disabled with maxsize=0
+        self.cache = cache if cache is not None else PredictionCache(maxsize=0)
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        """Classify a single text."""
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts: List[str], batch_size: int = 16) -> List[Dict[str, Any]]:
+        """Classify several texts in padded batches, preserving input order.
+
+        Cached predictions are served directly; only misses hit the model.
+        """
+        if not texts:
+            return []
+
+        version = self.cache_version()
+        results = [self.cache.get(text, version) for text in texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = self._predict_uncached([texts[i] for i in missing], batch_size)
+            for i, result in zip(missing, computed):
+                self.cache.set(texts[i], result, version)
+                results[i] = result
+        return results
+
+    def warmup(self, text: str) -> Dict[str, Any]:
+        """Classify ``text`` without touching the cache (or its counters)."""
+        return self._predict_uncached([text], 1)[0]
+
+    def extract_symptoms(self, text: str) -> Dict[str, Any]:
+        """Detect every symptom mentioned in a single text."""
+        return self.extract_symptoms_batch([text])[0]
+
+    def extract_symptoms_batch(
+        self, texts: List[str], batch_size: int = 16
+    ) -> List[Dict[str, Any]]:
+        """Split texts into clauses, classify the affirmed clauses of all
+        texts together and merge them back into one multi-symptom
+        prediction per text. Negated clauses ("no fever") are not
+        classified; they are returned as ``negated_clauses``."""
+        split = [affirmed_clauses(text) for text in texts]
+        flat = [clause for affirmed, _ in split for clause in affirmed]
+        predictions = self.predict_batch(flat, batch_size=batch_size)
+
+        results, start = [], 0
+        for affirmed, negated in split:
+            end = start + len(affirmed)
+            result = merge_clause_predictions(affirmed, predictions[start:end], self.risk_of)
+            result["negated_clauses"] = negated
+            results.append(result)
+            start = end
+        return results
+
+    @abstractmethod
+    def _predict_uncached(self, texts: List[str], batch_size: int) -> List[Dict[str, Any]]:
+        """Classify texts with the model, bypassing the cache."""
+
+    @abstractmethod
+    def cache_version(self):
+        """Fingerprint of the loaded model and label set for cache invalidation."""
+
+    def torch_modules(self) -> List[nn.Module]:
+        """The torch modules holding this engine's weights."""
+        return []
+
+    def risk_of(self, label: str) -> str:
+        """Risk level of a predicted label."""
+        return "LOW"
+
+
+def register_engine(name: str):
+    """Decorator registering an engine factory under ``name``."""
+
+    def decorator(factory: Callable[[], Engine]):
+        ENGINE_FACTORIES[name] = factory
+        return factory
+
+    return decorator
+
+
+def get_engine(name: str, cache: Optional[PredictionCache] = None) -> Engine:
+    """Return the named engine, building it on first use.
+
+    With ``cache``, the result is a view of the shared engine (same model
+    and weights) that reads and fills that cache; other callers of the same
+    engine are unaffected.
+    """
+    with _lock:
+        if name not in _engines:
+            if name not in ENGINE_FACTORIES:
+                raise ValueError(
+                    f"Unknown engine '{name}'. Expected one of {sorted(ENGINE_FACTORIES)}"
+                )
+            _engines[name] = ENGINE_FACTORIES[name]()
+        if cache is None:
+            return _engines[name]
+
+        key = (name, id(cache))
+        if key not in _cached_engines:
+            view = copy.copy(_engines[name])
+            view.cache = cache
+            _cached_engines[key] = view
+        return _cached_engines[key]
+
+
+def loaded_components() -> Dict[str, List[str]]:
+    """What is resident in this process (for diagnostics)."""
+    with _lock:
+        return {
+            "engines": sorted(_engines),
+            "tokenizers": sorted(_tokenizers),
+            "backbones": [f"{name}{' (int8)' if q else ''}" for name, q in _backbones],
+        }
+
+
+@register_engine("zero_shot")
+def _zero_shot_engine() -> Engine:
+    from ml.clinicalbert_service import SymptomClassifier
+
+    return SymptomClassifier(mode="zero_shot")
+
+
+@register_engine("hierarchical")
+def _hierarchical_engine() -> Engine:
+    from ml.clinicalbert_service import SymptomClassifier
+
+    return SymptomClassifier(mode="hierarchical")
+
+
+@register_engine("embedding")
+def _embedding_engine() -> Engine:
+    from ml.clinicalbert_service import SymptomClassifier
+
+    return SymptomClassifier(mode="embedding")
+
+
+class _RankedEngine(Engine):
+    """Adapts a module-level ``rank_symptoms`` function to the Engine API."""
+
+    def __init__(self, module, risk_of: Callable[[str], str], name: str):
+        super().__init__()
+        self.module = module
+        self.risk_of = risk_of
+        self.name = name
+        self.module.load_components()
+        self.labels = self.module.label_names()
+
+    def _predict_uncached(self, texts, batch_size):
+        results = []
+        for labels, scores, window in self.module.rank_symptoms(texts, batch_size):
+            result = format_prediction(labels, scores, self.risk_of)
+            if window is not None:
+                # Long input: which overlapping window drove the prediction
+                result["window"] = window
+            results.append(result)
+        return results
+
+    def cache_version(self):
+        return (self.name, self.module.components_version())
+
+    def torch_modules(self):
+        return self.module.torch_modules()
+
+
+@register_engine("finetuned")
+def _finetuned_engine() -> Engine:
+    from ml import inference
+
+    return _RankedEngine(inference, inference._map_risk, "finetuned")
+
+
+@register_engine("classifier_head")
+def _classifier_head_engine() -> Engine:
+    from ml import symptom_classifier
+
+    return _RankedEngine(
+        symptom_classifier, symptom_classifier.risk_for_label, "classifier_head"
+    )
+
+
+@register_engine("cascade")
+def _cascade_engine() -> Engine:
+    from ml.cascade import CascadeEngine
+
+    return CascadeEngine(get_engine(os.getenv("CASCADE_INNER_ENGINE", "zero_shot")))
@@ -0,0 +1,141 @@
+"""Export the fine-tuned MedAware classifier to ONNX.
+
+Converts the model saved by `ml/train.py` in ./ml/model (or
+SYMPTOM_MODEL_DIR, as in ml/inference.py) to model.onnx in the same
+directory with dynamic batch and sequence axes, then checks that ONNX
+Runtime reproduces the PyTorch predictions. Serve it with
+INFERENCE_BACKEND=onnx.
+
+A fingerprint of the exported weights is written to model.onnx.source;
+ml/inference.py refuses an export whose fingerprint no longer matches the
+weights in the model directory (e.g. after a retrain).
+
+Usage:
+    python ml/export_onnx.py
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+# Ensure project root (which contains the `ml` package) is on sys.path
+BASE_DIR = str(Path(__file__).resolve().parent.parent)
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from ml.quantization import source_fingerprint  # noqa: E402
+
+
+ROOT_DIR = Path(__file__).resolve().parent
+MODEL_DIR = Path(os.getenv("SYMPTOM_MODEL_DIR", str(ROOT_DIR / "model")))
+ONNX_MODEL_PATH = MODEL_DIR / "model.onnx"
+OPSET_VERSION = 14
+
+VERIFY_TEXTS = [
+    "I feel very dizzy and my head is spinning",
+    "Rash",
+    "I have had a dry cough for three days and my chest feels tight when I breathe",
+]
+
+
+def export(model, tokenizer, path: Path):
+    """Trace the model to ONNX with dynamic batch/sequence dimensions."""
+    sample = tokenizer(
+        ["sample symptom text", "a second, slightly longer sample symptom text"],
+        padding=True,
+        return_tensors="pt",
+    )
+    # Positional order must follow BertForSequenceClassification.forward
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in input_names),
+        str(path),
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=OPSET_VERSION,
+        do_constant_folding=True,
+    )
+
+
+def source_path(onnx_path) -> str:
+    """Where the fingerprint of an export's source weights is stored."""
+    return f"{onnx_path}.source"
+
+
+def save_source(onnx_path, model_dir):
+    """Record which weights ``onnx_path`` was exported from."""
+    with open(source_path(onnx_path), "w", encoding="utf-8") as f:
+        json.dump({"source": source_fingerprint(str(model_dir))}, f)
+
+
+def load_source(onnx_path) -> Optional[str]:
+    """Fingerprint of the weights ``onnx_path`` was exported from (compare
+    with ``source_fingerprint(model_dir)``), or None for exports made
+    before fingerprints were recorded."""
+    path = source_path(onnx_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("source")
+
+
+def verify(model, tokenizer, path: Path):
+    """Compare ONNX Runtime logits with eager PyTorch on a padded batch."""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    inputs = tokenizer(VERIFY_TEXTS, padding=True, truncation=True, return_tensors="pt")
+
+    with torch.no_grad():
+        expected = model(**inputs).logits.numpy()
+    feed = {node.name: inputs[node.name].numpy() for node in session.get_inputs()}
+    actual = session.run(["logits"], feed)[0]
+
+    max_diff = float(np.max(np.abs(expected - actual)))
+    same_argmax = bool(np.all(expected.argmax(-1) == actual.argmax(-1)))
+    print(f"Max |logit diff| vs PyTorch: {max_diff:.2e}")
+    if not same_argmax:
+        raise RuntimeError("ONNX predictions differ from PyTorch predictions")
+    print("ONNX predictions match PyTorch")
+
+
+def main():
+    if not MODEL_DIR.is_dir():
+        raise FileNotFoundError(
+            f"Model directory {MODEL_DIR} not found. Run `python ml/train.py` first."
+        )
+
+    print(f"Loading model from {MODEL_DIR}...")
+    tokenizer = AutoTokenizer.from_pretrained(str(MODEL_DIR))
+    model = AutoModelForSequenceClassification.from_pretrained(str(MODEL_DIR))
+    model.eval()
+
+    print(f"Exporting to {ONNX_MODEL_PATH} (opset {OPSET_VERSION})...")
+    export(model, tokenizer, ONNX_MODEL_PATH)
+
+    try:
+        verify(model, tokenizer, ONNX_MODEL_PATH)
+    except ImportError:
+        print("onnxruntime not installed; skipping verification")
+    save_source(ONNX_MODEL_PATH, MODEL_DIR)
+
+    print("Export complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,42 @@
 
 Loads the fine-tuned ClinicalBERT model from ./ml/model and exposes
 `classify_symptom` for downstream services (e.g., Flask endpoint).
+
+Set INFERENCE_BACKEND=onnx to run the exported ./ml/model/model.onnx with
+ONNX Runtime instead of eager PyTorch (see `python ml/export_onnx.py`).
+Set EARLY_EXIT_THRESHOLD to stop confident inputs at an intermediate
+layer (needs exit heads from `python ml/train.py --early-exit`).
 """
 
 import json
 import os
 from functools import lru_cache
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from ml.acceleration import COMPILE_MODE, accelerate
+from ml.cache import PredictionCache
+from ml.early_exit import early_exit_forward
+from ml.engines import get_sequence_classifier, get_tokenizer
+from ml.quantization import QUANTIZE_ENABLED, source_fingerprint
+from ml.runtime import ensure_runtime_configured
+from ml.tokenization import windowed_logits
 
 
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "model")
+# Point at another checkpoint in the same layout (e.g. the distilled
+# ./ml/model-student from `python ml/train.py --distill`)
+MODEL_DIR = os.getenv("SYMPTOM_MODEL_DIR", os.path.join(os.path.dirname(__file__), "model"))
 LABEL_MAP_PATH = os.path.join(MODEL_DIR, "label_map.json")
+ONNX_MODEL_PATH = os.path.join(MODEL_DIR, "model.onnx")
+# Window size; batches are only padded to their longest text and longer
+# texts are classified as overlapping windows
+MAX_LENGTH = int(os.getenv("FINETUNED_MAX_LENGTH", "256"))
+
+# "torch" (eager PyTorch) or "onnx" (ONNX Runtime, CPU)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+INFERENCE_BACKENDS = ("torch", "onnx")
 
 # Risk levels per category
 RISK_RULES = {
@@ -25,6 +48,12 @@ RISK_RULES = {
 }
 DEFAULT_RISK = "LOW"
 
+# Normalised-text prediction cache (PREDICTION_CACHE_SIZE=0 disables it)
+_cache = PredictionCache(
+    maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "0")) or None,
+)
+
 
 @lru_cache(maxsize=1)
 def _load_labels() -> Dict[str, str]:
@@ -40,25 +69,138 @@ def _load_labels() -> Dict[str, str]:
 
 @lru_cache(maxsize=1)
 def _load_tokenizer():
-    """Load tokenizer once and cache."""
+    """Load tokenizer once (shared through the engine registry)."""
     if not os.path.isdir(MODEL_DIR):
         raise FileNotFoundError(
             f"Model directory {MODEL_DIR} not found. Train the model first."
         )
-    return AutoTokenizer.from_pretrained(MODEL_DIR)
+    return get_tokenizer(MODEL_DIR)
 
 
 @lru_cache(maxsize=1)
-def _load_model():
-    """Load model once and cache (CPU)."""
+def _load_model(quantize: bool = QUANTIZE_ENABLED):
+    """Load model once (CPU, shared through the engine registry), optionally
+    int8-quantized."""
     if not os.path.isdir(MODEL_DIR):
         raise FileNotFoundError(
             f"Model directory {MODEL_DIR} not found. Train the model first."
         )
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_DIR)
-    model.eval()
-    model.to("cpu")
-    return model
+    return get_sequence_classifier(MODEL_DIR, quantize=quantize)
+
+
+@lru_cache(maxsize=1)
+def _load_onnx_session():
+    """Create the ONNX Runtime session once and cache (CPU)."""
+    try:
+        import onnxruntime as ort
+    except ImportError as exc:
+        raise RuntimeError(
+            "INFERENCE_BACKEND=onnx requires onnxruntime (pip install onnxruntime)"
+        ) from exc
+    if not os.path.exists(ONNX_MODEL_PATH):
+        raise FileNotFoundError(
+            f"ONNX model not found at {ONNX_MODEL_PATH}. "
+            "Run `python ml/export_onnx.py` to export it."
+        )
+    from ml.export_onnx import load_source
+
+    exported_from = load_source(ONNX_MODEL_PATH)
+    if exported_from is None:
+        print(
+            f"⚠️  {ONNX_MODEL_PATH} has no source fingerprint and may be stale; "
+            "re-export with `python ml/export_onnx.py`"
+        )
+    elif exported_from != source_fingerprint(MODEL_DIR):
+        raise RuntimeError(
+            f"{ONNX_MODEL_PATH} was exported from other weights than {MODEL_DIR}. "
+            "Run `python ml/export_onnx.py` to re-export it."
+        )
+    settings = ensure_runtime_configured()
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = settings["intra_op_threads"]
+    options.inter_op_num_threads = settings["inter_op_threads"]
+    return ort.InferenceSession(
+        ONNX_MODEL_PATH, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+@lru_cache(maxsize=2)
+def _torch_forward(model):
+    """Forward for the torch backend: layer-wise early exit when
+    EARLY_EXIT_THRESHOLD is set and exit heads exist, otherwise the
+    traced/compiled path (COMPILE_MODE), falling back to eager."""
+    forward = early_exit_forward(model, MODEL_DIR)
+    if forward is not None:
+        if COMPILE_MODE != "off":
+            # The early-exit loop runs encoder layers one by one in eager mode
+            print(f"⚠️  COMPILE_MODE={COMPILE_MODE} ignored: early exit is enabled")
+        return forward
+    return accelerate(model, _load_tokenizer(), MAX_LENGTH)
+
+
+def _load_runtime():
+    """Return the model object for the configured inference backend."""
+    if INFERENCE_BACKEND not in INFERENCE_BACKENDS:
+        raise ValueError(
+            f"Unknown INFERENCE_BACKEND '{INFERENCE_BACKEND}'. "
+            f"Expected one of {INFERENCE_BACKENDS}"
+        )
+    if INFERENCE_BACKEND == "onnx":
+        return _load_onnx_session()
+    return _load_model()
+
+
+def _batch_logits(runtime, inputs) -> np.ndarray:
+    """Run one forward pass over a padded batch and return logits."""
+    if INFERENCE_BACKEND == "onnx":
+        feed = {
+            node.name: inputs[node.name].astype(np.int64)
+            for node in runtime.get_inputs()
+        }
+        return runtime.run(["logits"], feed)[0]
+
+    inputs = {k: v.to("cpu") for k, v in inputs.items()}
+    return _torch_forward(runtime)(inputs).numpy()
+
+
+def _predict_windowed(
+    tokenizer, runtime, texts: List[str], batch_size: int = 16
+) -> List[Tuple[np.ndarray, Optional[Dict]]]:
+    """Class probabilities and driving window (None for short texts) per text."""
+    return_tensors = "np" if INFERENCE_BACKEND == "onnx" else "pt"
+    results = []
+    for logits, window in windowed_logits(
+        tokenizer,
+        texts,
+        MAX_LENGTH,
+        lambda inputs: _batch_logits(runtime, inputs),
+        max_batch_size=batch_size,
+        return_tensors=return_tensors,
+    ):
+        shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        results.append((shifted / shifted.sum(axis=-1, keepdims=True), window))
+    return results
+
+
+def _predict_probs(
+    tokenizer, runtime, texts: List[str], batch_size: int = 16
+) -> List[np.ndarray]:
+    """Class probabilities per text, using length-bucketed batches."""
+    return [probs for probs, _ in _predict_windowed(tokenizer, runtime, texts, batch_size)]
+
+
+def _predict_indices(tokenizer, runtime, texts: List[str], batch_size: int = 16) -> List[int]:
+    """Arg-max class index per text, using length-bucketed batches."""
+    return [
+        int(np.argmax(row))
+        for row in _predict_probs(tokenizer, runtime, texts, batch_size)
+    ]
+
+
+def _predict_index(tokenizer, runtime, text: str) -> int:
+    """Run one forward pass and return the arg-max class index."""
+    return _predict_indices(tokenizer, runtime, [text])[0]
 
 
 def _map_risk(label: str) -> str:
@@ -70,34 +212,106 @@ def _map_risk(label: str) -> str:
     return DEFAULT_RISK
 
 
+def _cache_version(tokenizer, runtime, labels: Dict[str, str]):
+    """Fingerprint of the loaded artifacts; changes whenever they are reloaded."""
+    return (
+        MODEL_DIR,
+        INFERENCE_BACKEND,
+        id(tokenizer),
+        id(runtime),
+        tuple(sorted(labels.items())),
+    )
+
+
+def load_components():
+    """Load tokenizer, model (or ONNX session) and labels up front, and
+    prepare the compiled torch path if one is configured."""
+    _load_tokenizer()
+    runtime = _load_runtime()
+    _load_labels()
+    if isinstance(runtime, torch.nn.Module):
+        _torch_forward(runtime)
+
+
+def label_names() -> List[str]:
+    """Category names the model can predict (engine registry hook)."""
+    return list(_load_labels().values())
+
+
+def components_version():
+    """Fingerprint of the loaded artifacts (engine registry hook)."""
+    return _cache_version(_load_tokenizer(), _load_runtime(), _load_labels())
+
+
+def torch_modules() -> List[torch.nn.Module]:
+    """Torch modules holding the weights (none for the ONNX backend)."""
+    runtime = _load_runtime()
+    return [runtime] if isinstance(runtime, torch.nn.Module) else []
+
+
+def rank_symptoms(texts: List[str], batch_size: int = 16):
+    """Labels ranked by probability for each text: [(labels, scores, window), ...].
+
+    ``window`` describes the window that drove the prediction of texts
+    longer than MAX_LENGTH, else None.
+    """
+    labels = _load_labels()
+    ranked = []
+    for row, window in _predict_windowed(
+        _load_tokenizer(), _load_runtime(), texts, batch_size
+    ):
+        order = np.argsort(-row)
+        ranked.append(
+            (
+                [labels.get(str(i), "Other") for i in order],
+                [float(row[i]) for i in order],
+                window,
+            )
+        )
+    return ranked
+
+
+def get_cache_stats() -> Dict[str, object]:
+    """Expose prediction cache counters (hits, misses, evictions, ...)."""
+    return _cache.stats()
+
+
 def classify_symptom(text: str) -> Dict[str, str]:
     """Classify user symptom text into a category and risk level."""
     if not text or not text.strip():
         raise ValueError("Input text cannot be empty")
+    return classify_symptoms([text])[0]
 
-    tokenizer = _load_tokenizer()
-    model = _load_model()
-    labels = _load_labels()
 
-    inputs = tokenizer(
-        text,
-        truncation=True,
-        max_length=256,
-        return_tensors="pt",
-    )
-    inputs = {k: v.to("cpu") for k, v in inputs.items()}
+def classify_symptoms(texts: List[str], batch_size: int = 16) -> List[Dict[str, str]]:
+    """Classify several texts (length-bucketed batches), in input order."""
+    if any(not text or not text.strip() for text in texts):
+        raise ValueError("Input text cannot be empty")
 
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        predicted_idx = torch.argmax(logits, dim=-1).item()
+    tokenizer = _load_tokenizer()
+    runtime = _load_runtime()
+    labels = _load_labels()
 
-    label_key = str(predicted_idx)
-    category = labels.get(label_key, "Other")
-    risk = _map_risk(category)
+    version = _cache_version(tokenizer, runtime, labels)
+    results = [_cache.get(text, version) for text in texts]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
 
-    return {
-        "category": category,
-        "risk": risk,
-    }
+    predicted = _predict_windowed(
+        tokenizer, runtime, [texts[i] for i in missing], batch_size
+    )
+    for index, (probs, window) in zip(missing, predicted):
+        label_key = str(int(np.argmax(probs)))
+        category = labels.get(label_key, "Other")
+        risk = _map_risk(category)
 
+        result = {
+            "category": category,
+            "risk": risk,
+        }
+        if window is not None:
+            result["window"] = window
+        _cache.set(texts[index], result, version)
+        results[index] = result
+    return results
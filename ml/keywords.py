@@ -0,0 +1,260 @@
+"""Keyword vocabulary and compiled matcher for rule-based symptom matching.
+
+Each vocabulary entry is one clinical concept: the label names it may
+appear under in the different label sets (10-way head labels, zero-shot
+labels) and the words/phrases that indicate it.
+
+``KeywordMatcher`` compiles every phrase into a word-level Aho-Corasick
+automaton, so a text is scanned once regardless of vocabulary size. Because
+it matches whole words, "ache" no longer fires inside "headache". Matches in
+a negation scope ("no fever", "denies chest pain") are reported but not
+scored; the scope ends at punctuation, a contrast word or a conjunction
+("no appetite and a headache"). A match nested inside a longer phrase
+("ache" in "stomach ache") is dropped in favour of the longer one. Every
+matched label gets a score (the number of times it matched), so
+multi-symptom texts are ranked instead of resolved by dictionary order.
+
+``SYMPTOM_KEYWORDS`` is a recall-oriented vocabulary that includes context
+words ("temperature", "chest", "sore"). Anything that answers without a
+model (the ``ml.cascade`` fast path) uses ``FAST_PATH_KEYWORDS`` instead,
+which only holds phrases that name the symptom unambiguously.
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+
+# (label aliases, words/phrases)
+SYMPTOM_KEYWORDS: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = [
+    (("headache",), ("headache", "headaches", "migraine", "migraines", "head hurts",
+                     "head is pounding", "pounding head")),
+    (("nausea",), ("nausea", "nauseous", "nauseated", "queasy", "sick to my stomach")),
+    (("dizziness",), ("dizzy", "dizziness", "spinning", "lightheaded", "light headed",
+                      "vertigo", "unsteady")),
+    (("fatigue",), ("tired", "fatigue", "fatigued", "exhausted", "exhaustion", "drained")),
+    (("stomach pain", "abdominal pain"), ("stomach", "abdominal", "belly", "abdomen",
+                                         "stomach ache", "stomach pain", "cramps",
+                                         "cramping")),
+    (("vomiting",), ("vomit", "vomited", "vomiting", "threw up", "throwing up",
+                     "throw up")),
+    (("diarrhea",), ("diarrhea", "diarrhoea", "loose stool", "loose stools",
+                     "watery stool", "watery stools", "runny stool")),
+    (("cough",), ("cough", "coughing", "coughs", "coughed")),
+    (("fever",), ("fever", "feverish", "temperature", "chills", "high temperature")),
+    (("muscle pain",), ("muscle", "muscles", "sore", "ache", "aches", "aching",
+                        "muscle pain", "body aches")),
+    (("rash",), ("rash", "rashes", "hives", "itchy skin", "skin broke out")),
+    (("chest pain",), ("chest", "heart", "chest pain", "chest tightness",
+                       "tight chest")),
+]
+
+# High-precision subset: phrases that name the concept on their own. Single
+# context words ("temperature", "heart", "stomach", "sore", "ache") are left
+# out, since "my temperature is normal" or "a sore throat" are not matches.
+FAST_PATH_KEYWORDS: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = [
+    (("headache",), ("headache", "headaches", "migraine", "migraines")),
+    (("nausea",), ("nausea", "nauseous", "nauseated", "queasy")),
+    (("dizziness",), ("dizzy", "dizziness", "lightheaded", "light headed", "vertigo")),
+    (("fatigue",), ("fatigue", "fatigued", "exhausted", "exhaustion")),
+    (("stomach pain", "abdominal pain"), ("stomach ache", "stomach pain", "stomach cramps",
+                                         "abdominal pain", "belly pain")),
+    (("vomiting",), ("vomit", "vomited", "vomiting", "threw up", "throwing up")),
+    (("diarrhea",), ("diarrhea", "diarrhoea", "loose stool", "loose stools",
+                     "watery stool", "watery stools")),
+    (("cough",), ("cough", "coughing", "coughs", "coughed")),
+    (("fever",), ("fever", "feverish", "high temperature")),
+    (("muscle pain",), ("muscle pain", "muscle ache", "muscle aches", "sore muscles",
+                        "body aches")),
+    (("rash",), ("rash", "rashes", "hives", "itchy skin")),
+    (("chest pain",), ("chest pain", "chest tightness", "tight chest")),
+]
+
+# Words that open a negation scope, and tokens that close it early
+NEGATION_CUES = frozenset(
+    {
+        "no", "not", "without", "never", "denies", "deny", "denied", "none",
+        "don't", "doesn't", "didn't", "haven't", "hasn't", "hadn't", "isn't",
+        "wasn't", "aren't", "dont", "doesnt", "didnt", "havent", "hasnt",
+    }
+)
+NEGATION_TERMINATORS = frozenset(
+    {
+        "and", "or", "but", "however", "although", "though", "except",
+        ",", ".", ";", ":", "!", "?",
+    }
+)
+# Number of tokens after a cue that it can negate
+NEGATION_WINDOW = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[^\sa-z0-9]")
+# Typographic apostrophes ("don’t") are matched as plain ones
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'"})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word and punctuation tokens."""
+    return _TOKEN_RE.findall(text.lower().translate(_APOSTROPHES))
+
+
+class KeywordMatch(NamedTuple):
+    label: str
+    phrase: str
+    start: int  # token index
+    end: int  # token index (exclusive)
+    negated: bool
+
+
+class KeywordMatcher:
+    """Word-level Aho-Corasick automaton over (phrase, label) patterns."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str, int]]] = [[]]
+
+        for phrase, label in patterns:
+            words = tokenize(phrase)
+            if not words:
+                continue
+            node = 0
+            for word in words:
+                if word not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][word] = len(self._goto) - 1
+                node = self._goto[node][word]
+            self._out[node].append((label, phrase, len(words)))
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @staticmethod
+    def _negation_mask(tokens: List[str]) -> List[bool]:
+        """True for tokens inside a negation scope."""
+        mask, remaining = [], 0
+        for token in tokens:
+            if token in NEGATION_TERMINATORS:
+                remaining = 0
+                mask.append(False)
+            elif token in NEGATION_CUES:
+                remaining = NEGATION_WINDOW
+                mask.append(False)
+            else:
+                mask.append(remaining > 0)
+                remaining = max(0, remaining - 1)
+        return mask
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        """All (longest, non-nested) phrase matches.
+
+        The text is scanned once; nested matches are then dropped with one
+        sort over the matched spans.
+        """
+        tokens = tokenize(text)
+        negated = self._negation_mask(tokens)
+
+        matches = []
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for label, phrase, length in self._out[state]:
+                start = index - length + 1
+                matches.append(
+                    KeywordMatch(label, phrase, start, index + 1, negated[start])
+                )
+
+        # Drop matches strictly contained in a longer one ("ache" in "stomach
+        # ache"): in (start, -end) order a span is nested exactly when an
+        # earlier span already reaches its end
+        kept, reach = set(), -1
+        spans = sorted({(m.start, m.end) for m in matches}, key=lambda s: (s[0], -s[1]))
+        for start, end in spans:
+            if end > reach:
+                kept.add((start, end))
+                reach = end
+        return [m for m in matches if (m.start, m.end) in kept]
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Score per label: number of (non-negated) matches."""
+        totals: Dict[str, float] = {}
+        for match in self.find(text):
+            if not match.negated:
+                totals[match.label] = totals.get(match.label, 0.0) + 1.0
+        return totals
+
+
+def resolve_concepts(
+    labels: Iterable[str], fast_path: bool = False
+) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Pair each concept with its name in ``labels`` (concepts the label set
+    does not contain are dropped). ``fast_path`` selects FAST_PATH_KEYWORDS."""
+    vocabulary = FAST_PATH_KEYWORDS if fast_path else SYMPTOM_KEYWORDS
+    by_lower = {label.lower(): label for label in labels}
+    resolved = []
+    for aliases, keywords in vocabulary:
+        for alias in aliases:
+            if alias in by_lower:
+                resolved.append((by_lower[alias], keywords))
+                break
+    return resolved
+
+
+@lru_cache(maxsize=16)
+def _matcher_for(labels: Tuple[str, ...], fast_path: bool) -> KeywordMatcher:
+    return KeywordMatcher(
+        (phrase, label)
+        for label, phrases in resolve_concepts(labels, fast_path)
+        for phrase in phrases
+    )
+
+
+def get_matcher(labels: Iterable[str], fast_path: bool = False) -> KeywordMatcher:
+    """Compiled matcher for a label set (built once per distinct set)."""
+    return _matcher_for(tuple(labels), fast_path)
+
+
+def match_keywords(
+    text: str, labels: Iterable[str], fast_path: bool = False
+) -> Dict[str, float]:
+    """Keyword score per label of ``labels`` found (non-negated) in ``text``."""
+    return get_matcher(labels, fast_path).scores(text)
+
+
+def rank_keywords(text: str, labels: Iterable[str]) -> List[Tuple[str, float]]:
+    """Matched labels sorted by descending score (multi-label output)."""
+    return sorted(match_keywords(text, labels).items(), key=lambda kv: -kv[1])
+
+
+@lru_cache(maxsize=1)
+def _vocabulary_matcher() -> KeywordMatcher:
+    """Matcher over every concept, labelled with its first alias."""
+    return KeywordMatcher(
+        (phrase, aliases[0]) for aliases, phrases in SYMPTOM_KEYWORDS for phrase in phrases
+    )
+
+
+def is_negated(text: str) -> bool:
+    """True if ``text`` mentions symptom keywords and every one of them is in
+    a negation scope ("no fever", but not "no appetite and a rash").
+
+    Text without any keyword ("I don't feel well") is never negated: there is
+    nothing to rule out, so it is left to the classifier.
+    """
+    matches = _vocabulary_matcher().find(text)
+    return bool(matches) and all(match.negated for match in matches)
@@ -0,0 +1,186 @@
+"""Background model loading with warmup and readiness tracking.
+
+Building a ClinicalBERT classifier downloads and deserialises hundreds of
+megabytes, so doing it at import time blocks the whole web app. The loader
+builds the model on a daemon thread, runs a warmup inference so the first
+real request is not a cold start, and exposes the state for readiness
+probes. Callers that need the model before it is ready get
+``ModelNotReadyError`` immediately instead of blocking. A failed load (e.g.
+a transient download error) is retried with exponential backoff.
+"""
+
+import gc
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def prepare_for_fork(modules: Iterable[Any]):
+    """Make loaded weights safe to share copy-on-write with forked workers.
+
+    Call in the parent after loading, right before forking. Parameters are
+    frozen (no autograd state is ever attached to them) and the current heap
+    is moved to the GC's permanent generation so collections in the workers
+    do not touch, and therefore copy, the parent's pages.
+    """
+    for module in modules:
+        module.eval()
+        for param in module.parameters():
+            param.requires_grad_(False)
+    gc.collect()
+    gc.freeze()
+
+
+def preload_for_fork(loader: "BackgroundModelLoader"):
+    """Load (and warm up) a model in the parent of a pre-fork server.
+
+    The load runs single-threaded so no OpenMP thread pool exists at fork
+    time (forking after OpenMP parallel regions can hang the children).
+    The model must expose ``torch_modules()``.
+    """
+    import torch
+
+    num_threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        loader.load()
+    finally:
+        torch.set_num_threads(num_threads)
+    if loader.is_ready:
+        prepare_for_fork(loader.get().torch_modules())
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when inference is requested before the model is warmed up."""
+
+
+class BackgroundModelLoader:
+    """Builds a model off the request path and reports its readiness."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        warmup: Optional[Callable[[Any], Any]] = None,
+        name: str = "model",
+        retries: int = 3,
+        retry_delay: float = 10.0,
+    ):
+        self.factory = factory
+        self.warmup = warmup
+        self.name = name
+        # Extra attempts after a failed load, the first one after
+        # ``retry_delay`` seconds and each later one after twice as long
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self.state = "idle"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+        self._instance = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self):
+        """Start loading on a background thread (no-op if already started)."""
+        with self._lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+            self._thread = threading.Thread(
+                target=self._load, name=f"{self.name}-loader", daemon=True
+            )
+            self._thread.start()
+
+    def load(self):
+        """Load synchronously in the calling thread and return the instance.
+
+        If another thread is already loading, wait for it instead.
+        """
+        with self._lock:
+            load_here = self.state in ("idle", "failed")
+            if load_here:
+                self.state = "loading"
+                self.error = None
+                self._done.clear()
+        if load_here:
+            self._load()
+        else:
+            self.wait()
+        return self.get()
+
+    def _load(self):
+        self.attempts = 0
+        delay = self.retry_delay
+        while True:
+            self.attempts += 1
+            if self._load_once():
+                break
+            if self.attempts > self.retries:
+                self.state = "failed"
+                break
+            # Not "failed", so a concurrent load() waits for the retry
+            self.state = "retrying"
+            print(f"Retrying {self.name} in {delay:.0f}s ({self.attempts}/{self.retries + 1})")
+            time.sleep(delay)
+            delay *= 2
+            self.state = "loading"
+        self._done.set()
+
+    def _load_once(self) -> bool:
+        try:
+            started = time.perf_counter()
+            instance = self.factory()
+            self.load_seconds = time.perf_counter() - started
+
+            if self.warmup is not None:
+                self.state = "warming"
+                started = time.perf_counter()
+                self.warmup(instance)
+                self.warmup_seconds = time.perf_counter() - started
+
+            self._instance = instance
+            self.error = None
+            self.state = "ready"
+            self._ready.set()
+            print(
+                f"{self.name} ready (load {self.load_seconds:.1f}s, "
+                f"warmup {self.warmup_seconds or 0:.1f}s)"
+            )
+            return True
+        except Exception as exc:
+            self.error = str(exc)
+            print(f"❌ Failed to load {self.name}: {exc}")
+            return False
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading finishes; returns whether the model is ready."""
+        self._done.wait(timeout)
+        return self.is_ready
+
+    def get(self):
+        """Return the loaded model or raise ModelNotReadyError."""
+        if not self._ready.is_set():
+            detail = f": {self.error}" if self.error else ""
+            raise ModelNotReadyError(f"{self.name} is {self.state}{detail}")
+        return self._instance
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness details for health endpoints."""
+        return {
+            "model": self.name,
+            "state": self.state,
+            "ready": self.is_ready,
+            "error": self.error,
+            "attempts": self.attempts,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
@@ -0,0 +1,53 @@
+"""Lightweight in-process inference metrics.
+
+Counters (``incr``) and value summaries (``observe``: count/sum/min/max/mean)
+shared by the inference modules, exposed by the backend at ``/metrics``.
+"""
+
+import threading
+from typing import Any, Dict
+
+
+class Metrics:
+    """Thread-safe registry of named counters and summaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                self._summaries[name] = {
+                    "count": 1,
+                    "sum": value,
+                    "min": value,
+                    "max": value,
+                }
+                return
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            summaries = {
+                name: {**s, "mean": s["sum"] / s["count"]}
+                for name, s in self._summaries.items()
+            }
+            return {"counters": dict(self._counters), "summaries": summaries}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+metrics = Metrics()
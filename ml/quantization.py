@@ -0,0 +1,127 @@
+"""Dynamic int8 quantization for CPU inference.
+
+All classifiers run ClinicalBERT on CPU in fp32. With ``QUANTIZE_INT8=1`` the
+loaders swap every ``nn.Linear`` for a dynamically quantized int8 version at
+load time, which typically gives a 2-3x latency win and a ~4x smaller linear
+weight footprint for a small accuracy cost (measure it with
+``python -m ml.benchmark quantization``).
+
+Quantized weights are saved next to a fingerprint of the fp32 source, so
+later startups reload the int8 artifact instead of loading fp32 weights and
+re-quantizing. A changed source (e.g. a retrained ``ml/model`` or a new
+commit of a hub model) invalidates the artifact automatically.
+"""
+
+import os
+import re
+from typing import Callable, Optional
+
+import torch
+from torch import nn
+
+
+QUANTIZE_ENABLED = os.getenv("QUANTIZE_INT8", "0").lower() in ("1", "true", "yes")
+QUANTIZED_DIR = os.getenv(
+    "QUANTIZED_DIR", os.path.join(os.path.dirname(__file__), "artifacts")
+)
+
+_WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+    """Quantize the model's linear layers to int8 (weights) for CPU."""
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(
+        model, {nn.Linear}, dtype=torch.qint8
+    )
+
+
+def hub_revision(name: str) -> Optional[str]:
+    """Commit hash of the hub snapshot ``from_pretrained`` would load, or None."""
+    try:
+        from transformers.utils import cached_file
+
+        config_path = cached_file(name, "config.json")
+    except Exception:
+        return None
+    if not config_path:
+        return None
+    # Hub files resolve to <cache>/models--org--name/snapshots/<commit>/config.json
+    snapshot = os.path.dirname(config_path)
+    if os.path.basename(os.path.dirname(snapshot)) != "snapshots":
+        return None
+    return os.path.basename(snapshot)
+
+
+def source_fingerprint(name_or_path: str) -> str:
+    """Identify the fp32 weights a quantized artifact was built from."""
+    if os.path.isdir(name_or_path):
+        parts = []
+        for filename in _WEIGHT_FILES:
+            path = os.path.join(name_or_path, filename)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{filename}:{stat.st_size}:{int(stat.st_mtime)}")
+        return "|".join(parts) or name_or_path
+    revision = hub_revision(name_or_path)
+    return f"{name_or_path}@{revision}" if revision else name_or_path
+
+
+def artifact_path(name_or_path: str, suffix: str = "") -> str:
+    """Default on-disk location for the int8 artifact of a model."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name_or_path.strip("/\\"))
+    return os.path.join(QUANTIZED_DIR, f"{slug}{suffix}-int8.pt")
+
+
+def save_quantized(model: nn.Module, path: str, source: str):
+    """Persist a quantized model's state together with its source fingerprint."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save({"source": source, "state_dict": model.state_dict()}, path)
+
+
+def load_quantized(skeleton: nn.Module, path: str, source: str) -> Optional[nn.Module]:
+    """Load a saved int8 state into a freshly quantized skeleton.
+
+    Returns None if the artifact was built from different fp32 weights.
+    """
+    artifact = torch.load(path, map_location="cpu", weights_only=True)
+    if artifact.get("source") != source:
+        return None
+    model = quantize_dynamic(skeleton)
+    model.load_state_dict(artifact["state_dict"])
+    model.eval()
+    return model
+
+
+def load_or_quantize(
+    load_fp32: Callable[[], nn.Module],
+    build_skeleton: Callable[[], nn.Module],
+    name_or_path: str,
+    path: Optional[str] = None,
+) -> nn.Module:
+    """Return an int8 model, reusing the saved artifact when it is current.
+
+    Args:
+        load_fp32: Loads the full-precision model (only called on a miss).
+        build_skeleton: Builds the architecture without pretrained weights.
+        name_or_path: Hub name or local directory of the fp32 weights.
+        path: Artifact location; defaults to ``artifact_path(name_or_path)``.
+    """
+    path = path or artifact_path(name_or_path)
+    source = source_fingerprint(name_or_path)
+
+    if os.path.exists(path):
+        try:
+            model = load_quantized(build_skeleton(), path, source)
+            if model is not None:
+                return model
+            print(f"Quantized artifact {path} is stale, re-quantizing...")
+        except Exception as exc:
+            print(f"⚠️  Could not load quantized artifact {path}: {exc}")
+
+    model = quantize_dynamic(load_fp32())
+    try:
+        save_quantized(model, path, source)
+    except OSError as exc:
+        print(f"⚠️  Could not save quantized artifact {path}: {exc}")
+    return model
@@ -0,0 +1,157 @@
+"""CPU threading and core pinning for inference processes.
+
+By default every process running torch (or ONNX Runtime) starts one
+intra-op thread per core, so N web workers on a node run N x cores threads
+and preempt each other, which is what blows up p99 under load. These
+settings are applied before any model is loaded:
+
+- ``TORCH_INTRA_OP_THREADS``: threads per operator (0 = cores / workers)
+- ``TORCH_INTER_OP_THREADS``: threads running independent operators
+  (0 = leave torch's default)
+- ``CPU_AFFINITY``: "" (no pinning), "auto" (worker *i* gets its own
+  contiguous block of ``intra`` cores) or an explicit list like "0-3,8"
+
+``INFERENCE_WORKERS`` (or ``GUNICORN_WORKERS`` / ``WEB_CONCURRENCY``) is the
+number of inference processes sharing the node. This module is the only
+place these variables are read (the backend and ml/train.py use its
+values). Find good values for a machine with ``python -m ml.benchmark
+threads``.
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)) or default)
+
+
+TORCH_INTRA_OP_THREADS = _env_int("TORCH_INTRA_OP_THREADS", 0)
+TORCH_INTER_OP_THREADS = _env_int("TORCH_INTER_OP_THREADS", 0)
+CPU_AFFINITY = os.getenv("CPU_AFFINITY", "").strip().lower()
+INFERENCE_WORKERS = _env_int(
+    "INFERENCE_WORKERS",
+    _env_int("GUNICORN_WORKERS", _env_int("WEB_CONCURRENCY", 1)),
+)
+
+# Settings applied in this process ({} until configure_runtime runs)
+_applied: Dict[str, object] = {}
+
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:  # not Linux
+        return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """Parse "0-3,8" style CPU lists."""
+    cores = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cores.extend(range(int(start), int(end) + 1))
+        else:
+            cores.append(int(part))
+    return cores
+
+
+def default_intra_threads(workers: int = INFERENCE_WORKERS, cores: Optional[int] = None) -> int:
+    """Cores per worker, so all workers together use each core once."""
+    cores = cores if cores is not None else len(available_cores())
+    return max(1, cores // max(1, workers))
+
+
+def worker_cores(
+    worker_index: int, threads: int, cores: Optional[Sequence[int]] = None
+) -> List[int]:
+    """The block of ``threads`` cores assigned to a worker under "auto".
+
+    Blocks only wrap around (and share cores with another worker) when
+    there are more workers than cores; that is reported, since it is the
+    oversubscription pinning is meant to prevent.
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    threads = min(threads, len(cores))
+    if (worker_index + 1) * threads > len(cores):
+        print(
+            f"⚠️  Worker {worker_index} has no free block of {threads} cores "
+            f"({len(cores)} available); it shares cores with another worker"
+        )
+    start = (worker_index * threads) % len(cores)
+    return [cores[(start + offset) % len(cores)] for offset in range(threads)]
+
+
+def configure_runtime(
+    intra_op_threads: int = TORCH_INTRA_OP_THREADS,
+    inter_op_threads: int = TORCH_INTER_OP_THREADS,
+    affinity: str = CPU_AFFINITY,
+    worker_index: Optional[int] = None,
+    workers: int = INFERENCE_WORKERS,
+) -> Dict[str, object]:
+    """Apply thread counts and CPU affinity to the current process.
+
+    Call before loading models (and again in each forked worker with its
+    ``worker_index`` to pin it). Returns the settings in effect.
+    """
+    import torch
+
+    intra = intra_op_threads or default_intra_threads(workers)
+
+    pinned: Optional[List[int]] = None
+    if affinity == "auto" and worker_index is not None:
+        cores = available_cores()
+        if workers * intra > len(cores):
+            # Clamp so the workers' core blocks do not overlap
+            clamped = default_intra_threads(workers, len(cores))
+            print(
+                f"⚠️  {workers} workers x {intra} threads exceed {len(cores)} cores; "
+                f"using {clamped} intra-op threads per worker"
+            )
+            intra = clamped
+        pinned = worker_cores(worker_index, intra, cores)
+    elif affinity and affinity != "auto":
+        pinned = parse_cpu_list(affinity)
+    if pinned:
+        try:
+            os.sched_setaffinity(0, pinned)
+        except (AttributeError, OSError) as exc:
+            print(f"⚠️  Could not pin to CPUs {pinned} ({exc})")
+            pinned = None
+
+    torch.set_num_threads(intra)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Only settable before the first inter-op parallel work
+            pass
+
+    _applied.clear()
+    _applied.update(
+        {
+            "intra_op_threads": torch.get_num_threads(),
+            "inter_op_threads": torch.get_num_interop_threads(),
+            "cpu_affinity": pinned or available_cores(),
+            "worker_index": worker_index,
+            "pid": os.getpid(),
+        }
+    )
+    return dict(_applied)
+
+
+def ensure_runtime_configured() -> Dict[str, object]:
+    """Apply the configured settings once per process (used by loaders)."""
+    if _applied.get("pid") != os.getpid():
+        configure_runtime()
+    return dict(_applied)
+
+
+def runtime_settings() -> Dict[str, object]:
+    """Settings in effect in this process (for diagnostics)."""
+    return dict(_applied)
@@ -0,0 +1,322 @@
+"""
+Symptom Classifier using ClinicalBERT
+Uses the Bio_ClinicalBERT model from HuggingFace for symptom classification
+"""
+
+import json
+import os
+import torch
+from typing import Dict, List, Optional, Tuple
+
+from ml.acceleration import accelerate
+from ml.engines import get_sequence_classifier, get_tokenizer
+from ml.keywords import rank_keywords
+from ml.quantization import QUANTIZE_ENABLED
+from ml.tokenization import windowed_logits
+
+# Global variables for model and tokenizer (lazy loading)
+_model = None
+_tokenizer = None
+_labels = None
+# Quantization setting the loaded model was built with
+_quantized = None
+# Traced/compiled forward (COMPILE_MODE), prepared when the model loads
+_forward = None
+
+# Model configuration
+MODEL_NAME = "emilyalsentzer/Bio_ClinicalBERT"
+LABELS_FILE = os.path.join(os.path.dirname(__file__), "symptom_labels.json")
+# Maximum tokens per forward pass (inputs are only padded to the longest
+# text in their batch, so this is a cap, not a cost; longer texts are split
+# into overlapping windows of this size)
+MAX_LENGTH = int(os.getenv("CLASSIFIER_HEAD_MAX_LENGTH", "512"))
+NUM_LABELS = 10  # 10 symptom categories
+
+# Risk level per label (anything not listed is LOW)
+LABEL_RISK = {
+    "Chest Pain": "HIGH",
+    "Dizziness": "HIGH",
+    "Headache": "MEDIUM",
+    "Fever": "MEDIUM",
+    "Rash": "MEDIUM",
+}
+
+
+def risk_for_label(label: str) -> str:
+    """Map a predicted label name to a risk level."""
+    return LABEL_RISK.get(label, "LOW")
+
+
+def load_labels() -> Dict[str, str]:
+    """
+    Load symptom labels from JSON file.
+    
+    Returns:
+        Dict mapping label indices to label names
+    """
+    global _labels
+    
+    if _labels is not None:
+        return _labels
+    
+    try:
+        with open(LABELS_FILE, 'r', encoding='utf-8') as f:
+            _labels = json.load(f)
+        return _labels
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Labels file not found at {LABELS_FILE}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in labels file: {e}")
+
+
+def load_model(quantize: Optional[bool] = None):
+    """
+    Load the ClinicalBERT tokenizer and model.
+    Uses lazy loading - model is loaded only once and cached.
+    Runs on CPU by default.
+    
+    Args:
+        quantize: Apply dynamic int8 quantization to the linear layers
+                  (reuses the saved int8 artifact when available).
+                  Defaults to the loaded model's setting, or QUANTIZE_INT8
+                  before the first load; a different setting reloads.
+    
+    Returns:
+        tuple: (tokenizer, model)
+    """
+    global _model, _tokenizer, _forward, _quantized
+    
+    if quantize is None:
+        quantize = QUANTIZE_ENABLED if _quantized is None else _quantized
+    if _model is not None and _tokenizer is not None and _quantized == quantize:
+        return _tokenizer, _model
+    
+    print(f"Loading ClinicalBERT model: {MODEL_NAME}")
+    print("This may take a few minutes on first run...")
+    
+    try:
+        # Tokenizer and backbone come from the shared engine registry, so
+        # other classifiers in this process reuse the same weights
+        _tokenizer = get_tokenizer(MODEL_NAME)
+        
+        # Load model for sequence classification
+        # Note: This adds a randomly initialized classification head
+        # For production use, the model should be fine-tuned on symptom data
+        # For now, it will work but accuracy may be limited
+        _model = get_sequence_classifier(
+            MODEL_NAME, num_labels=NUM_LABELS, quantize=quantize
+        )
+        _quantized = quantize
+        
+        # Optional TorchScript/torch.compile path, warmed for every length
+        # bucket and checked against eager mode (falls back to eager)
+        _forward = accelerate(_model, _tokenizer, MAX_LENGTH)
+        
+        print("Model loaded successfully!")
+        return _tokenizer, _model
+        
+    except Exception as e:
+        raise RuntimeError(f"Failed to load model: {str(e)}")
+
+
+def _compute_logits(model, inputs) -> Optional[torch.Tensor]:
+    """
+    Run the model on a tokenized batch and return class logits.
+    
+    Returns None if the model structure is unexpected (caller falls back
+    to keyword matching).
+    """
+    if model is _model and _forward is not None and _forward.accelerated:
+        return _forward(inputs)
+    
+    outputs = model(**inputs)
+    
+    # Handle different model output formats
+    if hasattr(outputs, 'logits'):
+        # Sequence classification model
+        return outputs.logits
+    if hasattr(model, 'classifier'):
+        # Base model with custom classifier head
+        # Get pooler output or last hidden state
+        if hasattr(outputs, 'pooler_output') and outputs.pooler_output is not None:
+            hidden_state = outputs.pooler_output
+        else:
+            # Mean pooling of last hidden state over real (non-pad) tokens
+            mask = inputs["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            hidden_state = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+        return model.classifier(hidden_state)
+    return None
+
+
+def classify_symptom(text: str) -> str:
+    """
+    Classify a symptom description using ClinicalBERT.
+    
+    Args:
+        text: Raw user text describing symptoms
+        
+    Returns:
+        str: Predicted symptom label name (e.g., "Headache", "Dizziness")
+        
+    Raises:
+        RuntimeError: If model fails to load or inference fails
+        ValueError: If input text is empty
+    """
+    if not text or not text.strip():
+        raise ValueError("Input text cannot be empty")
+    
+    return classify_symptoms([text])[0]
+
+
+def classify_symptoms(texts: List[str], batch_size: int = 16) -> List[str]:
+    """
+    Classify several symptom descriptions in length-bucketed batches.
+    
+    Texts of similar token length are batched together and each batch is
+    padded only to its longest member (never to MAX_LENGTH). Longer texts
+    are split into overlapping windows instead of being truncated.
+    
+    Args:
+        texts: Raw user texts describing symptoms
+        batch_size: Maximum number of texts per forward pass
+        
+    Returns:
+        List of predicted label names, in input order
+        
+    Raises:
+        RuntimeError: If model fails to load or inference fails
+        ValueError: If any input text is empty
+    """
+    if any(not text or not text.strip() for text in texts):
+        raise ValueError("Input text cannot be empty")
+    
+    try:
+        return [labels[0] for labels, _, _ in rank_symptoms(texts, batch_size)]
+    except Exception as e:
+        raise RuntimeError(f"Symptom classification failed: {str(e)}")
+
+
+def rank_symptoms(
+    texts: List[str], batch_size: int = 16
+) -> List[Tuple[List[str], List[float], Optional[Dict]]]:
+    """
+    Rank all labels by probability for each text.
+    
+    Texts longer than MAX_LENGTH are classified as overlapping windows in
+    the same batches and their window logits pooled (see ml.tokenization).
+    
+    Returns:
+        List of (label names, scores, window) triples with labels sorted by
+        descending score, in input order. ``window`` describes the window
+        that drove the prediction for multi-window texts, else None.
+    """
+    # Load model and labels if not already loaded
+    tokenizer, model = load_model()
+    labels = load_labels()
+    
+    def forward(inputs):
+        # Move inputs to CPU
+        inputs = {k: v.to('cpu') for k, v in inputs.items()}
+        
+        # Run inference (no gradient computation)
+        with torch.no_grad():
+            logits = _compute_logits(model, inputs)
+        return None if logits is None else logits.float().numpy()
+    
+    ranked: List[Tuple[List[str], List[float], Optional[Dict]]] = []
+    for text, (logits, window) in zip(
+        texts, windowed_logits(tokenizer, texts, MAX_LENGTH, forward, max_batch_size=batch_size)
+    ):
+        if logits is None:
+            # Fallback: use keyword matching if model structure is unexpected
+            ranked.append((*_keyword_based_ranking(text, labels), None))
+            continue
+        # Map class indices to label names, best first
+        scores, order = torch.sort(torch.softmax(torch.from_numpy(logits), dim=-1), descending=True)
+        ranked.append(
+            (
+                [labels.get(str(i), "Unknown") for i in order.tolist()],
+                scores.tolist(),
+                window,
+            )
+        )
+    
+    return ranked
+
+
+def load_components():
+    """Load model, tokenizer and labels up front (engine registry hook)."""
+    load_model()
+    load_labels()
+
+
+def label_names() -> List[str]:
+    """Label names the model can predict (engine registry hook)."""
+    return list(load_labels().values())
+
+
+def components_version():
+    """Fingerprint of the loaded model and labels (engine registry hook)."""
+    return (MODEL_NAME, id(_model), tuple(sorted(load_labels().items())))
+
+
+def torch_modules() -> List[torch.nn.Module]:
+    """Torch modules holding the weights (engine registry hook)."""
+    return [_model] if _model is not None else []
+
+
+def _keyword_based_ranking(text: str, labels: Dict[str, str]) -> Tuple[List[str], List[float]]:
+    """
+    Fallback keyword-based ranking if model fails.
+    
+    Every label whose keywords appear (and are not negated, e.g. "no fever")
+    is returned, scored by its share of the keyword matches.
+    
+    Args:
+        text: Input text
+        labels: Label mapping
+        
+    Returns:
+        (label names, scores) sorted by descending score; the first label
+        with score 1.0 if nothing matches
+    """
+    ranked = rank_keywords(text, labels.values())
+    if not ranked:
+        # Default to first label if no match
+        return [labels.get("0", "Unknown")], [1.0]
+    
+    total = sum(score for _, score in ranked)
+    return [label for label, _ in ranked], [score / total for _, score in ranked]
+
+
+def _keyword_based_classification(text: str, labels: Dict[str, str]) -> str:
+    """
+    Fallback keyword-based classification if model fails.
+    
+    Args:
+        text: Input text
+        labels: Label mapping
+        
+    Returns:
+        Predicted label based on keyword matching
+    """
+    return _keyword_based_ranking(text, labels)[0][0]
+
+
+def get_model_info() -> Dict[str, str]:
+    """
+    Get information about the loaded model.
+    
+    Returns:
+        Dict with model information
+    """
+    return {
+        "model_name": MODEL_NAME,
+        "model_loaded": _model is not None,
+        "tokenizer_loaded": _tokenizer is not None,
+        "labels_loaded": _labels is not None,
+        "device": "cpu",
+        "quantized": _quantized,
+        "compile_mode": _forward.mode if _forward is not None else "off"
+    }
+
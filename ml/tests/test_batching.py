@@ -0,0 +1,77 @@
+"""MicroBatcher: coalescing, failure isolation and timeouts."""
+
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from ml.batching import MicroBatcher
+
+
+def upper_batch(calls):
+    def predict_batch(texts):
+        calls.append(list(texts))
+        if any(not isinstance(text, str) for text in texts):
+            raise TypeError("texts must be strings")
+        return [text.upper() for text in texts]
+
+    return predict_batch
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+    batcher = MicroBatcher(upper_batch(calls), max_batch_size=8, window_ms=200)
+    futures = [batcher.submit(text) for text in ("a", "b", "c")]
+
+    assert [future.result(timeout=5) for future in futures] == ["A", "B", "C"]
+    assert calls == [["a", "b", "c"]]
+
+
+def test_batch_size_is_capped():
+    calls = []
+    batcher = MicroBatcher(upper_batch(calls), max_batch_size=2, window_ms=200)
+    futures = [batcher.submit(text) for text in ("a", "b", "c")]
+
+    assert [future.result(timeout=5) for future in futures] == ["A", "B", "C"]
+    assert all(len(call) <= 2 for call in calls)
+
+
+def test_bad_input_fails_only_its_own_request():
+    calls = []
+    batcher = MicroBatcher(upper_batch(calls), max_batch_size=8, window_ms=200)
+    good, bad, other = (batcher.submit(text) for text in ("a", 42, "b"))
+
+    assert good.result(timeout=5) == "A"
+    assert other.result(timeout=5) == "B"
+    with pytest.raises(TypeError):
+        bad.result(timeout=5)
+    # One failed batched call, then one retry per item
+    assert calls == [["a", 42, "b"], ["a"], [42], ["b"]]
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = MicroBatcher(lambda texts: [], window_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.predict("a", timeout=5)
+
+
+def test_predict_times_out():
+    release = threading.Event()
+
+    def stuck(texts):
+        release.wait(5)
+        return texts
+
+    batcher = MicroBatcher(stuck, window_ms=0, timeout=0.05)
+    try:
+        with pytest.raises(FutureTimeoutError):
+            batcher.predict("a")
+    finally:
+        release.set()
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        MicroBatcher(upper_batch([]), max_batch_size=0)
+    with pytest.raises(ValueError):
+        MicroBatcher(upper_batch([]), window_ms=-1)
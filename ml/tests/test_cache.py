@@ -0,0 +1,79 @@
+"""PredictionCache: LRU eviction, TTL expiry and version invalidation."""
+
+import pytest
+
+from ml import cache as cache_module
+from ml.cache import PredictionCache, normalize_text
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_normalized_key():
+    cache = PredictionCache(maxsize=4)
+    cache.set("Headache!", {"label": "Headache"}, version=1)
+    assert cache.get("  headache ", version=1) == {"label": "Headache"}
+    assert normalize_text("Feeling   DIZZY.") == "feeling dizzy"
+
+
+def test_lru_eviction():
+    cache = PredictionCache(maxsize=2)
+    cache.set("a", 1, version=1)
+    cache.set("b", 2, version=1)
+    assert cache.get("a", version=1) == 1  # "b" is now least recently used
+    cache.set("c", 3, version=1)
+
+    assert cache.get("b", version=1) is None
+    assert cache.get("a", version=1) == 1
+    assert cache.get("c", version=1) == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(clock):
+    cache = PredictionCache(maxsize=4, ttl=60)
+    cache.set("cough", "Cough", version=1)
+
+    clock.now += 59
+    assert cache.get("cough", version=1) == "Cough"
+    clock.now += 2
+    assert cache.get("cough", version=1) is None
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_version_change_invalidates():
+    cache = PredictionCache(maxsize=4)
+    cache.set("rash", "Rash", version="v1")
+    assert cache.get("rash", version="v2") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_values_are_copied():
+    cache = PredictionCache(maxsize=4)
+    value = {"symptoms": ["Fever"]}
+    cache.set("fever", value, version=1)
+    value["symptoms"].append("Cough")
+    cache.get("fever", version=1)["symptoms"].append("Rash")
+    assert cache.get("fever", version=1) == {"symptoms": ["Fever"]}
+
+
+def test_disabled_cache():
+    cache = PredictionCache(maxsize=0)
+    cache.set("fever", "Fever", version=1)
+    assert cache.get("fever", version=1) is None
+    with pytest.raises(ValueError):
+        PredictionCache(maxsize=-1)
@@ -0,0 +1,91 @@
+"""Keyword fast-path routing in front of the model engine."""
+
+import pytest
+
+pytest.importorskip("torch")
+
+from ml.cascade import CascadeEngine, rule_prediction  # noqa: E402
+from ml.engines import Engine, format_prediction  # noqa: E402
+
+
+LABELS = [
+    "Headache", "Nausea", "Dizziness", "Fatigue", "Stomach Pain",
+    "Cough", "Fever", "Muscle Pain", "Rash", "Chest Pain",
+]
+
+
+class FakeModel(Engine):
+    """Always answers Fatigue; records what it was asked."""
+
+    name = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    @property
+    def labels(self):
+        return LABELS
+
+    def risk_of(self, label):
+        return "LOW"
+
+    def _predict_uncached(self, texts, batch_size):
+        self.seen.extend(texts)
+        return [format_prediction(["Fatigue"], [0.5], self.risk_of) for _ in texts]
+
+    def cache_version(self):
+        return "fake"
+
+
+@pytest.mark.parametrize(
+    "text, label",
+    [
+        ("I have a rash", "Rash"),
+        ("bad headache", "Headache"),
+        ("I keep coughing", "Cough"),
+        ("I have chest pain", "Chest Pain"),
+    ],
+)
+def test_unambiguous_phrases_take_fast_path(text, label):
+    predicted, confidence = rule_prediction(text, LABELS)
+    assert predicted == label
+    assert confidence >= 0.9
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I checked my temperature and it is normal",
+        "my heart is racing",
+        "I have a sore throat",
+        "my stomach feels off",
+        "my muscles",
+        "a headache and my heart is racing",
+        "headache and a cough",
+        "no fever",
+        "",
+    ],
+)
+def test_ambiguous_text_is_deferred(text):
+    assert rule_prediction(text, LABELS) == (None, 0.0)
+
+
+def test_long_text_loses_confidence():
+    _, short = rule_prediction("I have a rash", LABELS)
+    _, long = rule_prediction(
+        "I have a rash that started on my arm after gardening in the yard all day", LABELS
+    )
+    assert long < short
+
+
+def test_cascade_routes_between_stages():
+    model = FakeModel()
+    engine = CascadeEngine(model, threshold=0.9)
+    results = engine.predict_batch(["I have a rash", "my heart is racing"])
+
+    assert results[0]["predicted_symptom"] == "Rash"
+    assert results[0]["stage"] == "rules"
+    assert results[1]["predicted_symptom"] == "Fatigue"
+    assert results[1]["stage"] == "model"
+    assert model.seen == ["my heart is racing"]
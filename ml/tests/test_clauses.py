@@ -0,0 +1,42 @@
+"""Clause splitting and negated-clause filtering."""
+
+from ml.clauses import affirmed_clauses, split_clauses
+
+
+def test_split_on_punctuation_and_conjunctions():
+    assert split_clauses("dizzy since morning, some nausea, and a rash on my arm") == [
+        "dizzy since morning",
+        "some nausea",
+        "a rash on my arm",
+    ]
+
+
+def test_short_fragments_are_dropped():
+    assert split_clauses("headache. a. cough") == ["headache", "cough"]
+
+
+def test_text_without_clauses_is_kept_whole():
+    assert split_clauses("  ok  ") == ["ok"]
+
+
+def test_negated_clause_is_set_aside():
+    assert affirmed_clauses("I have a headache but no fever") == (
+        ["I have a headache"],
+        ["no fever"],
+    )
+
+
+def test_several_negated_clauses():
+    assert affirmed_clauses("no nausea, no vomiting, just a cough") == (
+        ["just a cough"],
+        ["no nausea", "no vomiting"],
+    )
+
+
+def test_negation_without_keyword_is_classified():
+    assert affirmed_clauses("no appetite and a rash") == (["no appetite", "a rash"], [])
+
+
+def test_negated_text_without_keyword_is_kept():
+    for text in ("I haven't been able to keep food down", "I don't feel well"):
+        assert affirmed_clauses(text) == ([text], [])
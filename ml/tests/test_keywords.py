@@ -0,0 +1,57 @@
+"""Keyword matcher: negation scope, nested phrases and scoring."""
+
+from ml.keywords import KeywordMatcher, is_negated, match_keywords, rank_keywords
+
+
+LABELS = [
+    "Headache", "Nausea", "Dizziness", "Fatigue", "Stomach Pain",
+    "Cough", "Fever", "Muscle Pain", "Rash", "Chest Pain",
+]
+
+
+def test_negated_mention_is_not_scored():
+    assert match_keywords("I have no fever", LABELS) == {}
+
+
+def test_conjunction_ends_negation_scope():
+    assert match_keywords("I have no appetite and a headache", LABELS) == {"Headache": 1.0}
+
+
+def test_punctuation_ends_negation_scope():
+    assert match_keywords("no fever, but a bad cough", LABELS) == {"Cough": 1.0}
+
+
+def test_negation_scope_is_bounded():
+    text = "no idea why but my head hurts"
+    assert match_keywords(text, LABELS) == {"Headache": 1.0}
+
+
+def test_curly_apostrophe_negates():
+    assert match_keywords("I don’t have a fever", LABELS) == {}
+    assert match_keywords("I don't have a fever", LABELS) == {}
+
+
+def test_whole_words_only():
+    assert match_keywords("headache", LABELS) == {"Headache": 1.0}
+
+
+def test_nested_match_keeps_longest_phrase():
+    matches = KeywordMatcher([("ache", "Muscle Pain"), ("stomach ache", "Stomach Pain")]).find(
+        "I have a stomach ache"
+    )
+    assert [(m.label, m.phrase) for m in matches] == [("Stomach Pain", "stomach ache")]
+
+
+def test_score_counts_matches():
+    scores = match_keywords("a cough, more coughing and a rash", LABELS)
+    assert scores == {"Cough": 2.0, "Rash": 1.0}
+    assert rank_keywords("a cough, more coughing and a rash", LABELS)[0] == ("Cough", 2.0)
+
+
+def test_is_negated():
+    assert is_negated("no fever")
+    assert is_negated("I don't feel dizzy")
+    assert not is_negated("no appetite and a rash")
+    assert not is_negated("a rash")
+    assert not is_negated("I don't feel well")
+    assert not is_negated("I haven't been able to keep food down")
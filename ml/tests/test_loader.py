@@ -0,0 +1,87 @@
+"""BackgroundModelLoader: readiness, warmup and retry with backoff."""
+
+import pytest
+
+from ml import loader as loader_module
+from ml.loader import BackgroundModelLoader, ModelNotReadyError
+
+
+class FlakyFactory:
+    """Fails ``failures`` times, then returns a model."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError(f"download failed ({self.calls})")
+        return "model"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(loader_module.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_not_ready_before_load():
+    loader = BackgroundModelLoader(lambda: "model")
+    assert not loader.is_ready
+    with pytest.raises(ModelNotReadyError):
+        loader.get()
+
+
+def test_background_load_runs_warmup():
+    warmed = []
+    loader = BackgroundModelLoader(lambda: "model", warmup=warmed.append)
+    loader.start()
+
+    assert loader.wait(timeout=5)
+    assert loader.get() == "model"
+    assert warmed == ["model"]
+    assert loader.status()["state"] == "ready"
+
+
+def test_failed_load_is_retried_with_backoff(sleeps):
+    factory = FlakyFactory(failures=2)
+    loader = BackgroundModelLoader(factory, retries=3, retry_delay=10)
+
+    assert loader.load() == "model"
+    assert factory.calls == 3
+    assert sleeps == [10, 20]
+    status = loader.status()
+    assert status["attempts"] == 3
+    assert status["error"] is None
+
+
+def test_gives_up_after_retries(sleeps):
+    factory = FlakyFactory(failures=10)
+    loader = BackgroundModelLoader(factory, retries=2, retry_delay=1)
+
+    with pytest.raises(ModelNotReadyError, match="download failed"):
+        loader.load()
+    assert factory.calls == 3
+    assert sleeps == [1, 2]
+    assert loader.status()["state"] == "failed"
+
+
+def test_failed_loader_can_load_again(sleeps):
+    factory = FlakyFactory(failures=1)
+    loader = BackgroundModelLoader(factory, retries=0)
+
+    with pytest.raises(ModelNotReadyError):
+        loader.load()
+    assert loader.load() == "model"
+
+
+def test_warmup_failure_counts_as_failed_attempt(sleeps):
+    def warmup(model):
+        raise RuntimeError("warmup failed")
+
+    loader = BackgroundModelLoader(lambda: "model", warmup=warmup, retries=1, retry_delay=0)
+    with pytest.raises(ModelNotReadyError):
+        loader.load()
+    assert loader.status()["attempts"] == 2
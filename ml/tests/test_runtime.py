@@ -0,0 +1,55 @@
+"""CPU list parsing and per-worker core blocks."""
+
+import pytest
+
+from ml import runtime
+from ml.runtime import default_intra_threads, parse_cpu_list, worker_cores
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8") == [0, 1, 2, 3, 8]
+    assert parse_cpu_list(" 2 , ,5-6") == [2, 5, 6]
+    assert parse_cpu_list("") == []
+
+
+def test_default_intra_threads():
+    assert default_intra_threads(workers=4, cores=8) == 2
+    assert default_intra_threads(workers=16, cores=8) == 1
+    assert default_intra_threads(workers=0, cores=8) == 8
+
+
+def test_workers_get_disjoint_blocks():
+    cores = list(range(8))
+    blocks = [worker_cores(index, 2, cores) for index in range(4)]
+    assert blocks == [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+
+def test_blocks_follow_available_core_ids():
+    assert worker_cores(1, 2, [4, 5, 6, 7]) == [6, 7]
+
+
+def test_threads_are_clamped_to_cores():
+    assert worker_cores(0, 16, [0, 1, 2]) == [0, 1, 2]
+
+
+def test_extra_worker_wraps_and_warns(capsys):
+    assert worker_cores(4, 2, list(range(8))) == [0, 1]
+    assert "shares cores" in capsys.readouterr().out
+
+
+def test_auto_affinity_clamps_oversubscribed_threads(monkeypatch):
+    torch = pytest.importorskip("torch")
+    pinned = []
+    monkeypatch.setattr(runtime, "available_cores", lambda: list(range(8)))
+    monkeypatch.setattr(
+        runtime.os, "sched_setaffinity", lambda pid, cpus: pinned.append(cpus), raising=False
+    )
+    monkeypatch.setattr(torch, "set_num_threads", lambda n: None)
+    monkeypatch.setattr(torch, "get_num_threads", lambda: 2)
+
+    settings = runtime.configure_runtime(
+        intra_op_threads=4, inter_op_threads=0, affinity="auto", worker_index=3, workers=4
+    )
+    # 4 workers x 4 threads would overlap on 8 cores: clamped to 2 each
+    assert pinned == [[6, 7]]
+    assert settings["cpu_affinity"] == [6, 7]
@@ -0,0 +1,90 @@
+"""Length bucketing and per-text sequence lengths."""
+
+import numpy as np
+
+from ml import tokenization
+from ml.tokenization import bucket_for, length_buckets, length_groups, windowed_logits
+
+
+class WordTokenizer:
+    """One token per whitespace-separated word; pads with zeros."""
+
+    def __call__(self, texts, truncation=True, max_length=None, **kwargs):
+        ids = [[1] * len(text.split()) for text in texts]
+        if truncation and max_length:
+            ids = [row[:max_length] for row in ids]
+        return {"input_ids": ids}
+
+    def pad(self, features, padding="longest", return_tensors="np"):
+        rows = features["input_ids"]
+        width = max(len(row) for row in rows)
+        return {
+            "input_ids": np.array([row + [0] * (width - len(row)) for row in rows]),
+            "attention_mask": np.array(
+                [[1] * len(row) + [0] * (width - len(row)) for row in rows]
+            ),
+        }
+
+
+def words(count):
+    return " ".join(["word"] * count)
+
+
+def test_bucket_for():
+    assert bucket_for(1) == 16
+    assert bucket_for(16) == 16
+    assert bucket_for(17) == 32
+    assert bucket_for(10_000) == 512
+    assert bucket_for(5, buckets=(4, 8)) == 8
+
+
+def test_length_buckets_separate_short_and_long():
+    texts = [words(40), words(3), words(20), words(5)]
+    batches = list(
+        length_buckets(WordTokenizer(), texts, max_length=512, max_batch_size=8, return_tensors="np")
+    )
+
+    assert [indices for indices, _ in batches] == [[1, 3], [2], [0]]
+    # Each batch is padded to its own longest member only
+    assert [inputs["input_ids"].shape[1] for _, inputs in batches] == [5, 20, 40]
+
+
+def test_length_buckets_respect_batch_size():
+    texts = [words(2)] * 5
+    batches = list(
+        length_buckets(WordTokenizer(), texts, max_length=512, max_batch_size=2, return_tensors="np")
+    )
+    assert [indices for indices, _ in batches] == [[0, 1], [2, 3], [4]]
+
+
+def test_length_groups():
+    texts = [words(40), words(3), words(20), words(1)]
+    groups, lengths = length_groups(WordTokenizer(), texts, max_length=512)
+    assert groups == [[3, 1], [2], [0]]
+    assert lengths == [40, 3, 20, 1]
+
+
+def test_effective_lengths_are_recorded(monkeypatch):
+    observed = []
+    monkeypatch.setattr(
+        tokenization.metrics, "observe", lambda name, value: observed.append((name, value))
+    )
+    texts = [words(30), words(4)]
+
+    def forward(inputs):
+        return np.zeros((inputs["input_ids"].shape[0], 3))
+
+    results = windowed_logits(
+        WordTokenizer(), texts, max_length=512, forward=forward, return_tensors="np", enabled=False
+    )
+    assert [window for _, window in results] == [None, None]
+    assert sorted(value for name, value in observed if name == "effective_seq_length") == [4, 30]
+
+
+def test_length_groups_leave_recording_to_the_caller(monkeypatch):
+    observed = []
+    monkeypatch.setattr(
+        tokenization.metrics, "observe", lambda name, value: observed.append((name, value))
+    )
+    length_groups(WordTokenizer(), [words(3)], max_length=512)
+    assert observed == []
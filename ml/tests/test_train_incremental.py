@@ -0,0 +1,97 @@
+"""Incremental fine-tuning: row ids, consumed-row tracking and artifact swap."""
+
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("datasets")
+pytest.importorskip("transformers")
+pytest.importorskip("sklearn")
+
+from ml import train  # noqa: E402
+
+
+def write_jsonl(path, rows):
+    path.write_text("\n".join(json.dumps(row) for row in rows), encoding="utf-8")
+    return path
+
+
+def test_row_id_prefers_explicit_ids():
+    row = {"text": "rash", "label": "Rash", "created_at": "2025-01-01T00:00:00"}
+    assert train._row_id({**row, "_id": {"$oid": "abc"}}, "text") == "abc"
+    assert train._row_id({**row, "id": 7}, "text") == "7"
+
+
+def test_row_id_hash_is_stable_and_content_based():
+    row = {"text": "rash", "label": "Rash", "created_at": "2025-01-01T00:00:00"}
+    assert train._row_id(dict(row), "text") == train._row_id(dict(row), "text")
+    assert train._row_id(row, "text") != train._row_id({**row, "label": "Fever"}, "text")
+
+
+def test_split_consumed_by_id(tmp_path):
+    export = write_jsonl(
+        tmp_path / "export.jsonl",
+        [
+            {"_id": "a", "text": "rash", "label": "Rash", "created_at": "2025-01-02T00:00:00"},
+            # Exported late with an older timestamp: still new
+            {"_id": "b", "text": "cough", "label": "Cough", "created_at": "2024-12-01T00:00:00"},
+        ],
+    )
+    new_rows, old_rows = train.split_consumed(
+        [export], {"consumed_ids": ["a"], "watermark": "2025-01-02T00:00:00"}
+    )
+    assert [row["id"] for row in new_rows] == ["b"]
+    assert [row["id"] for row in old_rows] == ["a"]
+
+
+def test_split_consumed_honours_legacy_watermark(tmp_path):
+    export = write_jsonl(
+        tmp_path / "export.jsonl",
+        [
+            {"_id": "a", "text": "rash", "label": "Rash", "created_at": "2025-01-01T00:00:00Z"},
+            {"_id": "b", "text": "cough", "label": "Cough", "created_at": "2025-02-01T00:00:00Z"},
+        ],
+    )
+    new_rows, old_rows = train.split_consumed([export], {"watermark": "2025-01-15T00:00:00"})
+    assert [row["id"] for row in new_rows] == ["b"]
+    assert [row["id"] for row in old_rows] == ["a"]
+
+
+def test_split_consumed_requires_columns(tmp_path):
+    export = write_jsonl(tmp_path / "export.jsonl", [{"text": "rash", "label": "Rash"}])
+    with pytest.raises(ValueError):
+        train.split_consumed([export], {})
+
+
+class FakeTrainer:
+    def is_world_process_zero(self):
+        return True
+
+    def save_model(self, path):
+        (train.Path(path) / "model.safetensors").write_text("new", encoding="utf-8")
+
+
+class FakeTokenizer:
+    def save_pretrained(self, path):
+        (train.Path(path) / "tokenizer.json").write_text("{}", encoding="utf-8")
+
+
+def test_save_artifacts_keeps_only_train_state(tmp_path):
+    output_dir = tmp_path / "model"
+    output_dir.mkdir()
+    for name in ("model.safetensors", "model.onnx", "exit_heads.pt", "train_state.json"):
+        (output_dir / name).write_text("old", encoding="utf-8")
+
+    train.save_artifacts(FakeTrainer(), FakeTokenizer(), output_dir, {0: "Rash"})
+
+    assert sorted(p.name for p in output_dir.iterdir()) == [
+        "label_map.json",
+        "model.safetensors",
+        "tokenizer.json",
+        "train_state.json",
+    ]
+    assert (output_dir / "model.safetensors").read_text(encoding="utf-8") == "new"
+    assert (output_dir / "train_state.json").read_text(encoding="utf-8") == "old"
+    assert not (tmp_path / "model.incoming").exists()
+    assert not (tmp_path / "model.previous").exists()
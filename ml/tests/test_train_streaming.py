@@ -0,0 +1,68 @@
+"""Streaming mode: one-pass scan and hash-based eval holdout."""
+
+import random
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("datasets")
+pytest.importorskip("transformers")
+pytest.importorskip("sklearn")
+
+from ml import train  # noqa: E402
+
+
+class FakeStream:
+    """Stands in for an iterable datasets stream."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select_columns(self, columns):
+        return ({column: row[column] for column in columns} for row in self.rows)
+
+
+def make_rows(count):
+    labels = ["Rash", "Cough", "Fever"]
+    return [{"text": f"symptom report {i}", "label": labels[i % 3], "extra": i} for i in range(count)]
+
+
+def test_scan_counts_rows_and_labels():
+    labels, rows, _, _ = train.scan_stream(FakeStream(make_rows(50)), "text", max_eval=100)
+    assert labels == ["Cough", "Fever", "Rash"]
+    assert rows == 50
+
+
+def test_holdout_is_the_smallest_hashes():
+    data = make_rows(200)
+    _, _, eval_rows, threshold = train.scan_stream(FakeStream(data), "text", max_eval=100)
+
+    # At most a tenth of the stream is held out
+    assert len(eval_rows) == 20
+    hashes = sorted(train._row_hash(row["text"], row["label"]) for row in data)
+    assert threshold == hashes[19]
+    held_out = {row["text"] for row in eval_rows}
+    for row in data:
+        is_eval = train._row_hash(row["text"], row["label"]) <= threshold
+        assert is_eval == (row["text"] in held_out)
+
+
+def test_holdout_is_capped_by_max_eval():
+    _, _, eval_rows, _ = train.scan_stream(FakeStream(make_rows(500)), "text", max_eval=7)
+    assert len(eval_rows) == 7
+    assert set(eval_rows[0]) == {"text", "label"}
+
+
+def test_holdout_does_not_depend_on_row_order():
+    data = make_rows(300)
+    shuffled = list(data)
+    random.Random(0).shuffle(shuffled)
+
+    first = train.scan_stream(FakeStream(data), "text", max_eval=10)
+    second = train.scan_stream(FakeStream(shuffled), "text", max_eval=10)
+    assert first[2] == second[2]
+    assert first[3] == second[3]
+
+
+def test_empty_stream():
+    assert train.scan_stream(FakeStream([]), "text", max_eval=10) == ([], 0, [], -1)
@@ -0,0 +1,118 @@
+"""Sliding-window classification of texts longer than max_length."""
+
+import re
+
+import numpy as np
+
+from ml.tokenization import pool_windows, window_buckets, windowed_logits
+
+
+class WindowingTokenizer:
+    """Word tokenizer with HF-style overflowing windows and char offsets.
+
+    "pain" is token 2, every other word token 1.
+    """
+
+    def __call__(
+        self,
+        texts,
+        truncation=True,
+        max_length=None,
+        stride=0,
+        return_overflowing_tokens=False,
+        return_offsets_mapping=False,
+        **kwargs,
+    ):
+        encoded = {"input_ids": [], "overflow_to_sample_mapping": [], "offset_mapping": []}
+        for owner, text in enumerate(texts):
+            words = [(m.group(), m.span()) for m in re.finditer(r"\S+", text)]
+            step = max_length - stride
+            start = 0
+            while True:
+                window = words[start : start + max_length]
+                encoded["input_ids"].append([2 if word == "pain" else 1 for word, _ in window])
+                encoded["overflow_to_sample_mapping"].append(owner)
+                encoded["offset_mapping"].append([span for _, span in window])
+                if start + max_length >= len(words):
+                    break
+                start += step
+        return encoded
+
+    def pad(self, features, padding="longest", return_tensors="np"):
+        rows = features["input_ids"]
+        width = max(len(row) for row in rows)
+        return {
+            "input_ids": np.array([row + [0] * (width - len(row)) for row in rows]),
+            "attention_mask": np.array(
+                [[1] * len(row) + [0] * (width - len(row)) for row in rows]
+            ),
+        }
+
+
+def forward(inputs):
+    """Class 1 wins exactly in windows containing "pain"."""
+    ids = inputs["input_ids"]
+    return np.stack([np.full(len(ids), 1.0), (ids == 2).sum(axis=1) * 5.0], axis=1)
+
+
+LONG_TEXT = "w0 w1 w2 w3 w4 w5 w6 w7 pain w9"
+
+
+def test_long_text_is_split_into_overlapping_windows():
+    batches = list(
+        window_buckets(WindowingTokenizer(), [LONG_TEXT], max_length=4, stride=1, return_tensors="np")
+    )
+    rows = sorted(row for batch_rows, _ in batches for row in batch_rows)
+    assert [(owner, window) for owner, window, _ in rows] == [(0, 0), (0, 1), (0, 2)]
+    # Windows share `stride` words: w0-w3, w3-w6, w6-w9
+    assert [LONG_TEXT[start:end] for _, _, (start, end) in rows] == [
+        "w0 w1 w2 w3",
+        "w3 w4 w5 w6",
+        "w6 w7 pain w9",
+    ]
+
+
+def test_windowed_logits_pool_long_texts():
+    # The stride is capped at max_length // 2: windows w0-w3, w2-w5, w4-w7, w6-w9
+    results = windowed_logits(
+        WindowingTokenizer(),
+        ["short pain", LONG_TEXT],
+        max_length=4,
+        forward=forward,
+        return_tensors="np",
+        enabled=True,
+    )
+
+    short_logits, short_window = results[0]
+    assert short_window is None
+    assert int(np.argmax(short_logits)) == 1
+
+    long_logits, long_window = results[1]
+    assert int(np.argmax(long_logits)) == 1
+    assert long_window["count"] == 4
+    assert long_window["index"] == 3
+    assert long_window["char_span"] == [LONG_TEXT.index("w6"), len(LONG_TEXT)]
+
+
+def test_windowed_logits_missing_logits():
+    results = windowed_logits(
+        WindowingTokenizer(),
+        [LONG_TEXT],
+        max_length=4,
+        forward=lambda inputs: None,
+        return_tensors="np",
+        enabled=True,
+    )
+    assert results == [(None, None)]
+
+
+def test_pool_windows():
+    logits = np.array([[2.0, 0.0], [0.0, 3.0], [1.0, 1.0]])
+
+    pooled, driver = pool_windows(logits, "max")
+    assert pooled.tolist() == [2.0, 3.0]
+    assert driver == 1
+
+    pooled, driver = pool_windows(logits, "mean")
+    assert pooled.tolist() == [1.0, 4.0 / 3.0]
+    assert driver == 1
@@ -0,0 +1,222 @@
+"""Length-aware input preparation for ClinicalBERT.
+
+Symptom descriptions are usually 10-40 tokens, so padding every input to a
+fixed 256/512 wastes most of the (quadratic) attention cost. Texts are
+tokenized once without padding, grouped into length buckets so short and
+long texts never share a batch, and each batch is padded only to its own
+longest member. The effective (unpadded) length of every sequence run
+through the model is recorded in ``ml.metrics`` as ``effective_seq_length``.
+
+Texts longer than the model's maximum length are not truncated: they are
+split into overlapping windows (``WINDOW_STRIDE`` shared tokens) that are
+batched with everything else, and the window logits are pooled back into
+one prediction per text (``windowed_logits``). Texts that fit keep the
+single-pass path. ``SLIDING_WINDOW=0`` restores plain truncation.
+"""
+
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ml.metrics import metrics
+
+
+# Upper bounds (in tokens) of the length buckets
+LENGTH_BUCKETS = (16, 32, 64, 128, 256, 512)
+
+SLIDING_WINDOW = os.getenv("SLIDING_WINDOW", "1").lower() in ("1", "true", "yes")
+# Tokens shared by consecutive windows of a long text
+WINDOW_STRIDE = int(os.getenv("WINDOW_STRIDE", "64"))
+# How window logits are combined: "max" (a symptom anywhere counts) or "mean"
+WINDOW_POOLING = os.getenv("WINDOW_POOLING", "max").lower()
+
+
+def bucket_for(length: int, buckets: Sequence[int] = LENGTH_BUCKETS) -> int:
+    """Smallest bucket that fits ``length`` (the largest one otherwise)."""
+    for bound in buckets:
+        if length <= bound:
+            return bound
+    return buckets[-1]
+
+
+def length_buckets(
+    tokenizer,
+    texts: List[str],
+    max_length: int,
+    max_batch_size: int = 16,
+    buckets: Sequence[int] = LENGTH_BUCKETS,
+    return_tensors: str = "pt",
+) -> Iterator[Tuple[List[int], dict]]:
+    """Yield ``(indices, inputs)`` batches grouped by token length.
+
+    ``indices`` map each row of ``inputs`` back to its position in ``texts``;
+    ``inputs`` is padded to the longest text in that batch only.
+    """
+    encoded = tokenizer(texts, truncation=True, max_length=max_length)
+    return bucket_encoded(tokenizer, encoded, max_batch_size, buckets, return_tensors)
+
+
+def bucket_encoded(
+    tokenizer,
+    encoded,
+    max_batch_size: int = 16,
+    buckets: Sequence[int] = LENGTH_BUCKETS,
+    return_tensors: str = "pt",
+) -> Iterator[Tuple[List[int], dict]]:
+    """``length_buckets`` over already tokenized (unpadded) features.
+
+    ``indices`` refer to rows of ``encoded``.
+    """
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    for length in lengths:
+        metrics.observe("effective_seq_length", length)
+
+    grouped = {}
+    for index, length in enumerate(lengths):
+        grouped.setdefault(bucket_for(length, buckets), []).append(index)
+
+    for bound in sorted(grouped):
+        indices = grouped[bound]
+        for start in range(0, len(indices), max_batch_size):
+            chunk = indices[start : start + max_batch_size]
+            features = {key: [encoded[key][i] for i in chunk] for key in encoded.keys()}
+            inputs = tokenizer.pad(features, padding="longest", return_tensors=return_tensors)
+            metrics.observe("padded_seq_length", max(lengths[i] for i in chunk))
+            yield chunk, inputs
+
+
+def length_groups(
+    tokenizer,
+    texts: List[str],
+    max_length: int,
+    buckets: Sequence[int] = LENGTH_BUCKETS,
+) -> Tuple[List[List[int]], List[int]]:
+    """Indices of ``texts`` grouped by length bucket, shortest first (for
+    pipelines that batch internally), and the token length of every text.
+
+    Running each group separately keeps short and long texts out of the
+    same padded batch. Nothing is recorded in ``ml.metrics``: the caller
+    knows what the model actually runs (e.g. premise plus hypothesis).
+    """
+    encoded = tokenizer(texts, truncation=True, max_length=max_length)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+
+    grouped: Dict[int, List[int]] = {}
+    for index in sorted(range(len(texts)), key=lambda i: lengths[i]):
+        grouped.setdefault(bucket_for(lengths[index], buckets), []).append(index)
+    return [grouped[bound] for bound in sorted(grouped)], lengths
+
+
+def window_buckets(
+    tokenizer,
+    texts: List[str],
+    max_length: int,
+    max_batch_size: int = 16,
+    stride: int = WINDOW_STRIDE,
+    buckets: Sequence[int] = LENGTH_BUCKETS,
+    return_tensors: str = "pt",
+) -> Iterator[Tuple[List[Tuple[int, int, Tuple[int, int]]], dict]]:
+    """Like ``length_buckets``, but long texts become overlapping windows.
+
+    Yields ``(rows, inputs)`` where each row is ``(text_index, window_index,
+    (char_start, char_end))``. A text that fits in ``max_length`` yields a
+    single window.
+    """
+    # The overlap must leave room for new tokens in every window
+    stride = max(0, min(stride, max_length // 2))
+    encoded = tokenizer(
+        texts,
+        truncation=True,
+        max_length=max_length,
+        stride=stride,
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+    )
+    owners = encoded.pop("overflow_to_sample_mapping")
+    offsets = encoded.pop("offset_mapping")
+
+    rows = []
+    window_counts: Dict[int, int] = {}
+    for owner, spans in zip(owners, offsets):
+        spans = [span for span in spans if span[1] > span[0]]
+        char_span = (spans[0][0], spans[-1][1]) if spans else (0, 0)
+        rows.append((owner, window_counts.get(owner, 0), char_span))
+        window_counts[owner] = window_counts.get(owner, 0) + 1
+    for count in window_counts.values():
+        metrics.observe("windows_per_text", count)
+
+    for chunk, inputs in bucket_encoded(
+        tokenizer, encoded, max_batch_size, buckets, return_tensors
+    ):
+        yield [rows[i] for i in chunk], inputs
+
+
+def pool_windows(logits: np.ndarray, pooling: str = WINDOW_POOLING) -> Tuple[np.ndarray, int]:
+    """Pool ``(windows, classes)`` logits into one row.
+
+    Returns the pooled logits and the index of the window with the highest
+    logit for the winning class (the window that drove the prediction).
+    """
+    pooled = logits.mean(axis=0) if pooling == "mean" else logits.max(axis=0)
+    top = int(np.argmax(pooled))
+    return pooled, int(np.argmax(logits[:, top]))
+
+
+def windowed_logits(
+    tokenizer,
+    texts: List[str],
+    max_length: int,
+    forward: Callable[[dict], Optional[np.ndarray]],
+    max_batch_size: int = 16,
+    return_tensors: str = "pt",
+    enabled: Optional[bool] = None,
+) -> List[Tuple[Optional[np.ndarray], Optional[dict]]]:
+    """Logits per text, pooling the windows of texts longer than ``max_length``.
+
+    ``forward`` maps a padded batch to a ``(rows, classes)`` logits array (or
+    None if the model cannot produce logits). Returns ``(logits, window)``
+    per text in input order; ``window`` is None for single-window texts and
+    otherwise ``{"index", "count", "char_span"}`` of the driving window.
+    """
+    enabled = SLIDING_WINDOW if enabled is None else enabled
+    if not enabled:
+        results: List[Tuple[Optional[np.ndarray], Optional[dict]]] = [(None, None)] * len(texts)
+        for indices, inputs in length_buckets(
+            tokenizer, texts, max_length, max_batch_size, return_tensors=return_tensors
+        ):
+            logits = forward(inputs)
+            for row, index in enumerate(indices):
+                results[index] = (None if logits is None else logits[row], None)
+        return results
+
+    collected: Dict[int, List[Tuple[int, Tuple[int, int], Optional[np.ndarray]]]] = {}
+    for rows, inputs in window_buckets(
+        tokenizer, texts, max_length, max_batch_size, return_tensors=return_tensors
+    ):
+        logits = forward(inputs)
+        for row, (owner, window, span) in enumerate(rows):
+            collected.setdefault(owner, []).append(
+                (window, span, None if logits is None else logits[row])
+            )
+
+    results = []
+    for index in range(len(texts)):
+        windows = sorted(collected.get(index, []), key=lambda w: w[0])
+        if not windows or any(w[2] is None for w in windows):
+            results.append((None, None))
+        elif len(windows) == 1:
+            results.append((windows[0][2], None))
+        else:
+            pooled, driver = pool_windows(np.stack([w[2] for w in windows]))
+            results.append(
+                (
+                    pooled,
+                    {
+                        "index": driver,
+                        "count": len(windows),
+                        "char_span": list(windows[driver][1]),
+                    },
+                )
+            )
+    return results
@@ -3,18 +3,85 @@
 This script fine-tunes the Bio_ClinicalBERT model on the SIDER dataset
 for a single epoch (hackathon-friendly) and stores the resulting model
 artifacts under ./ml/model so they can be consumed by the inference module.
+Weights are written as model.safetensors, which the inference loaders
+memory-map instead of deserialising (see ml/weights.py).
+
+With --early-exit, lightweight classifier heads are trained on intermediate
+layers of the frozen ./ml/model and saved as ./ml/model/exit_heads.pt, for
+EARLY_EXIT_THRESHOLD inference (see ml/early_exit.py).
+
+With --distill, a smaller student (fewer, narrower layers) is trained on the
+same data against the logits of the fine-tuned model in ./ml/model and saved
+in the same layout to ./ml/model-student. Serve it with
+SYMPTOM_MODEL_DIR=ml/model-student (or copy it over ./ml/model).
 
 Usage:
     python ml/train.py
+    python ml/train.py --distill [--student-layers 4] [--student-hidden 384]
+    python ml/train.py --early-exit [--exit-layers 3,6,9]
+
+Fine-tuning and distillation accept --group-by-length, --bf16,
+--batch-size and --grad-accum for faster CPU-only training runs.
+
+With --nproc N, training runs data-parallel across N local processes
+(torch.distributed.run, gloo all-reduce). Each rank gets its own block of
+cores and processes --batch-size / N examples per step, so the global batch
+and learning rate match a single-process run; rank 0 writes the same
+artifacts. --scaling 1,2,4,8 runs a short
+fine-tune at each process count and prints the throughput scaling curve:
+
+    python ml/train.py --nproc 4 --group-by-length
+    python ml/train.py --scaling 1,2,4,8 [--max-steps 50]
+
+With --stream, fine-tuning reads local Parquet or JSONL files (each row a
+text column and a ``label``) incrementally instead of loading SIDER into
+memory: one pass over the data builds the label map and samples up to
+STREAM_EVAL_SIZE rows (by a hash of each row, so from every file and label
+region) for evaluation, and the remaining rows are shuffled through a
+STREAM_SHUFFLE_BUFFER-row buffer and tokenized on the fly, so peak memory
+does not grow with the corpus:
+
+    python ml/train.py --stream data/adverse_events/*.parquet
+
+With --incremental, the model in ./ml/model is updated in place instead of
+retrained from Bio_ClinicalBERT: it trains only on rows of a local export
+(e.g. clinician-confirmed entries of the ``symptoms`` collection, with a
+text column, ``label`` and ``created_at``) whose ids are not yet recorded
+in ./ml/model/train_state.json, mixed with a replay sample of older data
+(SIDER plus already consumed rows) so earlier labels are not forgotten.
+Labels not seen before get new classifier outputs. The consumed ids are
+recorded only after the updated model has been swapped in:
+
+    python ml/train.py --incremental exports/symptoms.jsonl [--replay-ratio 1.0]
 """
 
+import argparse
+import copy
+import hashlib
+import heapq
 import json
+import math
 import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
+
+# Ensure project root (which contains the `ml` package) is on sys.path
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
 
 import numpy as np
-from datasets import load_dataset
+import torch
+import torch.nn.functional as F
+from datasets import Dataset, load_dataset, load_from_disk
+from torch.utils.data import DataLoader
 from transformers import (
     AutoModelForSequenceClassification,
     AutoTokenizer,
@@ -24,11 +91,41 @@ from transformers import (
 )
 from sklearn.metrics import accuracy_score, f1_score
 
+from ml.runtime import CPU_AFFINITY, configure_runtime, default_intra_threads
+
 
 MODEL_NAME = "emilyalsentzer/Bio_ClinicalBERT"
 ROOT_DIR = Path(__file__).resolve().parent
 MODEL_DIR = ROOT_DIR / "model"
 LABEL_MAP_PATH = MODEL_DIR / "label_map.json"
+STUDENT_DIR = ROOT_DIR / "model-student"
+MAX_LENGTH = 256
+# Tokenized splits, keyed by tokenizer, max_length, labels and source data
+TOKENIZED_CACHE_DIR = Path(os.getenv("TOKENIZED_CACHE_DIR", str(ROOT_DIR / "cache" / "tokenized")))
+TOKENIZE_NUM_PROC = int(os.getenv("TOKENIZE_NUM_PROC", str(os.cpu_count() or 1)))
+# Collective backend for --nproc data-parallel training
+DDP_BACKEND = os.getenv("DDP_BACKEND", "gloo")
+# Optimizer steps per process count in a --scaling run
+SCALING_MAX_STEPS = 50
+# --stream: rows held in the shuffle buffer, and rows held out for eval
+STREAM_SHUFFLE_BUFFER = int(os.getenv("STREAM_SHUFFLE_BUFFER", "10000"))
+STREAM_EVAL_SIZE = int(os.getenv("STREAM_EVAL_SIZE", "1000"))
+# Label map and eval sample of a scanned stream, shared by all ranks
+STREAM_SCAN_CACHE_DIR = TOKENIZED_CACHE_DIR.parent / "streams"
+STREAM_FORMATS = {".parquet": "parquet", ".jsonl": "json", ".json": "json"}
+# --incremental: ids of consumed export rows, and old rows replayed per new row
+TRAIN_STATE_PATH = MODEL_DIR / "train_state.json"
+REPLAY_RATIO = float(os.getenv("REPLAY_RATIO", "1.0"))
+INCREMENTAL_LEARNING_RATE = 1e-5
+
+
+def _world_size() -> int:
+    """Number of data-parallel ranks (set by torch.distributed.run)."""
+    return int(os.getenv("WORLD_SIZE", "1"))
+
+
+def _is_main_process() -> bool:
+    return int(os.getenv("RANK", "0")) == 0
 
 
 def _detect_text_column(columns: List[str]) -> str:
@@ -51,7 +148,8 @@ def compute_metrics(eval_pred):
     }
 
 
-def main():
+def load_splits():
+    """Load SIDER and return (train, eval) splits."""
     print("Loading SIDER dataset...")
     # huggingface provides SIDER as a config within biomedical-ner dataset
     dataset = load_dataset("biomedical-ner", "sider")
@@ -69,69 +167,412 @@ def main():
         split = train_dataset.train_test_split(test_size=0.1, seed=42)
         train_dataset = split["train"]
         eval_dataset = split["test"]
+    return train_dataset, eval_dataset
 
-    # Build label maps
-    label_values = sorted(set(train_dataset["label"]))
-    label2id: Dict[str, int] = {label: idx for idx, label in enumerate(label_values)}
-    id2label: Dict[int, str] = {idx: label for label, idx in label2id.items()}
 
-    # Persist label map for inference
-    MODEL_DIR.mkdir(parents=True, exist_ok=True)
-    with LABEL_MAP_PATH.open("w", encoding="utf-8") as f:
-        json.dump(id2label, f, indent=2)
+def _tokenizer_fingerprint(tokenizer) -> str:
+    """Identity of a tokenizer's vocabulary and normalisation rules."""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        state = backend.to_str()
+    else:
+        state = json.dumps(tokenizer.get_vocab(), sort_keys=True)
+    return hashlib.sha256(
+        f"{type(tokenizer).__name__}|{tokenizer.name_or_path}|{state}".encode("utf-8")
+    ).hexdigest()[:16]
 
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-    text_column = _detect_text_column(train_dataset.column_names)
+
+def _tokenized_cache_path(dataset, tokenizer_fingerprint: str, text_column: str, label2id) -> Path:
+    key = json.dumps(
+        {
+            "dataset": dataset._fingerprint,
+            "tokenizer": tokenizer_fingerprint,
+            "max_length": MAX_LENGTH,
+            "text_column": text_column,
+            "labels": sorted(label2id.items()),
+            "columns": ["input_ids", "token_type_ids", "attention_mask", "labels", "length"],
+        },
+        sort_keys=True,
+    )
+    return TOKENIZED_CACHE_DIR / hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _preprocess_function(tokenizer, text_column: str, label2id: Dict[str, int]):
+    """Batched ``map`` function: tokenize texts and attach integer labels."""
 
     def preprocess_function(examples):
         texts = examples[text_column]
         tokenized = tokenizer(
             texts,
             truncation=True,
-            max_length=256,
+            max_length=MAX_LENGTH,
         )
         tokenized["labels"] = [label2id[label] for label in examples["label"]]
+        # Unpadded lengths, used by length-grouped batching and throughput
+        tokenized["length"] = [len(ids) for ids in tokenized["input_ids"]]
         return tokenized
 
-    print("Tokenizing dataset...")
-    tokenized_train = train_dataset.map(
-        preprocess_function,
-        batched=True,
-        remove_columns=train_dataset.column_names,
+    return preprocess_function
+
+
+def tokenize_splits(tokenizer, train_dataset, eval_dataset, label2id: Dict[str, int]):
+    """Tokenize both splits and attach integer labels.
+
+    Results are saved under TOKENIZED_CACHE_DIR and memory-mapped from
+    there on later runs with the same data, tokenizer, max_length and
+    labels; cold tokenization runs across TOKENIZE_NUM_PROC processes.
+    """
+    text_column = _detect_text_column(train_dataset.column_names)
+    fingerprint = _tokenizer_fingerprint(tokenizer)
+    preprocess_function = _preprocess_function(tokenizer, text_column, label2id)
+
+    def tokenize(dataset, name):
+        path = _tokenized_cache_path(dataset, fingerprint, text_column, label2id)
+        if path.is_dir():
+            print(f"Using cached tokenized {name} split ({path})")
+            return load_from_disk(str(path))
+
+        print(f"Tokenizing {name} split ({TOKENIZE_NUM_PROC} processes)...")
+        tokenized = dataset.map(
+            preprocess_function,
+            batched=True,
+            remove_columns=dataset.column_names,
+            num_proc=min(TOKENIZE_NUM_PROC, max(1, len(dataset) // 1000)),
+        )
+        # Save beside the cache entry and rename it into place, so an
+        # interrupted run never leaves a partial directory that looks cached
+        staging = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        tokenized.save_to_disk(str(staging))
+        try:
+            os.replace(staging, path)
+        except OSError:
+            # Another run cached the same split first
+            shutil.rmtree(staging, ignore_errors=True)
+        # Reload so training reads the memory-mapped Arrow files
+        return load_from_disk(str(path))
+
+    # Worker processes each run their own tokenizer; its internal thread
+    # pool would only oversubscribe the cores
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    return tokenize(train_dataset, "train"), tokenize(eval_dataset, "eval")
+
+
+def _file_format(files: Sequence[Path]) -> str:
+    """The datasets builder ("parquet" or "json") for local data files."""
+    formats = {STREAM_FORMATS.get(Path(f).suffix.lower()) for f in files}
+    if None in formats or len(formats) != 1:
+        raise ValueError(
+            f"Expected files of one format ({', '.join(STREAM_FORMATS)}), got {list(files)}"
+        )
+    return formats.pop()
+
+
+def open_stream(files: Sequence[Path]):
+    """Local Parquet or JSONL files as a streaming (iterable) dataset."""
+    return load_dataset(
+        _file_format(files), data_files=[str(f) for f in files], split="train", streaming=True
     )
-    tokenized_eval = eval_dataset.map(
-        preprocess_function,
-        batched=True,
-        remove_columns=eval_dataset.column_names,
+
+
+def _row_hash(text, label) -> int:
+    """Deterministic 64-bit hash of a row (eval sampling key)."""
+    digest = hashlib.blake2b(f"{label}\x00{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def scan_stream(stream, text_column: str, max_eval: int):
+    """One pass over a stream: (sorted label values, row count, eval rows,
+    eval hash threshold).
+
+    The eval rows are the ``min(max_eval, rows // 10)`` rows with the
+    smallest row hash, i.e. a uniform sample of the whole stream rather than
+    its first rows; training skips every row at or below the threshold.
+    Memory grows with the number of labels and ``max_eval``, not with rows.
+    """
+    labels, rows = set(), 0
+    # Max-heap (negated hashes) of the smallest hashes seen so far
+    smallest: List[tuple] = []
+    for example in stream.select_columns([text_column, "label"]):
+        text, label = example[text_column], example["label"]
+        labels.add(label)
+        rows += 1
+        key = _row_hash(text, label)
+        if len(smallest) < max_eval:
+            heapq.heappush(smallest, (-key, rows, text, label))
+        elif key < -smallest[0][0]:
+            heapq.heapreplace(smallest, (-key, rows, text, label))
+
+    sample = sorted((-neg_key, text, label) for neg_key, _, text, label in smallest)
+    sample = sample[: min(max_eval, max(1, rows // 10))]
+    threshold = sample[-1][0] if sample else -1
+    eval_rows = [{text_column: text, "label": label} for _, text, label in sample]
+    return sorted(labels), rows, eval_rows, threshold
+
+
+def _stream_scan_path(files: Sequence[Path]) -> Path:
+    key = json.dumps(
+        {
+            "files": [
+                [str(Path(f).resolve()), Path(f).stat().st_size, Path(f).stat().st_mtime_ns]
+                for f in files
+            ],
+            "eval_size": STREAM_EVAL_SIZE,
+        },
+        sort_keys=True,
     )
+    return STREAM_SCAN_CACHE_DIR / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]}.json"
 
-    data_collator = DataCollatorWithPadding(tokenizer=tokenizer)
 
-    model = AutoModelForSequenceClassification.from_pretrained(
-        MODEL_NAME,
-        num_labels=len(label2id),
-        label2id=label2id,
-        id2label=id2label,
-        problem_type="single_label_classification",
+def prepare_streaming(tokenizer, files: Sequence[Path], args: TrainingArguments):
+    """Streaming counterpart of load_splits + tokenize_splits.
+
+    Rank 0 scans the stream and saves the result; the other ranks wait for
+    it (``main_process_first``) and read it instead of scanning again.
+    Returns (tokenized train stream, tokenized eval Dataset, label2id,
+    number of training rows).
+    """
+    stream = open_stream(files)
+    columns = list(next(iter(stream)))
+    text_column = _detect_text_column(columns)
+
+    scan_path = _stream_scan_path(files)
+    with args.main_process_first(desc="stream scan"):
+        if scan_path.exists():
+            with scan_path.open("r", encoding="utf-8") as f:
+                scan = json.load(f)
+        else:
+            print(f"Scanning {len(files)} file(s)...")
+            label_values, rows, eval_rows, threshold = scan_stream(
+                stream, text_column, STREAM_EVAL_SIZE
+            )
+            scan = {
+                "labels": label_values,
+                "rows": rows,
+                "eval_rows": eval_rows,
+                "threshold": threshold,
+            }
+            scan_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = scan_path.with_name(f"{scan_path.name}.tmp-{os.getpid()}")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(scan, f)
+            os.replace(tmp_path, scan_path)
+
+    label2id: Dict[str, int] = {label: idx for idx, label in enumerate(scan["labels"])}
+    preprocess_function = _preprocess_function(tokenizer, text_column, label2id)
+    eval_size = len(scan["eval_rows"])
+    print(f"{scan['rows']} rows, {len(label2id)} labels, {eval_size} held out")
+
+    eval_dataset = Dataset.from_list(scan["eval_rows"])
+    tokenized_eval = eval_dataset.map(
+        preprocess_function, batched=True, remove_columns=eval_dataset.column_names
     )
+    threshold = scan["threshold"]
+    tokenized_train = (
+        stream.filter(lambda example: _row_hash(example[text_column], example["label"]) > threshold)
+        .shuffle(seed=42, buffer_size=STREAM_SHUFFLE_BUFFER)
+        .map(preprocess_function, batched=True, remove_columns=columns)
+    )
+    return tokenized_train, tokenized_eval, label2id, scan["rows"] - eval_size
+
+
+def training_arguments(
+    output_dir: Path,
+    epochs: float = 1,
+    learning_rate: float = 2e-5,
+    batch_size: int = 8,
+    gradient_accumulation_steps: int = 1,
+    group_by_length: bool = False,
+    bf16: bool = False,
+    max_steps: int = -1,
+):
+    """Shared TrainingArguments.
 
-    training_args = TrainingArguments(
-        output_dir=str(MODEL_DIR / "checkpoints"),
-        num_train_epochs=1,
-        per_device_train_batch_size=8,
-        per_device_eval_batch_size=8,
-        learning_rate=2e-5,
+    ``group_by_length`` batches examples of similar token length (using the
+    precomputed ``length`` column) so little compute goes to padding;
+    ``bf16`` enables bfloat16 autocast, on CPU too; gradient accumulation
+    gives an effective batch of ``batch_size * gradient_accumulation_steps``.
+
+    ``batch_size`` is the global batch: under torch.distributed.run each of
+    the N ranks takes ``batch_size / N`` examples per step and synchronises
+    gradients over ``DDP_BACKEND``, so the effective batch (and with the
+    unchanged learning rate, the optimisation) matches a single-process run.
+    """
+    world_size = _world_size()
+    if batch_size % world_size:
+        raise ValueError(
+            f"--batch-size {batch_size} must be divisible by the {world_size} processes"
+        )
+    per_rank_batch_size = batch_size // world_size
+    return TrainingArguments(
+        output_dir=str(output_dir / "checkpoints"),
+        num_train_epochs=epochs,
+        per_device_train_batch_size=per_rank_batch_size,
+        per_device_eval_batch_size=per_rank_batch_size,
+        gradient_accumulation_steps=gradient_accumulation_steps,
+        group_by_length=group_by_length,
+        length_column_name="length",
+        bf16=bf16,
+        use_cpu=not torch.cuda.is_available(),
+        max_steps=max_steps,
+        ddp_backend=DDP_BACKEND if _world_size() > 1 else None,
+        # Every parameter gets a gradient, so skip DDP's unused-parameter scan
+        ddp_find_unused_parameters=False,
+        learning_rate=learning_rate,
         weight_decay=0.01,
         evaluation_strategy="epoch",
         save_strategy="no",
         logging_steps=50,
         load_best_model_at_end=False,
         report_to="none",
+        save_safetensors=True,
+    )
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # not Unix
+        return 0.0
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report_throughput(train_result, lengths: Sequence[int]) -> Dict[str, float]:
+    """Print and return samples/sec and (unpadded) tokens/sec of a finished
+    run, summed over all data-parallel ranks.
+
+    ``lengths`` are token counts of the training examples (or a sample of
+    them) used to turn samples into tokens.
+    """
+    samples_per_second = train_result.metrics["train_samples_per_second"]
+    throughput = {
+        "processes": _world_size(),
+        "samples_per_second": samples_per_second,
+        "tokens_per_second": samples_per_second * sum(lengths) / max(1, len(lengths)),
+        "runtime": train_result.metrics["train_runtime"],
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if _is_main_process():
+        print(
+            f"Throughput: {throughput['samples_per_second']:.1f} samples/s, "
+            f"{throughput['tokens_per_second']:.0f} tokens/s "
+            f"({throughput['runtime']:.0f}s, {throughput['processes']} processes, "
+            f"peak RSS {throughput['peak_rss_mb']:.0f} MB)"
+        )
+    return throughput
+
+
+# Files of the old output_dir kept across a save. Everything else (weights,
+# and artifacts derived from them) belongs to the old weights and is dropped.
+_CARRIED_OVER = ("train_state.json",)
+# Derived artifacts worth a rebuild notice when they are dropped
+_DERIVED_ARTIFACTS = {
+    "model.onnx": "python ml/export_onnx.py",
+    "exit_heads.pt": "python ml/train.py --early-exit",
+}
+
+
+def _swap_in(staging: Path, output_dir: Path):
+    """Replace ``output_dir`` by the fully written ``staging`` directory.
+
+    Both moves are renames, so a serving process that memory-maps the old
+    weights keeps its (unlinked) files intact instead of seeing them
+    truncated, and nothing ever reads a half-written model.
+    """
+    retired = output_dir.with_name(output_dir.name + ".previous")
+    if retired.exists():
+        shutil.rmtree(retired)
+    if output_dir.exists():
+        os.rename(output_dir, retired)
+    os.rename(staging, output_dir)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def save_artifacts(trainer: Trainer, tokenizer, output_dir: Path, id2label: Dict[int, str]):
+    """Save model, tokenizer and label map in the layout ml/inference.py loads.
+
+    Everything is written to a sibling ``<name>.incoming`` directory and then
+    swapped in. Only the train state is carried over from ``output_dir``;
+    artifacts built from the old weights (ONNX export, exit heads, int8
+    copy) are not, so they must be rebuilt for the new model. Called on
+    every rank; only rank 0 writes.
+    """
+    staging = output_dir.with_name(output_dir.name + ".incoming")
+    if trainer.is_world_process_zero():
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+        for name in _CARRIED_OVER:
+            if (output_dir / name).is_file():
+                shutil.copy2(output_dir / name, staging / name)
+    trainer.save_model(str(staging))
+    if not trainer.is_world_process_zero():
+        return
+
+    staging.mkdir(parents=True, exist_ok=True)
+    with (staging / "label_map.json").open("w", encoding="utf-8") as f:
+        json.dump(id2label, f, indent=2)
+    tokenizer.save_pretrained(str(staging))
+    dropped = [name for name in _DERIVED_ARTIFACTS if (output_dir / name).exists()]
+    _swap_in(staging, output_dir)
+    for name in dropped:
+        print(
+            f"⚠️  Dropped {name} built from the previous weights; "
+            f"rebuild it with `{_DERIVED_ARTIFACTS[name]}`"
+        )
+
+
+def finetune(
+    speed: Optional[Dict] = None,
+    output_dir: Path = MODEL_DIR,
+    metrics_path: Optional[Path] = None,
+    stream_files: Optional[Sequence[Path]] = None,
+):
+    speed = dict(speed or {})
+    if stream_files:
+        # Length grouping needs random access; the shuffle buffer stands in
+        speed["group_by_length"] = False
+        args = training_arguments(output_dir, **speed)
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        tokenized_train, tokenized_eval, label2id, train_rows = prepare_streaming(
+            tokenizer, stream_files, args
+        )
+        if args.max_steps <= 0:
+            # An iterable dataset has no length, so one epoch is given in steps
+            per_step = args.per_device_train_batch_size * args.gradient_accumulation_steps
+            args.max_steps = max(1, math.ceil(train_rows / (per_step * _world_size())))
+        # Token counts of the held-out rows stand in for the stream's
+        lengths = tokenized_eval["length"]
+    else:
+        args = training_arguments(output_dir, **speed)
+        # Rank 0 downloads and tokenizes first; the other ranks then read its cache
+        with args.main_process_first(desc="dataset preparation"):
+            train_dataset, eval_dataset = load_splits()
+
+            # Build label maps
+            label_values = sorted(set(train_dataset["label"]))
+            label2id: Dict[str, int] = {label: idx for idx, label in enumerate(label_values)}
+
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            tokenized_train, tokenized_eval = tokenize_splits(
+                tokenizer, train_dataset, eval_dataset, label2id
+            )
+        lengths = tokenized_train["length"]
+    id2label: Dict[int, str] = {idx: label for label, idx in label2id.items()}
+
+    data_collator = DataCollatorWithPadding(tokenizer=tokenizer)
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        MODEL_NAME,
+        num_labels=len(label2id),
+        label2id=label2id,
+        id2label=id2label,
+        problem_type="single_label_classification",
     )
 
     trainer = Trainer(
         model=model,
-        args=training_args,
+        args=args,
         train_dataset=tokenized_train,
         eval_dataset=tokenized_eval,
         data_collator=data_collator,
@@ -139,17 +580,738 @@ def main():
         compute_metrics=compute_metrics,
     )
 
-    print("Starting fine-tuning (1 epoch)...")
-    trainer.train()
+    if args.max_steps > 0:
+        print(f"Starting fine-tuning ({args.max_steps} steps)...")
+    else:
+        print(f"Starting fine-tuning ({args.num_train_epochs:g} epoch(s))...")
+    train_result = trainer.train()
+    throughput = report_throughput(train_result, lengths)
+    if stream_files:
+        # Step-limited runs may stop before an epoch-end evaluation
+        results = trainer.evaluate()
+        if trainer.is_world_process_zero():
+            print(
+                f"Held-out accuracy {results['eval_accuracy']:.4f}, "
+                f"f1_macro {results['eval_f1_macro']:.4f}"
+            )
     print("Training complete. Saving artifacts...")
 
-    trainer.save_model(str(MODEL_DIR))
-    tokenizer.save_pretrained(str(MODEL_DIR))
+    save_artifacts(trainer, tokenizer, output_dir, id2label)
+    if metrics_path is not None and trainer.is_world_process_zero():
+        metrics_path.write_text(json.dumps(throughput), encoding="utf-8")
 
-    print(f"Model saved to {MODEL_DIR}")
+    print(f"Model saved to {output_dir}")
     print("Training complete")
 
 
+# ---------------------------------------------------------------------------
+# Incremental fine-tuning
+# ---------------------------------------------------------------------------
+
+def _timestamp(value) -> datetime:
+    """Naive-UTC datetime from a datetime, ISO string or Mongo {"$date": ...}."""
+    if isinstance(value, dict):
+        value = value.get("$date")
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Unsupported created_at value: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def load_train_state(path: Path = TRAIN_STATE_PATH) -> Dict:
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_train_state(state: Dict, path: Path = TRAIN_STATE_PATH):
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _row_id(row: Dict, text_column: str) -> str:
+    """Stable id of an export row: its ``_id``/``id`` (Mongo {"$oid": ...}
+    included), else a hash of its text, label and created_at."""
+    value = row.get("_id", row.get("id"))
+    if isinstance(value, dict):
+        value = value.get("$oid")
+    if value is not None:
+        return str(value)
+    key = json.dumps([row[text_column], row["label"], str(row["created_at"])])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+
+
+def split_consumed(files: Sequence[Path], state: Dict):
+    """(new rows, already consumed rows) of an export as {"id", "text",
+    "label", "created_at"} dicts.
+
+    A row is consumed if its id is in ``state["consumed_ids"]``, so rows
+    exported late with an old ``created_at`` are still picked up. States
+    written before ids were recorded only have a ``watermark``; rows up to
+    it count as consumed.
+    """
+    dataset = load_dataset(
+        _file_format(files), data_files=[str(f) for f in files], split="train"
+    )
+    if "created_at" not in dataset.column_names or "label" not in dataset.column_names:
+        raise ValueError("Incremental exports need 'label' and 'created_at' columns")
+    text_column = _detect_text_column(dataset.column_names)
+
+    consumed_ids = set(state.get("consumed_ids", []))
+    legacy_watermark = None
+    if "consumed_ids" not in state and state.get("watermark"):
+        legacy_watermark = _timestamp(state["watermark"])
+
+    new_rows, old_rows = [], []
+    for row in dataset:
+        record = {
+            "id": _row_id(row, text_column),
+            "text": row[text_column],
+            "label": row["label"],
+            "created_at": _timestamp(row["created_at"]),
+        }
+        if record["id"] in consumed_ids or (
+            legacy_watermark is not None and record["created_at"] <= legacy_watermark
+        ):
+            old_rows.append(record)
+        else:
+            new_rows.append(record)
+    return new_rows, old_rows
+
+
+def _extend_label_head(model, labels: Sequence[str]):
+    """Add classifier outputs for ``labels`` the model does not know yet,
+    keeping the trained rows of the existing ones."""
+    label2id = dict(model.config.label2id)
+    added = [label for label in labels if label not in label2id]
+    if not added:
+        return label2id
+
+    old_head = model.classifier
+    new_head = torch.nn.Linear(old_head.in_features, old_head.out_features + len(added))
+    new_head.weight.data.normal_(mean=0.0, std=model.config.initializer_range)
+    new_head.bias.data.zero_()
+    with torch.no_grad():
+        new_head.weight[: old_head.out_features] = old_head.weight
+        new_head.bias[: old_head.out_features] = old_head.bias
+    model.classifier = new_head
+
+    for label in added:
+        label2id[label] = len(label2id)
+    model.config.num_labels = len(label2id)
+    model.config.label2id = label2id
+    model.config.id2label = {idx: label for label, idx in label2id.items()}
+    print(f"New labels: {', '.join(added)}")
+    return label2id
+
+
+def incremental_finetune(
+    files: Sequence[Path],
+    replay_ratio: float = REPLAY_RATIO,
+    speed: Optional[Dict] = None,
+    epochs: float = 1,
+):
+    """Update ./ml/model on export rows not consumed by an earlier run."""
+    if not MODEL_DIR.is_dir():
+        raise FileNotFoundError(
+            f"Model directory {MODEL_DIR} not found. Run `python ml/train.py` first."
+        )
+    started = time.perf_counter()
+    state = load_train_state()
+    new_rows, consumed_rows = split_consumed(files, state)
+    print(f"{len(new_rows)} new rows ({len(consumed_rows)} already consumed)")
+    if not new_rows:
+        print("Nothing to train on; model unchanged")
+        return
+
+    args = training_arguments(
+        MODEL_DIR, epochs=epochs, learning_rate=INCREMENTAL_LEARNING_RATE, **(speed or {})
+    )
+    with args.main_process_first(desc="dataset preparation"):
+        sider_train, eval_dataset = load_splits()
+        sider_text = _detect_text_column(sider_train.column_names)
+
+        # Replay pool: the base corpus plus export rows consumed by earlier runs
+        replay_count = int(len(new_rows) * replay_ratio)
+        pool_size = len(sider_train) + len(consumed_rows)
+        rng = random.Random(42)
+        replay = []
+        for index in rng.sample(range(pool_size), min(replay_count, pool_size)):
+            if index < len(sider_train):
+                row = sider_train[index]
+                replay.append({"text": row[sider_text], "label": row["label"]})
+            else:
+                replay.append(consumed_rows[index - len(sider_train)])
+
+        rows = [{"text": r["text"], "label": r["label"]} for r in new_rows + replay]
+        rng.shuffle(rows)
+        train_dataset = Dataset.from_list(rows)
+        print(f"Training on {len(new_rows)} new + {len(replay)} replayed rows")
+
+        tokenizer = AutoTokenizer.from_pretrained(str(MODEL_DIR))
+        model = AutoModelForSequenceClassification.from_pretrained(str(MODEL_DIR))
+        label2id = _extend_label_head(model, sorted({row["label"] for row in rows}))
+        id2label: Dict[int, str] = {idx: label for label, idx in label2id.items()}
+
+        tokenized_train = train_dataset.map(
+            _preprocess_function(tokenizer, "text", label2id),
+            batched=True,
+            remove_columns=train_dataset.column_names,
+        )
+        tokenized_eval = eval_dataset.map(
+            _preprocess_function(
+                tokenizer, _detect_text_column(eval_dataset.column_names), label2id
+            ),
+            batched=True,
+            remove_columns=eval_dataset.column_names,
+        )
+
+    trainer = Trainer(
+        model=model,
+        args=args,
+        train_dataset=tokenized_train,
+        eval_dataset=tokenized_eval,
+        data_collator=DataCollatorWithPadding(tokenizer=tokenizer),
+        tokenizer=tokenizer,
+        compute_metrics=compute_metrics,
+    )
+    train_result = trainer.train()
+    report_throughput(train_result, tokenized_train["length"])
+
+    save_artifacts(trainer, tokenizer, MODEL_DIR, id2label)
+    if trainer.is_world_process_zero():
+        # Record the consumed rows only once the updated weights are in place
+        # (rows consumed under an older watermark-only state are recorded too)
+        consumed_ids = set(state.get("consumed_ids", []))
+        consumed_ids.update(row["id"] for row in new_rows + consumed_rows)
+        latest = max(row["created_at"] for row in new_rows + consumed_rows)
+        save_train_state(
+            {
+                "consumed_ids": sorted(consumed_ids),
+                "watermark": latest.isoformat(),
+                "consumed_rows": len(consumed_ids),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+        minutes = (time.perf_counter() - started) / 60
+        print(f"Model updated in {minutes:.1f} min; {len(consumed_ids)} rows consumed")
+
+
+# ---------------------------------------------------------------------------
+# Distillation
+# ---------------------------------------------------------------------------
+
+def build_student(teacher, num_layers: int, hidden_size: int):
+    """Create a narrower, shallower copy of the teacher's architecture.
+
+    Student layers are initialised from evenly spaced teacher layers, with
+    every weight truncated to the student's dimensions, which converges
+    much faster than a random initialisation on a small dataset.
+    """
+    config = copy.deepcopy(teacher.config)
+    config.num_hidden_layers = num_layers
+    config.hidden_size = hidden_size
+    config.num_attention_heads = max(1, hidden_size // 64)
+    config.intermediate_size = 4 * hidden_size
+    student = AutoModelForSequenceClassification.from_config(config)
+
+    teacher_layers = teacher.config.num_hidden_layers
+    layer_map = {
+        i: round(i * (teacher_layers - 1) / max(1, num_layers - 1))
+        for i in range(num_layers)
+    }
+    teacher_state = teacher.state_dict()
+    student_state = student.state_dict()
+    for name, param in student_state.items():
+        source = name
+        parts = name.split(".")
+        if "layer" in parts:
+            index = parts.index("layer") + 1
+            parts[index] = str(layer_map[int(parts[index])])
+            source = ".".join(parts)
+        weight = teacher_state.get(source)
+        if weight is None or weight.dim() != param.dim():
+            continue
+        param.copy_(weight[tuple(slice(0, n) for n in param.shape)])
+    return student
+
+
+class DistillationTrainer(Trainer):
+    """Trainer whose loss mixes the hard-label loss with a soft-target KL
+    term against a frozen teacher's temperature-scaled logits."""
+
+    def __init__(self, *args, teacher=None, temperature: float = 2.0, alpha: float = 0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher.to(self.args.device).eval()
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = self.teacher(**inputs).logits
+
+        t = self.temperature
+        soft_loss = F.kl_div(
+            F.log_softmax(outputs.logits / t, dim=-1),
+            F.softmax(teacher_logits / t, dim=-1),
+            reduction="batchmean",
+        ) * (t * t)
+        loss = self.alpha * outputs.loss + (1 - self.alpha) * soft_loss
+        return (loss, outputs) if return_outputs else loss
+
+
+def _count_parameters(model) -> float:
+    return sum(p.numel() for p in model.parameters()) / 1e6
+
+
+def _cpu_latency_ms(model, tokenizer, texts: List[str]) -> float:
+    """Mean single-text CPU latency, in milliseconds."""
+    model = model.to("cpu").eval()
+    with torch.no_grad():
+        for text in texts[:2]:
+            model(**tokenizer(text, truncation=True, max_length=MAX_LENGTH, return_tensors="pt"))
+        started = time.perf_counter()
+        for text in texts:
+            model(**tokenizer(text, truncation=True, max_length=MAX_LENGTH, return_tensors="pt"))
+    return (time.perf_counter() - started) * 1000 / max(1, len(texts))
+
+
+def distill(
+    num_layers: int = 4,
+    hidden_size: int = 384,
+    epochs: float = 3,
+    temperature: float = 2.0,
+    alpha: float = 0.5,
+    output_dir: Path = STUDENT_DIR,
+    speed: Optional[Dict] = None,
+):
+    speed = speed or {}
+    if not MODEL_DIR.is_dir():
+        raise FileNotFoundError(
+            f"Teacher model not found at {MODEL_DIR}. Run `python ml/train.py` first."
+        )
+
+    args = training_arguments(output_dir, epochs=epochs, learning_rate=5e-5, **speed)
+    with args.main_process_first(desc="dataset preparation"):
+        train_dataset, eval_dataset = load_splits()
+
+        print(f"Loading teacher from {MODEL_DIR}...")
+        tokenizer = AutoTokenizer.from_pretrained(str(MODEL_DIR))
+        teacher = AutoModelForSequenceClassification.from_pretrained(str(MODEL_DIR))
+        # Keep the teacher's label ids so teacher and student logits line up
+        label2id: Dict[str, int] = dict(teacher.config.label2id)
+        id2label: Dict[int, str] = {idx: label for label, idx in label2id.items()}
+
+        tokenized_train, tokenized_eval = tokenize_splits(
+            tokenizer, train_dataset, eval_dataset, label2id
+        )
+    data_collator = DataCollatorWithPadding(tokenizer=tokenizer)
+
+    student = build_student(teacher, num_layers, hidden_size)
+    trainer = DistillationTrainer(
+        model=student,
+        args=args,
+        train_dataset=tokenized_train,
+        eval_dataset=tokenized_eval,
+        data_collator=data_collator,
+        tokenizer=tokenizer,
+        compute_metrics=compute_metrics,
+        teacher=teacher,
+        temperature=temperature,
+        alpha=alpha,
+    )
+
+    print(
+        f"Distilling {num_layers}-layer/{hidden_size}-wide student "
+        f"({_count_parameters(student):.1f}M params) for {epochs} epochs..."
+    )
+    train_result = trainer.train()
+    report_throughput(train_result, tokenized_train["length"])
+    print("Distillation complete. Saving artifacts...")
+    save_artifacts(trainer, tokenizer, output_dir, id2label)
+
+    teacher_trainer = Trainer(
+        model=teacher,
+        args=training_arguments(output_dir),
+        eval_dataset=tokenized_eval,
+        data_collator=data_collator,
+        tokenizer=tokenizer,
+        compute_metrics=compute_metrics,
+    )
+    text_column = _detect_text_column(eval_dataset.column_names)
+    latency_texts = list(eval_dataset[text_column][:50])
+
+    rows = []
+    for name, model, evaluator in (
+        ("teacher", teacher, teacher_trainer),
+        ("student", trainer.model, trainer),
+    ):
+        # Evaluation is collective under --nproc, the report is rank 0's
+        results = evaluator.evaluate()
+        if not trainer.is_world_process_zero():
+            continue
+        rows.append(
+            (
+                name,
+                results["eval_accuracy"],
+                results["eval_f1_macro"],
+                _count_parameters(model),
+                _cpu_latency_ms(model, tokenizer, latency_texts),
+            )
+        )
+
+    if not rows:
+        return
+    print(f"\n{'model':<8} {'accuracy':>9} {'f1_macro':>9} {'params_M':>9} {'cpu_ms':>8}")
+    for name, acc, f1, params, latency in rows:
+        print(f"{name:<8} {acc:>9.4f} {f1:>9.4f} {params:>9.1f} {latency:>8.1f}")
+    print(f"\nStudent speedup (CPU, batch 1): {rows[0][4] / rows[1][4]:.1f}x")
+    print(f"Student saved to {output_dir}")
+
+
+# ---------------------------------------------------------------------------
+# Early-exit heads
+# ---------------------------------------------------------------------------
+
+EXIT_THRESHOLDS = (0.8, 0.9, 0.95, 0.99)
+
+
+def _hidden_states_batches(model, dataset, collator, device, shuffle: bool):
+    """Yield (per-layer [CLS] states, labels, final logits) for a dataset."""
+    loader = DataLoader(dataset, batch_size=16, shuffle=shuffle, collate_fn=collator)
+    for batch in loader:
+        labels = batch.pop("labels").to(device)
+        batch.pop("length", None)
+        batch = {key: value.to(device) for key, value in batch.items()}
+        with torch.no_grad():
+            outputs = model(**batch, output_hidden_states=True)
+        # hidden_states[i] is the output of encoder layer i (0 = embeddings)
+        cls_states = [state[:, 0] for state in outputs.hidden_states]
+        yield cls_states, labels, outputs.logits
+
+
+def train_exit_heads(
+    layers: Optional[Sequence[int]] = None, epochs: int = 2, learning_rate: float = 1e-3
+):
+    # Inference-side module, only needed for this mode
+    from ml.early_exit import (
+        DEFAULT_EXIT_LAYERS,
+        build_exit_heads,
+        exit_heads_path,
+        save_exit_heads,
+    )
+
+    layers = layers or DEFAULT_EXIT_LAYERS
+    if not MODEL_DIR.is_dir():
+        raise FileNotFoundError(
+            f"Model directory {MODEL_DIR} not found. Run `python ml/train.py` first."
+        )
+
+    train_dataset, eval_dataset = load_splits()
+    tokenizer = AutoTokenizer.from_pretrained(str(MODEL_DIR))
+    model = AutoModelForSequenceClassification.from_pretrained(str(MODEL_DIR))
+    label2id: Dict[str, int] = dict(model.config.label2id)
+    tokenized_train, tokenized_eval = tokenize_splits(
+        tokenizer, train_dataset, eval_dataset, label2id
+    )
+    collator = DataCollatorWithPadding(tokenizer=tokenizer)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # The fine-tuned model stays frozen, so full-depth predictions are unchanged
+    model.to(device).eval()
+    for param in model.parameters():
+        param.requires_grad_(False)
+
+    num_layers = model.config.num_hidden_layers
+    layers = sorted(layer for layer in layers if 0 < layer < num_layers)
+    heads = build_exit_heads(model.config.hidden_size, len(label2id), layers).to(device)
+    optimizer = torch.optim.AdamW(heads.parameters(), lr=learning_rate, weight_decay=0.01)
+
+    print(f"Training exit heads after layers {layers} ({epochs} epochs)...")
+    for epoch in range(epochs):
+        heads.train()
+        total, steps = 0.0, 0
+        for cls_states, labels, _ in _hidden_states_batches(
+            model, tokenized_train, collator, device, shuffle=True
+        ):
+            loss = sum(
+                F.cross_entropy(heads[str(layer)](cls_states[layer]), labels)
+                for layer in layers
+            )
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item()
+            steps += 1
+        print(f"  epoch {epoch + 1}: mean loss {total / max(1, steps):.4f}")
+
+    # Evaluate every head, then simulate early exit at several thresholds
+    heads.eval()
+    probs = {layer: [] for layer in layers}
+    final_preds, gold = [], []
+    with torch.no_grad():
+        for cls_states, labels, logits in _hidden_states_batches(
+            model, tokenized_eval, collator, device, shuffle=False
+        ):
+            for layer in layers:
+                probs[layer].append(torch.softmax(heads[str(layer)](cls_states[layer]), -1).cpu())
+            final_preds.append(logits.argmax(-1).cpu())
+            gold.append(labels.cpu())
+    probs = {layer: torch.cat(rows) for layer, rows in probs.items()}
+    final_preds, gold = torch.cat(final_preds), torch.cat(gold)
+
+    print(f"\n{'exit':<8} {'accuracy':>9}")
+    for layer in layers:
+        print(f"{'layer ' + str(layer):<8} {accuracy_score(gold, probs[layer].argmax(-1)):>9.4f}")
+    print(f"{'full':<8} {accuracy_score(gold, final_preds):>9.4f}")
+
+    print(f"\n{'threshold':<10} {'accuracy':>9} {'f1_macro':>9} {'avg_depth':>10}")
+    for threshold in EXIT_THRESHOLDS:
+        preds = final_preds.clone()
+        depth = torch.full_like(preds, num_layers)
+        pending = torch.ones_like(preds, dtype=torch.bool)
+        for layer in layers:
+            confidence, predicted = probs[layer].max(-1)
+            exiting = pending & (confidence >= threshold)
+            preds[exiting] = predicted[exiting]
+            depth[exiting] = layer
+            pending &= ~exiting
+        print(
+            f"{threshold:<10} {accuracy_score(gold, preds):>9.4f} "
+            f"{f1_score(gold, preds, average='macro'):>9.4f} {depth.float().mean().item():>10.2f}"
+        )
+
+    path = exit_heads_path(str(MODEL_DIR))
+    save_exit_heads(heads.cpu(), path)
+    print(f"\nExit heads saved to {path}")
+
+
+# ---------------------------------------------------------------------------
+# Data-parallel launcher
+# ---------------------------------------------------------------------------
+
+def _strip_option(argv: List[str], option: str) -> List[str]:
+    """``argv`` without ``option`` and its value."""
+    stripped, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == option:
+            skip = True
+        elif not arg.startswith(option + "="):
+            stripped.append(arg)
+    return stripped
+
+
+def launch_data_parallel(nproc: int, argv: List[str]) -> int:
+    """Re-run this script as ``nproc`` local ranks; returns the exit code."""
+    env = dict(os.environ)
+    # torch.distributed.run would otherwise start every rank single-threaded
+    env["OMP_NUM_THREADS"] = str(default_intra_threads(workers=nproc))
+    env["TOKENIZERS_PARALLELISM"] = "false"
+    command = [
+        sys.executable,
+        "-m",
+        "torch.distributed.run",
+        "--standalone",
+        f"--nproc_per_node={nproc}",
+        str(Path(__file__).resolve()),
+        *argv,
+    ]
+    print(f"Launching {nproc} data-parallel processes ({DDP_BACKEND})...")
+    return subprocess.call(command, env=env)
+
+
+def _configure_rank():
+    """Give this rank its own block of cores, like the inference workers."""
+    local_rank = int(os.getenv("LOCAL_RANK", "0"))
+    local_world_size = int(os.getenv("LOCAL_WORLD_SIZE", str(_world_size())))
+    settings = configure_runtime(
+        affinity=CPU_AFFINITY or "auto",
+        worker_index=local_rank,
+        workers=local_world_size,
+    )
+    print(
+        f"Rank {os.getenv('RANK', '0')}: {settings['intra_op_threads']} threads, "
+        f"cpus {settings['cpu_affinity']}"
+    )
+
+
+def scaling_curve(process_counts: Sequence[int], argv: List[str], max_steps: int = SCALING_MAX_STEPS):
+    """Fine-tune for ``max_steps`` steps at each process count (into a
+    scratch directory) and print throughput, speedup and efficiency."""
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for nproc in process_counts:
+            metrics_path = Path(scratch) / f"throughput-{nproc}.json"
+            code = launch_data_parallel(
+                nproc,
+                [
+                    *argv,
+                    "--output", str(Path(scratch) / f"model-{nproc}"),
+                    "--max-steps", str(max_steps),
+                    "--metrics-out", str(metrics_path),
+                ],
+            )
+            if code != 0 or not metrics_path.exists():
+                print(f"⚠️  {nproc}-process run failed (exit code {code})")
+                continue
+            rows.append(json.loads(metrics_path.read_text(encoding="utf-8")))
+
+    if not rows:
+        return
+    base = rows[0]
+    print(
+        f"\n{'processes':>9} {'samples/s':>10} {'tokens/s':>10} "
+        f"{'speedup':>8} {'efficiency':>10}"
+    )
+    for row in rows:
+        speedup = row["samples_per_second"] / base["samples_per_second"]
+        efficiency = speedup * base["processes"] / row["processes"]
+        print(
+            f"{row['processes']:>9} {row['samples_per_second']:>10.1f} "
+            f"{row['tokens_per_second']:>10.0f} {speedup:>7.2f}x {efficiency:>9.0%}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train the MedAware symptom classifier")
+    parser.add_argument(
+        "--distill",
+        action="store_true",
+        help="train a small student against the fine-tuned model in ./ml/model",
+    )
+    parser.add_argument("--student-layers", type=int, default=4)
+    parser.add_argument("--student-hidden", type=int, default=384)
+    parser.add_argument("--epochs", type=float, default=3, help="distillation epochs")
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument(
+        "--alpha", type=float, default=0.5, help="weight of the hard-label loss"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="output directory (default ./ml/model, or ./ml/model-student with --distill)",
+    )
+    parser.add_argument(
+        "--early-exit",
+        action="store_true",
+        help="train exit heads on intermediate layers of ./ml/model",
+    )
+    parser.add_argument(
+        "--exit-layers",
+        default="",
+        help="comma-separated encoder layers (1-based) that get an exit head "
+        "(default 3,6,9)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="global training batch size (split across --nproc processes)",
+    )
+    parser.add_argument(
+        "--grad-accum", type=int, default=1, help="gradient accumulation steps"
+    )
+    parser.add_argument(
+        "--group-by-length",
+        action="store_true",
+        help="batch examples of similar length to minimise padding",
+    )
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast (CPU or GPU)")
+    parser.add_argument(
+        "--max-steps", type=int, default=-1, help="stop after this many optimizer steps"
+    )
+    parser.add_argument(
+        "--nproc", type=int, default=1, help="data-parallel training processes (gloo)"
+    )
+    parser.add_argument(
+        "--scaling",
+        help="comma-separated process counts to benchmark fine-tuning throughput at",
+    )
+    parser.add_argument(
+        "--stream",
+        nargs="+",
+        type=Path,
+        metavar="FILE",
+        help="fine-tune on local Parquet/JSONL files, read incrementally",
+    )
+    parser.add_argument(
+        "--incremental",
+        nargs="+",
+        type=Path,
+        metavar="FILE",
+        help="update ./ml/model on export rows it has not been trained on yet",
+    )
+    parser.add_argument(
+        "--replay-ratio",
+        type=float,
+        default=REPLAY_RATIO,
+        help="old rows replayed per new row in --incremental mode",
+    )
+    parser.add_argument("--metrics-out", type=Path, help=argparse.SUPPRESS)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(argv)
+
+    if args.early_exit and (args.nproc > 1 or args.scaling):
+        parser.error("--early-exit trains in a single process")
+    if args.stream and (args.early_exit or args.distill):
+        parser.error("--stream applies to fine-tuning only")
+    if args.incremental and (args.stream or args.early_exit or args.distill or args.scaling):
+        parser.error("--incremental cannot be combined with other training modes")
+    if args.scaling:
+        speed_args = ["--batch-size", str(args.batch_size), "--grad-accum", str(args.grad_accum)]
+        speed_args += ["--group-by-length"] * args.group_by_length + ["--bf16"] * args.bf16
+        if args.stream:
+            speed_args += ["--stream", *(str(path) for path in args.stream)]
+        scaling_curve(
+            [int(count) for count in args.scaling.split(",") if count],
+            speed_args,
+            max_steps=args.max_steps if args.max_steps > 0 else SCALING_MAX_STEPS,
+        )
+        return
+    if args.nproc > 1 and _world_size() == 1:
+        sys.exit(launch_data_parallel(args.nproc, _strip_option(argv, "--nproc")))
+    if _world_size() > 1:
+        _configure_rank()
+
+    speed = {
+        "batch_size": args.batch_size,
+        "gradient_accumulation_steps": args.grad_accum,
+        "group_by_length": args.group_by_length,
+        "bf16": args.bf16,
+        "max_steps": args.max_steps,
+    }
+    if args.incremental:
+        incremental_finetune(args.incremental, replay_ratio=args.replay_ratio, speed=speed)
+    elif args.early_exit:
+        train_exit_heads([int(layer) for layer in args.exit_layers.split(",") if layer])
+    elif args.distill:
+        distill(
+            num_layers=args.student_layers,
+            hidden_size=args.student_hidden,
+            epochs=args.epochs,
+            temperature=args.temperature,
+            alpha=args.alpha,
+            output_dir=args.output or STUDENT_DIR,
+            speed=speed,
+        )
+    else:
+        finetune(
+            speed,
+            output_dir=args.output or MODEL_DIR,
+            metrics_path=args.metrics_out,
+            stream_files=args.stream,
+        )
+
+
 if __name__ == "__main__":
     main()
-
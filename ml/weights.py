@@ -0,0 +1,77 @@
+"""Memory-mapped loading of safetensors checkpoints.
+
+``from_pretrained`` deserialises every weight into freshly allocated heap
+memory, so each worker pays the full read + copy on startup and holds a
+private ~420 MB copy. Here the ``model.safetensors`` file written by
+``ml/train.py`` is opened with ``safetensors``, which memory-maps it, and
+the tensors are assigned straight into a meta-device model: startup cost is
+a header parse plus the page faults the first forward pass triggers, and
+processes on a node read the weights through the same page cache.
+
+Nothing is ever written back to the checkpoint. Disable with
+``MMAP_WEIGHTS=0``; compare cold starts with ``python -m ml.benchmark
+startup``.
+"""
+
+import os
+
+import torch
+from safetensors.torch import load_file
+from torch import nn
+from transformers import AutoConfig, AutoModelForSequenceClassification
+
+
+MMAP_ENABLED = os.getenv("MMAP_WEIGHTS", "1").lower() in ("1", "true", "yes")
+SAFETENSORS_FILE = "model.safetensors"
+
+
+def safetensors_path(model_dir: str) -> str:
+    return os.path.join(model_dir, SAFETENSORS_FILE)
+
+
+def has_safetensors(model_dir: str) -> bool:
+    return os.path.isfile(safetensors_path(model_dir))
+
+
+def _materialize_buffers(model: nn.Module):
+    """Recreate the non-persistent buffers a meta-device model is missing.
+
+    BERT-style encoders register ``position_ids`` (an arange) and
+    ``token_type_ids`` (zeros) without saving them in the checkpoint.
+    """
+    for name, buffer in list(model.named_buffers()):
+        if not buffer.is_meta:
+            continue
+        owner_name, _, attr = name.rpartition(".")
+        owner = model.get_submodule(owner_name) if owner_name else model
+        if attr == "position_ids":
+            value = torch.arange(buffer.shape[-1]).expand(buffer.shape)
+        elif attr == "token_type_ids":
+            value = torch.zeros(buffer.shape, dtype=buffer.dtype)
+        else:
+            raise RuntimeError(f"Cannot materialise buffer {name}")
+        owner._buffers[attr] = value.clone()
+
+
+def sequence_classifier_from_mmap(model_dir: str) -> nn.Module:
+    """Build a sequence classifier whose weights are views of the mapped
+    ``model.safetensors`` in ``model_dir``.
+
+    The module is created on the meta device (no weights allocated or
+    randomly initialised) and the mapped tensors are assigned in place.
+    """
+    config = AutoConfig.from_pretrained(model_dir)
+    with torch.device("meta"):
+        model = AutoModelForSequenceClassification.from_config(config)
+
+    state_dict = load_file(safetensors_path(model_dir), device="cpu")
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    if unexpected:
+        raise RuntimeError(f"Unexpected weights in {model_dir}: {unexpected[:5]}")
+    model.tie_weights()
+    _materialize_buffers(model)
+
+    if any(p.is_meta for p in model.parameters()):
+        raise RuntimeError(f"Missing weights in {model_dir}: {missing[:5]}")
+    model.eval()
+    return model